@@ -0,0 +1,284 @@
+"""
+Offline benchmarks for the music services.
+
+Runs the real `MusicCoreService`/`MusicQueueService` code against a fake Lavalink node and fake Discord objects
+across any number of simulated guilds, and reports the latency percentiles and throughput of each scenario.
+
+Usage:
+	python -m benchmarks.bench --guilds 50 --iterations 20
+	python -m benchmarks.bench --scenarios play,queue --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import lavalink
+
+from benchmarks.fake_discord import FakeAutocompleteContext, FakeBot, FakeContext, patch_paginator
+from benchmarks.fake_lavalink import FakeLavalinkServer
+from benchmarks.fake_ytmusic import FakeYTMusic, patch_ytmusic
+from bot.player import SorceryPlayer
+
+from services.music.music_core_service import MusicCoreService
+from services.music.music_queue_service import MusicQueueService
+
+
+class BenchGuild:
+	"""
+	A simulated guild with one listener in the player's voice channel.
+	"""
+
+	def __init__(self, bench: "Bench", idx: int):
+		self.bench = bench
+		self.guild = bench.bot.add_guild(f"guild-{idx}")
+		self.member = self.guild.add_listener(f"listener-{idx}")
+		self.search_cog = SimpleNamespace(bot=bench.bot, search_results={})
+
+
+	@property
+	def player(self) -> SorceryPlayer:
+		return self.bench.client.player_manager.get(self.guild.id)
+
+
+	def context(self, command: str) -> FakeContext:
+		return FakeContext(self.bench.bot, self.guild, self.member, command)
+
+
+	async def connect(self):
+		await MusicCoreService.create_player(self.context("play"))
+
+
+	async def fill_queue(self, size: int):
+		result = await self.bench.client.get_tracks(f"https://music.youtube.com/playlist?list=PL{self.guild.id}")
+		tracks = result.tracks
+		while len(self.player.queue) < size:
+			self.player.add(tracks[len(self.player.queue) % len(tracks)], requester=self.member.id)
+
+
+class Bench:
+
+	def __init__(self, args: argparse.Namespace):
+		self.args = args
+		self.server = FakeLavalinkServer(search_results=args.search_results, playlist_size=args.playlist_size, latency=args.latency)
+		self.client: lavalink.Client = None
+		self.bot: FakeBot = None
+		self.guilds: list[BenchGuild] = []
+
+
+	async def start(self):
+		port = await self.server.start()
+
+		self.bot = FakeBot()
+		self.client = lavalink.Client(self.bot.user.id, player=SorceryPlayer)
+		self.bot.lavalink = self.client
+		node = self.client.add_node(host="127.0.0.1", port=port, password=self.server.password, region="us", name="bench-node")
+
+		deadline = time.monotonic() + 10
+		while not node.available:
+			if time.monotonic() > deadline:
+				raise RuntimeError("The fake Lavalink node did not become available.")
+			await asyncio.sleep(0.01)
+
+		patch_paginator()
+		patch_ytmusic(self.args.ytmusic_latency)
+
+		self.guilds = [BenchGuild(self, idx) for idx in range(self.args.guilds)]
+		await asyncio.gather(*(guild.connect() for guild in self.guilds))
+
+
+	async def stop(self):
+		await self.client.close()
+		await self.server.stop()
+
+
+	async def run(self, name: str, operation, setup=None) -> dict:
+		"""
+		Runs `operation(guild)` for every guild concurrently, `iterations` times, and returns the results.
+		`setup(guild)` runs before every iteration and is neither timed nor counted in the requests.
+		"""
+		latencies = []
+		requests = Counter()
+		wall = 0.0
+
+		async def measured(guild: BenchGuild):
+			start = time.perf_counter()
+			await operation(guild)
+			latencies.append(time.perf_counter() - start)
+
+		for _ in range(self.args.iterations):
+			if setup:
+				await asyncio.gather(*(setup(guild) for guild in self.guilds))
+
+			requests_before = Counter(self.server.requests)
+			ytmusic_before = FakeYTMusic.calls
+			start = time.perf_counter()
+			await asyncio.gather(*(measured(guild) for guild in self.guilds))
+			wall += time.perf_counter() - start
+
+			requests.update(self.server.requests)
+			requests.subtract(requests_before)
+			requests["ytmusic"] += FakeYTMusic.calls - ytmusic_before
+
+		return summarize(name, latencies, wall, +requests)
+
+
+	async def play(self) -> dict:
+		result = await self.client.get_tracks("ytmsearch:benchmark")
+
+		async def setup(guild: BenchGuild):
+			# start from an idle player so every play also starts playback
+			guild.player.queue.clear()
+			await guild.player.stop()
+
+		async def play(guild: BenchGuild):
+			ctx = guild.context("play")
+			await MusicCoreService.create_player(ctx)
+			await MusicCoreService.play(ctx, result.tracks[0])
+
+		return await self.run("play", play, setup)
+
+
+	async def play_playlist(self) -> dict:
+		result = await self.client.get_tracks("https://music.youtube.com/playlist?list=PLbenchmark")
+
+		async def setup(guild: BenchGuild):
+			guild.player.queue.clear()
+
+		async def play_playlist(guild: BenchGuild):
+			ctx = guild.context("play")
+			await MusicCoreService.create_player(ctx)
+			await MusicCoreService.play(ctx, result)
+
+		return await self.run("play_playlist", play_playlist, setup)
+
+
+	async def queue(self) -> dict:
+		async def setup(guild: BenchGuild):
+			await guild.fill_queue(self.args.playlist_size)
+
+		async def queue(guild: BenchGuild):
+			ctx = guild.context("queue")
+			await MusicCoreService.create_player(ctx)
+			await MusicQueueService.get_queue_paginator(ctx, 0)
+
+		return await self.run("queue", queue, setup)
+
+
+	async def autocomplete(self) -> dict:
+		async def setup(guild: BenchGuild):
+			await guild.fill_queue(self.args.playlist_size)
+
+		async def autocomplete(guild: BenchGuild):
+			ctx = FakeAutocompleteContext(self.bot, guild.guild, guild.member, f"query {guild.guild.id}", {"source": "ytmsearch:"})
+			await MusicCoreService.autocomplete_query(guild.search_cog, ctx)
+			await MusicQueueService.queue_autocomplete(guild.search_cog, ctx)
+
+		return await self.run("autocomplete", autocomplete, setup)
+
+
+	async def skipto(self) -> dict:
+		async def setup(guild: BenchGuild):
+			await guild.fill_queue(self.args.playlist_size)
+
+		async def skipto(guild: BenchGuild):
+			ctx = guild.context("skipto")
+			await MusicCoreService.create_player(ctx)
+			await MusicQueueService.skipto(ctx, min(5, len(guild.player.queue) - 1))
+
+		return await self.run("skipto", skipto, setup)
+
+
+	async def autoplay(self) -> dict:
+		history = (await self.client.get_tracks("https://music.youtube.com/playlist?list=PLhistory")).tracks
+
+		async def setup(guild: BenchGuild):
+			guild.player.session.autoplay = True
+			guild.player.session.history = list(history)
+
+		async def autoplay(guild: BenchGuild):
+			await MusicCoreService.add_autoplay_track(guild.player)
+
+		return await self.run("autoplay", autoplay, setup)
+
+
+SCENARIOS = ("play", "play_playlist", "queue", "autocomplete", "skipto", "autoplay")
+
+
+def percentile(values: list[float], pct: float) -> float:
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def summarize(name: str, latencies: list[float], wall: float, requests: Counter) -> dict:
+	return {
+		"scenario": name,
+		"ops": len(latencies),
+		"ops_per_second": len(latencies) / wall if wall else 0.0,
+		"mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+		"p50_ms": percentile(latencies, 50) * 1000,
+		"p95_ms": percentile(latencies, 95) * 1000,
+		"p99_ms": percentile(latencies, 99) * 1000,
+		"max_ms": max(latencies, default=0.0) * 1000,
+		"requests": dict(requests),
+	}
+
+
+def print_table(results: list[dict]):
+	header = f"{'scenario':<14}{'ops':>8}{'ops/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  requests"
+	print(header)
+	print("-" * len(header))
+	for result in results:
+		requests = ", ".join(f"{key}={value}" for key, value in sorted(result["requests"].items()))
+		print(
+			f"{result['scenario']:<14}{result['ops']:>8}{result['ops_per_second']:>11.1f}"
+			f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}  {requests}"
+		)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Benchmark the music services against a fake Lavalink node.")
+	parser.add_argument("--guilds", type=int, default=20, help="The number of simulated guilds.")
+	parser.add_argument("--iterations", type=int, default=10, help="How many times every guild runs each scenario.")
+	parser.add_argument("--playlist-size", type=int, default=100, help="The number of tracks in a playlist (and in the queue for queue scenarios).")
+	parser.add_argument("--search-results", type=int, default=10, help="The number of tracks returned by a search.")
+	parser.add_argument("--latency", type=float, default=0.0, help="Extra latency of every fake Lavalink response (in seconds).")
+	parser.add_argument("--ytmusic-latency", type=float, default=0.0, help="Blocking latency of every fake YouTube Music call (in seconds).")
+	parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated scenarios to run ({', '.join(SCENARIOS)}).")
+	parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH as JSON.")
+	return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> list[dict]:
+	args = parse_args(argv)
+	scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+	unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+	if unknown:
+		sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+	bench = Bench(args)
+	await bench.start()
+	try:
+		results = [await getattr(bench, scenario)() for scenario in scenarios]
+	finally:
+		await bench.stop()
+
+	print(f"{args.guilds} guilds x {args.iterations} iterations, playlist size {args.playlist_size}, {args.search_results} search results\n")
+	print_table(results)
+
+	if args.json:
+		with open(args.json, "w") as file:
+			json.dump({"args": vars(args), "results": results}, file, indent=2)
+
+	return results
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
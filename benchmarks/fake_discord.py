@@ -0,0 +1,262 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import discord
+from discord.ext import pages
+
+from bot.message_scheduler import MessageScheduler
+from bot.now_playing import NowPlayingPanels
+from bot.shutdown import ShutdownCoordinator
+from bot.state import StateRegistry
+from bot.voice_status import VoiceStatusUpdater
+
+
+_ids = itertools.count(100_000_000_000_000_000)
+
+
+def next_id() -> int:
+	return next(_ids)
+
+
+class Recorder:
+	"""
+	An awaitable stand-in for `ctx.respond`/`channel.send`/`message.edit` that keeps every call it receives
+	and returns a `FakeMessage`.
+
+	Setting `Recorder.latency` makes every call (and `FakeVoiceChannel.set_status`) take that long, like a round trip to Discord would.
+	"""
+
+	latency = 0.0
+
+	def __init__(self):
+		self.calls: list[tuple[tuple, dict]] = []
+
+
+	async def __call__(self, *args, **kwargs) -> "FakeMessage":
+		self.calls.append((args, kwargs))
+		if Recorder.latency:
+			await asyncio.sleep(Recorder.latency)
+		return FakeMessage()
+
+
+	def __len__(self) -> int:
+		return len(self.calls)
+
+
+class FakeMessage:
+
+	def __init__(self):
+		self.id = next_id()
+		self.edit = Recorder()
+
+
+class FakeMember:
+
+	def __init__(self, guild: "FakeGuild", name: str, bot: bool = False, voice_channel: "FakeVoiceChannel | None" = None):
+		self.id = next_id()
+		self.guild = guild
+		self.name = name
+		self.nick = None
+		self.display_name = name
+		self.avatar = None
+		self.bot = bot
+		self.mention = f"<@{self.id}>"
+		self.guild_permissions = discord.Permissions.all()
+		self.voice = SimpleNamespace(channel=voice_channel) if voice_channel else None
+
+
+class FakeTextChannel:
+
+	def __init__(self, guild: "FakeGuild", name: str = "music"):
+		self.id = next_id()
+		self.guild = guild
+		self.name = name
+		self.send = Recorder()
+
+
+class FakeVoiceClient:
+
+	def __init__(self, channel: "FakeVoiceChannel"):
+		self.channel = channel
+
+
+	async def disconnect(self, *, force: bool = False):
+		player = self.channel.guild.bot.lavalink.player_manager.get(self.channel.guild.id)
+		if player:
+			player.channel_id = None
+		self.channel.guild.voice_client = None
+
+
+class FakeVoiceChannel:
+	"""
+	A voice channel that "connects" by pointing the guild's player at itself instead of talking to the gateway.
+	"""
+
+	def __init__(self, guild: "FakeGuild", name: str = "Lounge"):
+		self.id = next_id()
+		self.guild = guild
+		self.name = name
+		self.status = None
+		self.user_limit = 0
+		self.members: list[FakeMember] = []
+		self.statuses: list[str | None] = []
+
+
+	def __str__(self) -> str:
+		return self.name
+
+
+	def permissions_for(self, member) -> discord.Permissions:
+		return discord.Permissions(connect=True, speak=True)
+
+
+	async def set_status(self, status: str | None):
+		self.status = status
+		self.statuses.append(status)
+		if Recorder.latency:
+			await asyncio.sleep(Recorder.latency)
+
+
+	async def connect(self, *, cls=None, **kwargs) -> FakeVoiceClient:
+		player = self.guild.bot.lavalink.player_manager.create(self.guild.id)
+		player.channel_id = self.id
+		self.members.append(self.guild.me)
+		self.guild.voice_client = FakeVoiceClient(self)
+		return self.guild.voice_client
+
+
+class FakeGuild:
+
+	def __init__(self, bot: "FakeBot", name: str):
+		self.id = next_id()
+		self.bot = bot
+		self.name = name
+		self.voice_client: FakeVoiceClient | None = None
+		self.me = FakeMember(self, bot.user.name, bot=True)
+		self.text_channel = FakeTextChannel(self)
+		self.voice_channel = FakeVoiceChannel(self)
+		self._channels = {self.text_channel.id: self.text_channel, self.voice_channel.id: self.voice_channel}
+
+
+	def get_channel(self, channel_id: int):
+		return self._channels.get(channel_id)
+
+
+	def add_listener(self, name: str) -> FakeMember:
+		member = FakeMember(self, name, voice_channel=self.voice_channel)
+		self.voice_channel.members.append(member)
+		return member
+
+
+class FakeBot:
+	"""
+	Just enough of `SorceryBot` for the music services: a user, a Lavalink client and a guild cache.
+	"""
+
+	def __init__(self, lavalink_client=None, user_id: int | None = None):
+		self.user = SimpleNamespace(id=user_id or next_id(), name="Sorcery")
+		self.lavalink = lavalink_client
+		self.guilds: dict[int, FakeGuild] = {}
+		self.http_client = FakeHttpClient()
+		self.state = StateRegistry()
+		self.shutdown_coordinator = ShutdownCoordinator()
+		self.voice_status = VoiceStatusUpdater()
+		self.message_scheduler = MessageScheduler()
+		self.now_playing = NowPlayingPanels(scheduler=self.message_scheduler)
+
+
+	def add_guild(self, name: str) -> FakeGuild:
+		guild = FakeGuild(self, name)
+		self.guilds[guild.id] = guild
+		return guild
+
+
+	def get_guild(self, guild_id: int) -> FakeGuild | None:
+		return self.guilds.get(guild_id)
+
+
+	def get_channel(self, channel_id: int):
+		for guild in self.guilds.values():
+			channel = guild.get_channel(channel_id)
+			if channel:
+				return channel
+
+
+class FakeContext:
+	"""
+	A `discord.ApplicationContext` stand-in for invoking a command as `author` in `guild`'s text channel.
+	Everything the command responds with ends up in `respond.calls`.
+	"""
+
+	def __init__(self, bot: FakeBot, guild: FakeGuild, author: FakeMember, command: str):
+		self.bot = bot
+		self.guild = guild
+		self.guild_id = guild.id
+		self.author = author
+		self.user = author
+		self.channel = guild.text_channel
+		self.channel_id = guild.text_channel.id
+		self.me = guild.me
+		self.command = SimpleNamespace(name=command, qualified_name=command)
+		self.interaction = SimpleNamespace(user=author, guild=guild, guild_id=guild.id)
+		self.respond = Recorder()
+		self.followup = SimpleNamespace(send=Recorder())
+
+
+	@property
+	def voice_client(self) -> FakeVoiceClient | None:
+		return self.guild.voice_client
+
+
+	async def defer(self, *args, **kwargs):
+		pass
+
+
+class FakeHttpClient:
+	"""
+	Stands in for `bot.http_client`: every request takes `latency` seconds and answers with `status` (404 by default, so no lyrics are found).
+	"""
+
+	def __init__(self, status: int = 404, payload: dict | None = None, latency: float = 0.0):
+		self.status = status
+		self.payload = payload
+		self.latency = latency
+		self.requests = 0
+
+
+	async def get_json(self, url: str, params: dict | None = None) -> tuple[int, dict | None]:
+		self.requests += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+		return self.status, self.payload if 200 <= self.status < 300 else None
+
+
+	async def close(self):
+		pass
+
+
+class FakeAutocompleteContext:
+
+	def __init__(self, bot: FakeBot, guild: FakeGuild, author: FakeMember, value: str, options: dict | None = None):
+		self.bot = bot
+		self.value = value
+		self.options = options or {}
+		self.interaction = SimpleNamespace(user=author, guild=guild, guild_id=guild.id)
+
+
+paginator_responses = Recorder()
+
+
+async def _respond_paginator(self: pages.Paginator, interaction, ephemeral: bool = False, target=None, target_message: str = "Paginator sent!"):
+	"""
+	Replaces `Paginator.respond`: renders every page the way Discord would receive it and records the paginator.
+	"""
+	for page in self.pages:
+		if isinstance(page, discord.Embed):
+			page.to_dict()
+	await paginator_responses(self, interaction)
+
+
+def patch_paginator():
+	pages.Paginator.respond = _respond_paginator
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import json
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+import lavalink
+from aiohttp import web
+
+
+class FakeLavalinkServer:
+	"""
+	A stand-in for a Lavalink v4 node, serving canned results over REST and events over the WebSocket.
+
+	Supported routes:
+		- `GET /v4/websocket`: sends the `ready` op, then whatever `send`/`emit_event` push.
+		- `GET /v4/loadtracks`: search prefixes (`ytmsearch:`, `ytsearch:`, `scsearch:`) return `search_results`
+		  tracks, links with a `list=` parameter return a playlist (`RDAMVM` radios get 25 tracks, any other
+		  playlist `playlist_size` tracks) and anything else a single track.
+		- `PATCH /v4/sessions/{session_id}/players/{guild_id}`: stores the player state and, like a real node,
+		  emits `TrackEndEvent` (replaced/stopped) and `TrackStartEvent` when the track changes.
+		- `DELETE /v4/sessions/{session_id}/players/{guild_id}`
+
+	Every request is counted in `requests` so benchmarks can report how many Lavalink calls a scenario made.
+
+	Params:
+		search_results (int): The number of tracks returned for a search.
+		playlist_size (int): The number of tracks returned for a playlist link.
+		latency (float): Extra delay added to every REST response (in seconds).
+		password (str): The password the client has to send.
+		emit_events (bool): Whether track changes emit track events. Replays turn this off and send the recorded events instead.
+	"""
+
+	SESSION_ID = "fake-session"
+
+	def __init__(self, search_results: int = 10, playlist_size: int = 100, latency: float = 0.0, password: str = "youshallnotpass", emit_events: bool = True):
+		self.search_results = search_results
+		self.playlist_size = playlist_size
+		self.latency = latency
+		self.password = password
+		self.emit_events = emit_events
+
+		self.requests: Counter = Counter()
+		self.players: dict[int, dict] = {}
+		self.sockets: list[web.WebSocketResponse] = []
+
+		self._tracks: dict[str, dict] = {}
+		self._runner = None
+		self.port = None
+
+
+	async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+		app = web.Application()
+		app.router.add_get("/v4/websocket", self.handle_websocket)
+		app.router.add_get("/v4/loadtracks", self.handle_loadtracks)
+		app.router.add_patch("/v4/sessions/{session_id}/players/{guild_id}", self.handle_update_player)
+		app.router.add_delete("/v4/sessions/{session_id}/players/{guild_id}", self.handle_destroy_player)
+
+		self._runner = web.AppRunner(app, access_log=None)
+		await self._runner.setup()
+		site = web.TCPSite(self._runner, host, port)
+		await site.start()
+
+		self.port = site._server.sockets[0].getsockname()[1]
+		return self.port
+
+
+	async def stop(self):
+		for socket in list(self.sockets):
+			await socket.close()
+		if self._runner:
+			await self._runner.cleanup()
+
+
+	def make_track(self, identifier: str, title: str | None = None, author: str | None = None, length: int | None = None, source: str = "youtube") -> dict:
+		"""
+		Returns a Lavalink track payload with a real encoded track string. Tracks are cached by identifier.
+		"""
+		track = self._tracks.get(identifier)
+		if track is not None:
+			return track
+
+		digest = int(hashlib.md5(identifier.encode()).hexdigest(), 16)
+		info = {
+			"identifier": identifier,
+			"isSeekable": True,
+			"author": author or f"Artist {digest % 500}",
+			"length": length or 120_000 + digest % 240_000,
+			"isStream": False,
+			"position": 0,
+			"title": title or f"Track {identifier}",
+			"uri": f"https://music.youtube.com/watch?v={identifier}",
+			"artworkUrl": None,
+			"isrc": None,
+			"sourceName": source,
+		}
+		_, encoded = lavalink.encode_track(info)
+
+		track = {"encoded": encoded, "info": info, "pluginInfo": {}, "userData": {}}
+		self._tracks[identifier] = track
+		return track
+
+
+	def make_tracks(self, seed: str, count: int, source: str = "youtube") -> list[dict]:
+		return [self.make_track(self.make_identifier(f"{seed}#{idx}"), source=source) for idx in range(count)]
+
+
+	@staticmethod
+	def make_identifier(seed: str) -> str:
+		return hashlib.sha1(seed.encode()).hexdigest()[:11]
+
+
+	def load(self, query: str) -> dict:
+		for prefix, source in (("ytmsearch:", "youtube"), ("ytsearch:", "youtube"), ("scsearch:", "soundcloud")):
+			if query.startswith(prefix):
+				return {"loadType": "search", "data": self.make_tracks(query, self.search_results, source)}
+
+		parsed = urlparse(query)
+		params = parse_qs(parsed.query)
+
+		if "list" in params:
+			playlist_id = params["list"][0]
+			size = 25 if playlist_id.startswith("RDAMVM") else self.playlist_size
+			return {
+				"loadType": "playlist",
+				"data": {
+					"info": {"name": f"Playlist {playlist_id}", "selectedTrack": -1},
+					"pluginInfo": {},
+					"tracks": self.make_tracks(playlist_id, size),
+				},
+			}
+
+		if "v" in params:
+			return {"loadType": "track", "data": self.make_track(params["v"][0])}
+
+		if parsed.scheme:
+			return {"loadType": "track", "data": self.make_track(self.make_identifier(query))}
+
+		return {"loadType": "empty", "data": {}}
+
+
+	async def send(self, payload: dict):
+		data = json.dumps(payload)
+		for socket in list(self.sockets):
+			if not socket.closed:
+				await socket.send_str(data)
+
+
+	async def emit_event(self, guild_id: int, event_type: str, **fields):
+		await self.send({"op": "event", "type": event_type, "guildId": str(guild_id), **fields})
+
+
+	async def emit_player_update(self, guild_id: int, position: int, time_ms: int = 0):
+		await self.send({"op": "playerUpdate", "guildId": str(guild_id), "state": {"time": time_ms, "position": position, "connected": True, "ping": 0}})
+
+
+	async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+		if request.headers.get("Authorization") != self.password:
+			raise web.HTTPUnauthorized()
+
+		self.requests["websocket"] += 1
+
+		socket = web.WebSocketResponse()
+		await socket.prepare(request)
+		self.sockets.append(socket)
+
+		await socket.send_str(json.dumps({"op": "ready", "resumed": False, "sessionId": self.SESSION_ID}))
+
+		try:
+			async for _ in socket: # the client never sends anything meaningful
+				pass
+		finally:
+			self.sockets.remove(socket)
+
+		return socket
+
+
+	async def handle_loadtracks(self, request: web.Request) -> web.Response:
+		self.requests["loadtracks"] += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+		return web.json_response(self.load(request.query.get("identifier", "")))
+
+
+	async def handle_update_player(self, request: web.Request) -> web.Response:
+		self.requests["update_player"] += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+
+		guild_id = int(request.match_info["guild_id"])
+		body = await request.json()
+
+		state = self.players.setdefault(guild_id, {"track": None, "volume": 100, "paused": False, "position": 0, "filters": {}})
+		previous = state["track"]
+
+		for key in ("volume", "paused", "position", "filters"):
+			if key in body:
+				state[key] = body[key]
+
+		if "track" in body:
+			encoded = body["track"].get("encoded")
+			track = lavalink.decode_track(encoded) if encoded else None
+			state["track"] = {"encoded": encoded, "info": track.raw["info"], "pluginInfo": {}, "userData": {}} if track else None
+			state["position"] = body.get("position", 0)
+
+			if self.emit_events and previous:
+				await self.emit_event(guild_id, "TrackEndEvent", track=previous, reason="replaced" if encoded else "stopped")
+			if self.emit_events and state["track"]:
+				await self.emit_event(guild_id, "TrackStartEvent", track=state["track"])
+
+		return web.json_response({
+			"guildId": str(guild_id),
+			"track": state["track"],
+			"volume": state["volume"],
+			"paused": state["paused"],
+			"state": {"time": 0, "position": state["position"], "connected": True, "ping": 0},
+			"voice": {"token": "", "endpoint": "", "sessionId": ""},
+			"filters": state["filters"],
+		})
+
+
+	async def handle_destroy_player(self, request: web.Request) -> web.Response:
+		self.requests["destroy_player"] += 1
+		self.players.pop(int(request.match_info["guild_id"]), None)
+		return web.Response(status=204)
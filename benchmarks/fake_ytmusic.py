@@ -0,0 +1,41 @@
+import hashlib
+import time
+
+import ytmusicapi
+
+
+class FakeYTMusic:
+	"""
+	Replaces `ytmusicapi.YTMusic` with canned watch playlists so autoplay can run offline.
+
+	`latency` is spent in a blocking `time.sleep`, the same way the real client blocks on its HTTP call.
+	"""
+
+	latency = 0.0
+	calls = 0
+
+	def __init__(self, *args, **kwargs):
+		pass
+
+
+	def get_watch_playlist(self, videoId: str, limit: int = 25, radio: bool = False, **kwargs) -> dict:
+		type(self).calls += 1
+		if self.latency:
+			time.sleep(self.latency)
+
+		tracks = []
+		for idx in range(limit):
+			video_id = hashlib.sha1(f"{videoId}@{idx}".encode()).hexdigest()[:11]
+			tracks.append({
+				"videoId": video_id,
+				"title": f"Radio {video_id}",
+				"artists": [{"name": f"Artist {idx}", "id": None}],
+				"videoType": "MUSIC_VIDEO_TYPE_ATV" if idx % 3 else "MUSIC_VIDEO_TYPE_OMV",
+			})
+		return {"tracks": tracks, "playlistId": f"RDAMVM{videoId}"}
+
+
+def patch_ytmusic(latency: float = 0.0):
+	FakeYTMusic.latency = latency
+	FakeYTMusic.calls = 0
+	ytmusicapi.YTMusic = FakeYTMusic
@@ -0,0 +1,312 @@
+"""
+Replays Lavalink WebSocket event streams against the `LavaPlayer` event hooks.
+
+A stream is either a recording made by the bot (see `LAVALINK_RECORD_PATH` and `bot.event_recorder`) or
+synthesized on the fly. Every guild of the stream is mapped onto one or more simulated players, so a
+recording of a handful of guilds can be replayed as thousands of players emitting events at the same time.
+The fake Lavalink node sends the events over a real WebSocket to a real `lavalink.Client`, while Discord
+I/O (messages, voice channel statuses, the lrclib lookup) is stubbed with an optional latency.
+
+The report lists the latency percentiles of every hook and how the backlog (messages sent but not yet
+received plus hooks still running) grew while replaying.
+
+Usage:
+	python -m benchmarks.replay lavalink-events.jsonl.gz --players 1000 --speed 10
+	python -m benchmarks.replay --synthesize --players 2000 --duration 600 --speed 60
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import lavalink
+
+from benchmarks.bench import percentile
+from benchmarks.fake_discord import FakeBot, FakeContext, FakeHttpClient, Recorder
+from benchmarks.fake_lavalink import FakeLavalinkServer
+from bot.event_recorder import read_recording
+from bot.player import SorceryPlayer
+from cogs.music.lavaplayer import LavaPlayer
+from services.music.music_core_service import MusicCoreService
+
+
+class HookMonitor:
+	"""
+	Wraps the event hooks of a Lavalink client to time them and keep track of the backlog.
+	"""
+
+	def __init__(self):
+		self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+		self.sent = 0
+		self.received = 0
+		self.in_flight = 0
+		self.samples: list[tuple[float, int]] = []
+
+
+	@property
+	def backlog(self) -> int:
+		return self.sent - self.received + self.in_flight
+
+
+	def install(self, client: lavalink.Client):
+		for event_name, hooks in client._event_hooks.items():
+			hooks[:] = [self.wrap(event_name, hook) for hook in hooks]
+		client.add_event_hook(self.on_message, event=lavalink.IncomingWebSocketMessage)
+
+
+	def wrap(self, event_name: str, hook):
+		key = f"{event_name}:{hook.__name__}"
+
+		@functools.wraps(hook)
+		async def wrapper(event):
+			self.in_flight += 1
+			start = time.perf_counter()
+			try:
+				await hook(event)
+			finally:
+				self.latencies[key].append(time.perf_counter() - start)
+				self.in_flight -= 1
+		return wrapper
+
+
+	async def on_message(self, event: lavalink.IncomingWebSocketMessage):
+		self.received += 1
+
+
+	async def sample(self, interval: float):
+		start = time.monotonic()
+		while True:
+			self.samples.append((time.monotonic() - start, self.backlog))
+			await asyncio.sleep(interval)
+
+
+def load_stream(path: str) -> list[tuple[float, dict]]:
+	return [(offset, payload) for offset, payload in read_recording(path) if payload.get("op") != "ready"]
+
+
+def synthesize(server: FakeLavalinkServer, guilds: int, duration: float, update_interval: float = 5.0, seed: int = 0) -> list[tuple[float, dict]]:
+	"""
+	Builds the stream a node would send for `guilds` players that keep playing tracks back to back for `duration` seconds:
+	a `TrackStartEvent`, a `playerUpdate` every `update_interval` seconds and a `TrackEndEvent` when the track finishes.
+	"""
+	rng = random.Random(seed)
+	stream = []
+	for guild_id in range(1, guilds + 1):
+		offset = rng.uniform(0, update_interval)
+		idx = 0
+		while offset < duration:
+			track = server.make_track(server.make_identifier(f"synthetic-{guild_id}-{idx}"))
+			length = track["info"]["length"] / 1000
+			stream.append((offset, {"op": "event", "type": "TrackStartEvent", "guildId": str(guild_id), "track": track}))
+
+			position = update_interval
+			while position < length and offset + position < duration:
+				stream.append((offset + position, {"op": "playerUpdate", "guildId": str(guild_id), "state": {"time": 0, "position": int(position * 1000), "connected": True, "ping": 0}}))
+				position += update_interval
+
+			offset += length
+			if offset < duration:
+				stream.append((offset, {"op": "event", "type": "TrackEndEvent", "guildId": str(guild_id), "track": track, "reason": "finished"}))
+			idx += 1
+
+	stream.sort(key=lambda item: item[0])
+	return stream
+
+
+def fan_out(stream: list[tuple[float, dict]], guild_ids: list[int], stagger: float) -> list[tuple[float, int, dict]]:
+	"""
+	Maps the guilds of a stream onto `guild_ids`. With more players than recorded guilds, every extra copy of
+	a recorded guild starts `stagger` seconds after the previous one.
+	"""
+	recorded = sorted({payload["guildId"] for _, payload in stream if "guildId" in payload})
+	if not recorded:
+		return []
+
+	copies = defaultdict(list)
+	for idx, guild_id in enumerate(guild_ids):
+		copies[recorded[idx % len(recorded)]].append((guild_id, idx // len(recorded) * stagger))
+
+	timeline = []
+	for offset, payload in stream:
+		if "guildId" not in payload:
+			continue
+		for guild_id, delay in copies[payload["guildId"]]:
+			timeline.append((offset + delay, guild_id, payload))
+
+	timeline.sort(key=lambda item: item[0])
+	return timeline
+
+
+class Replay:
+
+	def __init__(self, args: argparse.Namespace):
+		self.args = args
+		self.server = FakeLavalinkServer(latency=args.lavalink_latency, emit_events=False)
+		self.monitor = HookMonitor()
+		self.client: lavalink.Client = None
+		self.bot: FakeBot = None
+
+
+	async def start(self) -> list[int]:
+		port = await self.server.start()
+
+		self.bot = FakeBot()
+		self.bot.http_client = FakeHttpClient(latency=self.args.discord_latency)
+		self.client = lavalink.Client(self.bot.user.id, player=SorceryPlayer)
+		self.bot.lavalink = self.client
+		node = self.client.add_node(host="127.0.0.1", port=port, password=self.server.password, region="us", name="replay-node")
+
+		deadline = time.monotonic() + 10
+		while not node.available:
+			if time.monotonic() > deadline:
+				raise RuntimeError("The fake Lavalink node did not become available.")
+			await asyncio.sleep(0.01)
+
+		guild_ids = []
+		for idx in range(self.args.players):
+			guild = self.bot.add_guild(f"guild-{idx}")
+			member = guild.add_listener(f"listener-{idx}")
+			await MusicCoreService.create_player(FakeContext(self.bot, guild, member, "play"))
+			guild_ids.append(guild.id)
+
+		LavaPlayer(self.bot) # registers its hooks with `self.bot.lavalink`, like after a hot reload
+		self.monitor.install(self.client)
+
+		# Discord I/O only gets slow once the players are set up
+		Recorder.latency = self.args.discord_latency
+		return guild_ids
+
+
+	async def stop(self):
+		Recorder.latency = 0.0
+		await self.client.close()
+		await self.server.stop()
+
+
+	async def replay(self, timeline: list[tuple[float, int, dict]]) -> dict:
+		speed = self.args.speed
+		sampler = asyncio.create_task(self.monitor.sample(self.args.sample_interval))
+		driver_lag = 0.0
+
+		start = time.monotonic()
+		for offset, guild_id, payload in timeline:
+			delay = start + offset / speed - time.monotonic()
+			if delay > 0:
+				await asyncio.sleep(delay)
+			else:
+				driver_lag = max(driver_lag, -delay)
+
+			payload = {**payload, "guildId": str(guild_id)}
+			if payload.get("type") == "TrackStartEvent":
+				# a real node only starts a track the client asked for, so the player has to be expecting it
+				player = self.client.player_manager.get(guild_id)
+				if player:
+					player._next = lavalink.AudioTrack(payload["track"], 0)
+
+			self.monitor.sent += 1
+			await self.server.send(payload)
+		replayed = time.monotonic() - start
+
+		backlog_at_end = self.monitor.backlog
+		drain_start = time.monotonic()
+		while self.monitor.backlog and time.monotonic() - drain_start < self.args.drain_timeout:
+			await asyncio.sleep(0.01)
+		drained = time.monotonic() - drain_start
+
+		sampler.cancel()
+
+		return {
+			"messages": len(timeline),
+			"replayed_s": replayed,
+			"messages_per_second": len(timeline) / replayed if replayed else 0.0,
+			"driver_lag_ms": driver_lag * 1000,
+			"backlog_max": max((backlog for _, backlog in self.monitor.samples), default=0),
+			"backlog_at_end": backlog_at_end,
+			"drain_s": drained,
+			"drained": not self.monitor.backlog,
+			"backlog_samples": self.monitor.samples,
+			"hooks": {
+				key: {
+					"count": len(values),
+					"p50_ms": percentile(values, 50) * 1000,
+					"p95_ms": percentile(values, 95) * 1000,
+					"p99_ms": percentile(values, 99) * 1000,
+					"max_ms": max(values) * 1000,
+				} for key, values in sorted(self.monitor.latencies.items())
+			},
+		}
+
+
+def print_report(result: dict, args: argparse.Namespace):
+	print(f"{args.players} players, {result['messages']} messages replayed in {result['replayed_s']:.2f}s at {args.speed}x ({result['messages_per_second']:.0f} msg/s)")
+	print(f"driver lag: {result['driver_lag_ms']:.1f}ms, backlog: max {result['backlog_max']}, {result['backlog_at_end']} at the end of the replay, "
+		f"{'drained' if result['drained'] else 'NOT drained'} after {result['drain_s']:.2f}s\n")
+
+	header = f"{'hook':<56}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+	print(header)
+	print("-" * len(header))
+	for key, hook in result["hooks"].items():
+		print(f"{key:<56}{hook['count']:>8}{hook['p50_ms']:>10.2f}{hook['p95_ms']:>10.2f}{hook['p99_ms']:>10.2f}{hook['max_ms']:>10.2f}")
+
+	samples = result["backlog_samples"]
+	if samples:
+		step = max(1, len(samples) // 10)
+		print("\nbacklog: " + ", ".join(f"{elapsed:.1f}s={backlog}" for elapsed, backlog in samples[::step]))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Replay Lavalink event streams against the LavaPlayer hooks.")
+	parser.add_argument("recording", nargs="?", help="A recording made with LAVALINK_RECORD_PATH.")
+	parser.add_argument("--synthesize", action="store_true", help="Replay a synthesized stream instead of a recording.")
+	parser.add_argument("--players", type=int, default=100, help="The number of simulated players the stream is mapped onto.")
+	parser.add_argument("--speed", type=float, default=10.0, help="The speed-up of the replay.")
+	parser.add_argument("--stagger", type=float, default=0.0, help="The offset between copies of the same recorded guild (in stream seconds).")
+	parser.add_argument("--duration", type=float, default=300.0, help="The length of a synthesized stream (in seconds).")
+	parser.add_argument("--update-interval", type=float, default=5.0, help="The playerUpdate interval of a synthesized stream (in seconds).")
+	parser.add_argument("--discord-latency", type=float, default=0.0, help="The latency of every stubbed Discord/HTTP call (in seconds).")
+	parser.add_argument("--lavalink-latency", type=float, default=0.0, help="Extra latency of every fake Lavalink REST response (in seconds).")
+	parser.add_argument("--sample-interval", type=float, default=0.1, help="How often the backlog is sampled (in seconds).")
+	parser.add_argument("--drain-timeout", type=float, default=30.0, help="How long to wait for the backlog to drain after the replay (in seconds).")
+	parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH as JSON.")
+	args = parser.parse_args(argv)
+
+	if bool(args.recording) == args.synthesize:
+		parser.error("pass either a recording or --synthesize")
+	return args
+
+
+async def main(argv: list[str] | None = None) -> dict:
+	args = parse_args(argv)
+
+	replay = Replay(args)
+	guild_ids = await replay.start()
+	try:
+		if args.synthesize:
+			stream = synthesize(replay.server, args.players, args.duration, args.update_interval)
+		else:
+			stream = load_stream(args.recording)
+
+		timeline = fan_out(stream, guild_ids, args.stagger)
+		if not timeline:
+			sys.exit("The stream does not contain any player messages.")
+
+		result = await replay.replay(timeline)
+	finally:
+		await replay.stop()
+
+	print_report(result, args)
+
+	if args.json:
+		with open(args.json, "w") as file:
+			json.dump({"args": vars(args), **result}, file, indent=2)
+
+	return result
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
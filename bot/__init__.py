@@ -1,3 +1,4 @@
 from .bot import SorceryBot
 from .lavaclient import LavalinkVoiceClient
-from .utils import Utils, CustomPage
+from .player import SorceryPlayer, GuildSession
+from .utils import Utils, CustomPage, LazyPages, Debouncer
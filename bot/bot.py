@@ -1,17 +1,75 @@
-import aiohttp
 import asyncio
+import importlib
+import logging
+import math
+import os
 import signal
+import sys
+import time
+import types
 
 import discord
 
+from .context import SorceryContext
+from .http_client import HttpClient
+from .instrumentation import metrics, MetricsServer
+from .log_pipeline import log_latency
+from .message_scheduler import MessageScheduler
+from .now_playing import NowPlayingPanels
+from .response_budget import ResponseBudget
+from .shared_cache import cache
+from .shutdown import ShutdownCoordinator, format_drain_report
+from .state import StateRegistry
+from .utils import Debouncer
+from .voice_listeners import VoiceListenerCounter
+from .voice_status import VoiceStatusUpdater
+from .watchdog import LoopWatchdog
 
-class SorceryBot(discord.Bot):
+
+_log = logging.getLogger(__name__)
+
+
+
+def _reload_order(names: list[str]) -> list[str]:
+	"""
+	Orders the modules `names` so every one of them comes after the ones among them it imports from, which
+	are the modules it refers to and the modules of the classes and functions it refers to.
+	Deeper modules go first among the ones that do not depend on each other.
+	"""
+	order = []
+	visited = set()
+
+	def visit(name: str):
+		visited.add(name)
+		for value in vars(sys.modules[name]).values():
+			dependency = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+			if dependency in names and dependency not in visited:
+				visit(dependency)
+		order.append(name)
+
+	for name in sorted(names, key=lambda name: name.count("."), reverse=True):
+		if name not in visited:
+			visit(name)
+	return order
+
+class SorceryBot(discord.AutoShardedBot):
 	"""
-	A subclass of `discord.Bot` that provides additional functionality for handling
+	A subclass of `discord.AutoShardedBot` that provides additional functionality for handling
 	graceful shutdowns and custom events.
+
+	Without `shard_ids`/`shard_count` the bot runs every shard Discord recommends in this process,
+	`launcher.py` runs it as several processes that each own a subset of the shards.
 	"""
 
 	inactive_timeout = 120 # The timeout duration for inactivity (in seconds).
+	filter_update_interval = 0.5 # The minimum time between two filter updates sent to Lavalink for a player while tuning (in seconds).
+	loop_stall_threshold = 0.25 # How long the event loop has to be blocked for the watchdog to report it (in seconds).
+	shutdown_timeout = 10 # The longest a shutdown waits for the subsystems to drain (in seconds).
+	voice_status_interval = 3 # The minimum time between two status updates of a voice channel (in seconds).
+	now_playing_interval = 2 # The minimum time between two edits of a guild's now playing message (in seconds).
+	message_rate = 40 # The number of messages per second the bot sends, shared by all worker processes (Discord allows 50 requests per second per bot).
+	message_burst = 40 # The number of messages the bot can send at once after a quiet period, shared by all worker processes.
+	response_budget = 2 # How long a command may take before its response is deferred, Discord allows 3 seconds (in seconds).
 
 	
 	def __init__(self, *args, **kwargs):
@@ -19,8 +77,39 @@ class SorceryBot(discord.Bot):
 		Initializes the bot instance and sets up signal handlers for graceful shutdown.
 		"""
 		super().__init__(*args, **kwargs)
-		self.add_listener(self.on_shutdown)
-		self.session = None
+		self.http_client = HttpClient() # every outbound HTTP call (other than Discord's and Lavalink's) goes through its pooled session
+		self.filter_debouncer = Debouncer(self.filter_update_interval)
+
+		# metrics are only recorded when an address for the metrics endpoint is configured (e.g. METRICS_ADDRESS=127.0.0.1:9100)
+		self.metrics_address = os.getenv("METRICS_ADDRESS")
+		self.metrics_server = None
+		metrics.enabled = bool(self.metrics_address)
+
+		self.watchdog = LoopWatchdog(threshold=self.loop_stall_threshold)
+		self.voice_listeners = VoiceListenerCounter()
+		self.voice_status = VoiceStatusUpdater(self.voice_status_interval)
+		# command responses first, notices merged or dropped when they pile up
+		# the limit is per bot, so each worker started by launcher.py (WORKER_COUNT) gets its share of it
+		workers = int(os.getenv("WORKER_COUNT", "1"))
+		self.message_scheduler = MessageScheduler(self.message_rate / workers, max(1, self.message_burst // workers))
+		self.now_playing = NowPlayingPanels(self.now_playing_interval, self.message_scheduler)
+		self.state = StateRegistry() # cog state that survives `hot_reload`
+		self.responses = ResponseBudget(self.response_budget) # defers the responses of commands that are (projected to be) slow
+		self.before_invoke(self.start_response_budget) # only once the checks passed, their failures are answered right away
+
+		# search results, lyrics and autoplay recommendations are shared with the other workers through the cache daemon
+		# started by launcher.py (CACHE_SOCKET), otherwise they are cached in this process only
+		cache.configure(os.getenv("CACHE_SOCKET"))
+
+		# cogs and services register what has to be finished before the bot goes away here
+		self.shutdown_coordinator = ShutdownCoordinator()
+		self.shutdown_coordinator.register("filter updates", self.filter_debouncer.flush, ShutdownCoordinator.FLUSH)
+		self.shutdown_coordinator.register("voice channel statuses", self.voice_status.flush, ShutdownCoordinator.FLUSH)
+		self.shutdown_coordinator.register("now playing messages", self.now_playing.flush, ShutdownCoordinator.FLUSH)
+		self.shutdown_coordinator.register("notices", self.message_scheduler.flush, ShutdownCoordinator.FLUSH)
+		self.shutdown_coordinator.register("http client", self.http_client.close, ShutdownCoordinator.CLOSE)
+		self.shutdown_coordinator.register("shared cache", cache.close, ShutdownCoordinator.CLOSE)
+		self.shutdown_coordinator.register("watchdog", self.watchdog.stop, ShutdownCoordinator.CLOSE)
 		
 		for signame in ("SIGINT", "SIGTERM"):
 			self.loop.add_signal_handler(
@@ -33,32 +122,143 @@ class SorceryBot(discord.Bot):
 		"""
 		Event hadler that is triggered when the bot is ready.
 		"""
-		if self.session is None:
-			self.session = aiohttp.ClientSession()
-		print(f"Logged in as {self.user} (ID: {self.user.id})")
-		print("----------")
+		if not self.watchdog.running:
+			self.watchdog.start()
+		if self.metrics_address and self.metrics_server is None:
+			host, port = self.metrics_address.rsplit(":", 1)
+			self.metrics_server = MetricsServer(metrics, health=self.health)
+			await self.metrics_server.start(host, int(port))
+			self.shutdown_coordinator.register("metrics server", self.metrics_server.stop, ShutdownCoordinator.CLOSE)
+			_log.info("Serving metrics on http://%s/metrics", self.metrics_address)
+		_log.info("Logged in as %s (ID: %s)", self.user, self.user.id)
 	
 
-	async def close(self):
+	async def on_guild_available(self, guild: discord.Guild):
+		self.voice_listeners.seed(guild)
+	
+
+	async def on_guild_join(self, guild: discord.Guild):
+		self.voice_listeners.seed(guild)
+	
+
+	async def on_guild_remove(self, guild: discord.Guild):
+		self.voice_listeners.forget(guild.id)
+	
+
+	async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
 		"""
-		Gracefully shuts down the bot.
-		
-		This methoud triggers the `shutdown` event, waits for 10 seconds to allow any on_shutdown
-		tasks to complete, and then proceeds to close the bot connection.
+		Keeps the human listener count of the voice channels up to date.
+
+		The bot's own event handlers are scheduled before the ones of the cogs, so the count is
+		already updated when `LavaPlayer.on_voice_state_update` reads it.
 		"""
-		self.dispatch("shutdown") # triggers `on_shutdown`
-		await asyncio.sleep(2) # sleep to let `on_shutdown` to complete
-		if self.session:
-			await self.session.close()
-		print("shutting down gracefully.")
-		print("----------")
-		return await super().close()
+		self.voice_listeners.update(member, before, after)
 	
 
-	async def on_shutdown(self):
+	def load_manifest(self, extensions: tuple[str, ...]) -> dict[str, float]:
 		"""
-		Handles the shutdown event for the bot.
+		Loads the given extensions in order and returns how long each one took to load (in seconds).
+		"""
+		timings = {}
+		for extension in extensions:
+			start = time.perf_counter()
+			self.load_extension(extension)
+			timings[extension] = time.perf_counter() - start
+		return timings
+	
 
-		I think this method here might be unnecessary.
+	async def hot_reload(self, extensions: tuple[str, ...]) -> dict[str, float]:
 		"""
-		pass
+		Swaps in the current code of the services and the given extensions without disconnecting any player,
+		and returns how long each extension took to reload (in seconds).
+
+		The Lavalink players (with their queues, stored values and timeout tasks), `self.state` and the caches
+		are not part of the reloaded modules and are kept as they are. The services are reloaded first, every
+		module after the services it imports (see `_reload_order`), so services importing other services, the
+		packages re-exporting them and the reloaded cogs get the new versions. Extensions no longer in
+		`extensions` are unloaded and new ones are loaded.
+		"""
+		for name in _reload_order([name for name in sys.modules if name.startswith("services.")]):
+			importlib.reload(sys.modules[name])
+
+		for extension in [extension for extension in self.extensions if extension not in extensions]:
+			self.unload_extension(extension)
+
+		timings = {}
+		for extension in extensions:
+			start = time.perf_counter()
+			if extension in self.extensions:
+				self.reload_extension(extension)
+			else:
+				self.load_extension(extension)
+			timings[extension] = time.perf_counter() - start
+
+		await self.sync_commands()
+		return timings
+	
+
+	def health(self) -> dict:
+		"""
+		Returns the state of this process' shards and players, served at `/health` next to the metrics.
+		"""
+		return {
+			"ready": self.is_ready(),
+			"shard_ids": sorted(self.shards),
+			"shard_count": self.shard_count,
+			"latencies": {str(shard_id): latency if math.isfinite(latency) else None for shard_id, latency in self.latencies},
+			"guilds": len(self.guilds),
+			"players": len(self.lavalink.player_manager.players) if hasattr(self, "lavalink") else 0,
+			"http": self.http_client.stats(),
+			"commands": self.responses.stats(),
+		}
+	
+
+	async def get_application_context(self, interaction: discord.Interaction, cls=SorceryContext) -> discord.ApplicationContext:
+		return await super().get_application_context(interaction, cls=cls)
+	
+
+	async def invoke_application_command(self, ctx: discord.ApplicationContext):
+		"""
+		Invokes the command while measuring its latency and the number of commands in flight,
+		and logs it with its guild and latency.
+
+		The latency is recorded for the next projection of `start_response_budget`.
+		"""
+		start = time.perf_counter()
+		try:
+			async with metrics.timer("command", ctx.command.qualified_name):
+				await super().invoke_application_command(ctx)
+		finally:
+			if ctx.defer_timer:
+				ctx.defer_timer.cancel()
+			self.responses.record(ctx.command.qualified_name, time.perf_counter() - start)
+			log_latency(_log, "Command invoked", start, command=ctx.command.qualified_name, guild_id=ctx.guild_id)
+	
+
+	async def start_response_budget(self, ctx: discord.ApplicationContext):
+		"""
+		Defers the response when the command is projected to take longer than `response_budget`,
+		or once it has. Called before the command runs, after its checks passed.
+		"""
+		ctx.defer_timer = await self.responses.start(ctx)
+	
+
+	async def on_application_command_error(self, context: discord.ApplicationContext, exception: discord.DiscordException):
+		"""
+		Counts the error, then falls back to the default error handler.
+		"""
+		metrics.count_error("command", context.command.qualified_name)
+		await super().on_application_command_error(context, exception)
+	
+
+	async def close(self):
+		"""
+		Gracefully shuts down the bot.
+		
+		This method triggers the `shutdown` event, drains everything registered with the shutdown
+		coordinator (for at most `shutdown_timeout` seconds), and then proceeds to close the bot connection.
+		"""
+		self.dispatch("shutdown") # triggers `on_shutdown`
+		results = await self.shutdown_coordinator.drain(self.shutdown_timeout)
+		_log.info("Shutting down gracefully.\n%s", format_drain_report(results))
+		return await super().close()
@@ -0,0 +1,61 @@
+import asyncio
+
+import discord
+
+from .instrumentation import metrics
+from .rate_limiter import RateLimiter
+
+
+class SorceryContext(discord.ApplicationContext):
+	"""
+	The application context used for every command, so responses can be measured in one place
+	and go ahead of the notices waiting in the bot's `MessageScheduler`.
+
+	The initial response is sent under a lock, so a command responding while its response is being
+	deferred by the bot's `ResponseBudget` follows up instead of responding to the interaction twice.
+	The bot's defer is public, so an ephemeral first response of a command deferred by the bot replaces
+	the public placeholder instead of following up on it (which would show it to everyone).
+	"""
+
+	def __init__(self, bot: discord.Bot, interaction: discord.Interaction):
+		super().__init__(bot, interaction)
+		self.defer_timer: asyncio.TimerHandle | None = None # set by the bot's `ResponseBudget`
+		self._response_lock = asyncio.Lock()
+		self._auto_deferred = False # deferred by the bot and not responded to since
+
+
+	async def respond(self, *args, **kwargs):
+		async with metrics.timer("discord", "respond"):
+			await self.bot.message_scheduler.acquire(RateLimiter.HIGH)
+			async with self._response_lock:
+				if self._auto_deferred and kwargs.get("ephemeral"):
+					# the first follow-up would take the place (and visibility) of the public placeholder
+					await self.interaction.delete_original_response()
+				self._auto_deferred = False
+				return await super().respond(*args, **kwargs)
+
+
+	@property
+	def defer(self):
+		return self._defer
+
+
+	async def _defer(self, *args, **kwargs):
+		"""
+		Defers the response, unless it was already deferred (e.g. by the bot) or sent.
+		"""
+		async with self._response_lock:
+			if not self.interaction.response.is_done():
+				await self.interaction.response.defer(*args, **kwargs)
+
+
+	async def auto_defer(self) -> bool:
+		"""
+		Defers the response if the command has not responded yet, and returns whether it did.
+		"""
+		async with self._response_lock:
+			if self.interaction.response.is_done():
+				return False
+			await self.interaction.response.defer()
+			self._auto_deferred = True
+			return True
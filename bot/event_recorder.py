@@ -0,0 +1,57 @@
+import gzip
+import json
+import time
+from typing import Iterator
+
+
+class EventRecorder:
+	"""
+	Records the messages a Lavalink node sends over its WebSocket to a gzipped JSON lines file.
+
+	The first line is a header, every following line is `[offset_ms, payload]` where `offset_ms` is the
+	time since the recording started. Tracks are kept as Lavalink sends them, i.e. as encoded track strings
+	plus their info, so a recording can be replayed by `benchmarks.replay` without any other data.
+
+	Params:
+		path (str): The file to record to. An existing recording is overwritten.
+	"""
+
+	VERSION = 1
+
+	def __init__(self, path: str):
+		self.path = path
+		self.count = 0
+		self._start = time.monotonic()
+		self._file = gzip.open(path, "wt", encoding="utf-8")
+		self._file.write(json.dumps({"version": self.VERSION, "started": time.time()}) + "\n")
+
+
+	@property
+	def closed(self) -> bool:
+		return self._file.closed
+
+
+	def record(self, payload):
+		if self._file.closed:
+			return
+		offset = round((time.monotonic() - self._start) * 1000)
+		self._file.write(json.dumps([offset, payload], separators=(",", ":")) + "\n")
+		self.count += 1
+
+
+	def close(self):
+		if not self._file.closed:
+			self._file.close()
+
+
+def read_recording(path: str) -> Iterator[tuple[float, dict]]:
+	"""
+	Yields `(offset, payload)` for every message of a recording, with `offset` in seconds.
+	"""
+	with gzip.open(path, "rt", encoding="utf-8") as file:
+		header = json.loads(next(file))
+		if header.get("version") != EventRecorder.VERSION:
+			raise ValueError(f"Unsupported recording version: {header.get('version')}")
+		for line in file:
+			offset, payload = json.loads(line)
+			yield offset / 1000, payload
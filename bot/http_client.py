@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .instrumentation import metrics
+
+
+_log = logging.getLogger(__name__)
+
+
+class CircuitOpenError(aiohttp.ClientError):
+	"""
+	Raised instead of making a call while the circuit breaker of its upstream is open.
+	"""
+
+
+class ClientClosedError(aiohttp.ClientConnectionError):
+	"""
+	Raised instead of making a call once the `HttpClient` was closed (e.g. by a task still running during shutdown).
+	"""
+
+
+class CircuitBreaker:
+	"""
+	Stops calling an upstream that keeps failing.
+
+	After `failure_threshold` failed calls in a row the breaker opens and `allow` refuses every call for
+	`reset_timeout` seconds. Then a single trial call is let through (another one if it has not finished
+	after `reset_timeout`): the breaker closes again when it succeeds and stays open for another
+	`reset_timeout` when it fails.
+
+	Params:
+		failure_threshold (int): The number of failures in a row that opens the breaker.
+		reset_timeout (float): How long the breaker stays open before a trial call is let through (in seconds).
+	"""
+
+	def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+		self.failure_threshold = failure_threshold
+		self.reset_timeout = reset_timeout
+		self.failures = 0
+		self._opened_at: float | None = None
+		self._trial_at: float | None = None
+
+
+	@property
+	def state(self) -> str:
+		if self._opened_at is None:
+			return "closed"
+		if time.monotonic() - self._opened_at < self.reset_timeout:
+			return "open"
+		return "half-open"
+
+
+	def allow(self) -> bool:
+		if self._opened_at is None:
+			return True
+		now = time.monotonic()
+		if now - self._opened_at < self.reset_timeout:
+			return False
+		if self._trial_at is not None and now - self._trial_at < self.reset_timeout:
+			return False # a trial call is still running
+		self._trial_at = now
+		return True
+
+
+	def record_success(self):
+		self.failures = 0
+		self._opened_at = self._trial_at = None
+
+
+	def record_failure(self):
+		self.failures += 1
+		if self.failures >= self.failure_threshold:
+			if self._opened_at is None:
+				_log.warning("Circuit breaker opened after %d failures in a row", self.failures)
+			self._opened_at = time.monotonic()
+			self._trial_at = None
+
+
+class HttpClient:
+	"""
+	The HTTP client used for the bot's outbound calls (e.g. lrclib).
+
+	All requests share one pooled session: at most `limit` connections in total and `limit_per_host`
+	per host, kept alive for `keepalive_timeout` seconds between requests, with DNS lookups cached for
+	`dns_cache_ttl` seconds. `get_json` retries connection errors, timeouts and 429/5xx responses with
+	exponential backoff and full jitter, and goes through a circuit breaker per host so an upstream that
+	is down fails fast instead of holding up every caller.
+
+	How many connections were opened and reused per host is kept in `stats()` and counted in the metrics.
+
+	Params:
+		connect_timeout (float): How long connecting (including waiting for a pooled connection) may take (in seconds).
+		read_timeout (float): How long to wait for the response between two reads (in seconds).
+		total_timeout (float): How long one attempt may take altogether (in seconds).
+		retries (int): How often a failed request is retried.
+		backoff (float): The upper bound of the first retry delay, doubled for every further retry (in seconds).
+	"""
+
+	RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+	def __init__(
+		self,
+		limit: int = 100,
+		limit_per_host: int = 10,
+		keepalive_timeout: float = 30.0,
+		dns_cache_ttl: int = 300,
+		connect_timeout: float = 5.0,
+		read_timeout: float = 10.0,
+		total_timeout: float = 15.0,
+		retries: int = 2,
+		backoff: float = 0.25,
+		failure_threshold: int = 5,
+		reset_timeout: float = 30.0,
+	):
+		self.limit = limit
+		self.limit_per_host = limit_per_host
+		self.keepalive_timeout = keepalive_timeout
+		self.dns_cache_ttl = dns_cache_ttl
+		self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+		self.retries = retries
+		self.backoff = backoff
+		self.failure_threshold = failure_threshold
+		self.reset_timeout = reset_timeout
+
+		self.breakers: dict[str, CircuitBreaker] = {}
+		self.connections: defaultdict[str, dict[str, int]] = defaultdict(lambda: {"new": 0, "reused": 0})
+		self._session: aiohttp.ClientSession | None = None
+		self._closed = False
+
+
+	@property
+	def session(self) -> aiohttp.ClientSession:
+		"""
+		The pooled session, created on first use (it has to be created on the running loop).
+		Raises `ClientClosedError` once the client was closed, a new session would never be closed.
+		"""
+		if self._closed:
+			raise ClientClosedError("The HTTP client is closed")
+		if self._session is None or self._session.closed:
+			trace_config = aiohttp.TraceConfig()
+			trace_config.on_request_start.append(self._on_request_start)
+			trace_config.on_connection_create_end.append(self._on_connection_created)
+			trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+
+			connector = aiohttp.TCPConnector(
+				limit=self.limit,
+				limit_per_host=self.limit_per_host,
+				keepalive_timeout=self.keepalive_timeout,
+				ttl_dns_cache=self.dns_cache_ttl,
+			)
+			self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, trace_configs=[trace_config])
+		return self._session
+
+
+	def breaker(self, host: str) -> CircuitBreaker:
+		breaker = self.breakers.get(host)
+		if breaker is None:
+			breaker = self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+		return breaker
+
+
+	async def get_json(self, url: str, params: dict | None = None) -> tuple[int, object]:
+		"""
+		GETs `url` and returns the response status and, for a 2xx response, the decoded JSON body (None otherwise).
+
+		Raises `CircuitOpenError` while the breaker of the host is open, `ClientClosedError` once the client was closed,
+		or the last error once the retries are used up.
+		"""
+		session = self.session # a closed client is not a failure of the host
+		host = urlsplit(url).hostname
+		breaker = self.breaker(host)
+		if not breaker.allow():
+			metrics.count_http(host, "short_circuit")
+			raise CircuitOpenError(f"{host} is failing, not calling it for now")
+
+		try:
+			status, data = await self._get_json(session, host, url, params)
+		except Exception:
+			breaker.record_failure()
+			raise
+
+		if status in self.RETRY_STATUSES:
+			breaker.record_failure()
+		else:
+			breaker.record_success()
+		return status, data
+
+
+	async def _get_json(self, session: aiohttp.ClientSession, host: str, url: str, params: dict | None) -> tuple[int, object]:
+		for attempt in range(self.retries + 1):
+			if attempt:
+				metrics.count_http(host, "retry")
+				await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+			try:
+				async with session.get(url, params=params) as response:
+					if response.status in self.RETRY_STATUSES and attempt < self.retries:
+						continue
+					data = await response.json(content_type=None) if 200 <= response.status < 300 else None
+					return response.status, data
+			except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+				if attempt == self.retries:
+					raise
+
+
+	def stats(self) -> dict:
+		"""
+		Returns the connections opened and reused, and the state of the circuit breaker, per host.
+		"""
+		return {
+			host: {**self.connections.get(host, {"new": 0, "reused": 0}), "breaker": self.breaker(host).state}
+			for host in {*self.connections, *self.breakers}
+		}
+
+
+	async def close(self):
+		self._closed = True
+		if self._session:
+			await self._session.close()
+
+
+	async def _on_request_start(self, session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestStartParams):
+		context.host = params.url.host
+
+
+	async def _on_connection_created(self, session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionCreateEndParams):
+		self.connections[context.host]["new"] += 1
+		metrics.count_http(context.host, "new_connection")
+
+
+	async def _on_connection_reused(self, session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionReuseconnParams):
+		self.connections[context.host]["reused"] += 1
+		metrics.count_http(context.host, "reused_connection")
+
+
+def requests_session(pool_size: int = 10, retries: int = 2, backoff: float = 0.25, timeout: tuple[float, float] = (5.0, 10.0)):
+	"""
+	Returns a `requests.Session` for the libraries that make their calls with `requests` (ytmusicapi), with a
+	pool of `pool_size` kept-alive connections per host, default (connect, read) timeouts and retries with jitter.
+
+	`requests` is only imported when this is called.
+	"""
+	import requests
+	from requests.adapters import HTTPAdapter
+	from urllib3.util.retry import Retry
+
+	class TimeoutAdapter(HTTPAdapter):
+
+		def send(self, request, **kwargs):
+			if kwargs.get("timeout") is None:
+				kwargs["timeout"] = timeout
+			return super().send(request, **kwargs)
+
+	retry = Retry(
+		total=retries,
+		backoff_factor=backoff,
+		backoff_jitter=backoff,
+		status_forcelist=HttpClient.RETRY_STATUSES,
+		allowed_methods=None, # ytmusicapi only reads, but does so with POST requests
+		raise_on_status=False,
+	)
+	adapter = TimeoutAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+	session = requests.Session()
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	return session
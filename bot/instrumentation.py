@@ -0,0 +1,240 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class Metrics:
+	"""
+	Latency histograms, error counters and in-flight gauges for commands and external calls.
+
+	Every measurement is keyed by a `kind` (e.g. "command", "lavalink", "lrclib") and a `name`
+	(e.g. "play", "get_tracks"). While `enabled` is False, `timer` hands out a shared no-op timer
+	and `timed` only adds an attribute lookup to the wrapped coroutine.
+
+	Attributes:
+		BUCKETS (tuple): The upper bounds (in seconds) of the histogram buckets.
+	"""
+
+	BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+	def __init__(self):
+		self.enabled = False
+		self.histograms: dict[tuple[str, str], Histogram] = {}
+		self.errors: defaultdict[tuple[str, str], int] = defaultdict(int)
+		self.in_flight: defaultdict[tuple[str, str], int] = defaultdict(int)
+		self.http_events: defaultdict[tuple[str, str], int] = defaultdict(int)
+		self.deferrals: defaultdict[tuple[str, str], int] = defaultdict(int)
+
+
+	def timer(self, kind: str, name: str):
+		"""
+		Returns a context manager (usable with both `with` and `async with`) that measures its body.
+
+		An exception raised inside the body is counted as an error.
+		"""
+		if not self.enabled:
+			return _NULL_TIMER
+		return _Timer(self, (kind, name))
+
+
+	def timed(self, kind: str, name: str):
+		"""
+		Decorator version of `timer` for coroutine functions.
+		"""
+		def decorator(func):
+			@functools.wraps(func)
+			async def wrapper(*args, **kwargs):
+				if not self.enabled:
+					return await func(*args, **kwargs)
+				with _Timer(self, (kind, name)):
+					return await func(*args, **kwargs)
+			return wrapper
+		return decorator
+
+
+	def observe(self, kind: str, name: str, seconds: float):
+		histogram = self.histograms.get((kind, name))
+		if histogram is None:
+			histogram = self.histograms[(kind, name)] = Histogram(self.BUCKETS)
+		histogram.observe(seconds)
+
+
+	def count_error(self, kind: str, name: str):
+		if self.enabled:
+			self.errors[(kind, name)] += 1
+
+
+	def count_http(self, host: str, event: str):
+		"""
+		Counts an event of the outbound HTTP client, e.g. "new_connection", "reused_connection", "retry" or "short_circuit".
+		"""
+		if self.enabled:
+			self.http_events[(host, event)] += 1
+
+
+	def count_deferral(self, command: str, reason: str):
+		"""
+		Counts a command response deferred because the command was projected to be slow ("projected") or used up its budget ("budget").
+		"""
+		if self.enabled:
+			self.deferrals[(command, reason)] += 1
+
+
+	def render(self) -> str:
+		"""
+		Renders every metric in the Prometheus text exposition format.
+		"""
+		lines = [
+			"# HELP sorcery_latency_seconds Latency of commands and external calls.",
+			"# TYPE sorcery_latency_seconds histogram",
+		]
+
+		for (kind, name), histogram in sorted(self.histograms.items()):
+			labels = f'kind="{kind}",name="{name}"'
+			cumulative = 0
+			for bound, count in zip(histogram.bounds, histogram.counts):
+				cumulative += count
+				lines.append(f'sorcery_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+			lines.append(f'sorcery_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+			lines.append(f"sorcery_latency_seconds_sum{{{labels}}} {histogram.sum}")
+			lines.append(f"sorcery_latency_seconds_count{{{labels}}} {histogram.count}")
+
+		lines.append("# HELP sorcery_errors_total Commands and external calls that raised an error.")
+		lines.append("# TYPE sorcery_errors_total counter")
+		for (kind, name), count in sorted(self.errors.items()):
+			lines.append(f'sorcery_errors_total{{kind="{kind}",name="{name}"}} {count}')
+
+		lines.append("# HELP sorcery_in_flight Commands and external calls currently running.")
+		lines.append("# TYPE sorcery_in_flight gauge")
+		for (kind, name), count in sorted(self.in_flight.items()):
+			lines.append(f'sorcery_in_flight{{kind="{kind}",name="{name}"}} {count}')
+
+		lines.append("# HELP sorcery_http_events_total Connections opened and reused, retries and short-circuited calls of outbound HTTP requests.")
+		lines.append("# TYPE sorcery_http_events_total counter")
+		for (host, event), count in sorted(self.http_events.items()):
+			lines.append(f'sorcery_http_events_total{{host="{host}",event="{event}"}} {count}')
+
+		lines.append("# HELP sorcery_deferred_responses_total Command responses deferred to stay within Discord's response window.")
+		lines.append("# TYPE sorcery_deferred_responses_total counter")
+		for (command, reason), count in sorted(self.deferrals.items()):
+			lines.append(f'sorcery_deferred_responses_total{{command="{command}",reason="{reason}"}} {count}')
+
+		return "\n".join(lines) + "\n"
+
+
+class Histogram:
+	"""
+	A fixed-bucket latency histogram. `counts[i]` holds the observations in bucket `i` only
+	(not cumulative), the last slot holding the ones above every bound.
+	"""
+
+	__slots__ = ("bounds", "counts", "sum", "count")
+
+	def __init__(self, bounds: tuple):
+		self.bounds = bounds
+		self.counts = [0] * (len(bounds) + 1)
+		self.sum = 0.0
+		self.count = 0
+
+
+	def observe(self, seconds: float):
+		self.counts[bisect_left(self.bounds, seconds)] += 1
+		self.sum += seconds
+		self.count += 1
+
+
+class _Timer:
+
+	__slots__ = ("metrics", "key", "start")
+
+	def __init__(self, metrics: Metrics, key: tuple[str, str]):
+		self.metrics = metrics
+		self.key = key
+
+
+	def __enter__(self):
+		self.metrics.in_flight[self.key] += 1
+		self.start = time.perf_counter()
+		return self
+
+
+	def __exit__(self, exc_type, exc, tb):
+		self.metrics.in_flight[self.key] -= 1
+		self.metrics.observe(*self.key, time.perf_counter() - self.start)
+		if exc_type is not None:
+			self.metrics.errors[self.key] += 1
+		return False
+
+
+	async def __aenter__(self):
+		return self.__enter__()
+
+
+	async def __aexit__(self, exc_type, exc, tb):
+		return self.__exit__(exc_type, exc, tb)
+
+
+class _NullTimer:
+
+	__slots__ = ()
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, exc_type, exc, tb):
+		return False
+
+
+	async def __aenter__(self):
+		return self
+
+
+	async def __aexit__(self, exc_type, exc, tb):
+		return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsServer:
+	"""
+	A small local HTTP server exposing `Metrics.render()` at `/metrics` and, if a `health` callable
+	is given, its result as JSON at `/health`.
+
+	`aiohttp.web` is only imported once the server is started.
+	"""
+
+	def __init__(self, metrics: Metrics, health=None):
+		self.metrics = metrics
+		self.health = health
+		self._runner = None
+
+
+	async def start(self, host: str, port: int):
+		from aiohttp import web
+
+		async def handle_metrics(request: web.Request) -> web.Response:
+			return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
+
+		async def handle_health(request: web.Request) -> web.Response:
+			return web.json_response(self.health())
+
+		app = web.Application()
+		app.router.add_get("/metrics", handle_metrics)
+		if self.health:
+			app.router.add_get("/health", handle_health)
+
+		self._runner = web.AppRunner(app, access_log=None)
+		await self._runner.setup()
+		await web.TCPSite(self._runner, host, port).start()
+
+
+	async def stop(self):
+		if self._runner:
+			await self._runner.cleanup()
+			self._runner = None
+
+
+metrics = Metrics()
@@ -1,10 +1,16 @@
 # loading lavalink credentials from .env
+import logging
 import os
 from dotenv import load_dotenv
 
 import discord
 import lavalink
 
+from .player import SorceryPlayer
+
+
+_log = logging.getLogger(__name__)
+
 
 class LavalinkVoiceClient(discord.VoiceProtocol):
 	"""
@@ -29,7 +35,7 @@ class LavalinkVoiceClient(discord.VoiceProtocol):
 			lavalink_address = os.getenv('LAVALINK_SERVER_ADDRESS')
 			host, port = lavalink_address.split(':') # the 'https://' part may cause trouble
 			password = os.getenv('LAVALINK_SERVER_PASSWORD')
-			self.client.lavalink = lavalink.Client(client.user.id)
+			self.client.lavalink = lavalink.Client(client.user.id, player=SorceryPlayer, request_timeout=self.client.http_client.timeout)
 			self.client.lavalink.add_node(
 				host=host,
 				port=port,
@@ -38,7 +44,7 @@ class LavalinkVoiceClient(discord.VoiceProtocol):
 				name='default-node'
 			)
 
-			print("Node added")
+			_log.info("Node added")
 		
 		# Create a shortcut to the Lavalink client here.
 		self.lavalink = self.client.lavalink
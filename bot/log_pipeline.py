@@ -0,0 +1,119 @@
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+
+# the attributes every `LogRecord` has, anything else was passed with `extra=` and ends up in the JSON record
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+	"""
+	Formats a record as one JSON object per line: `ts`, `level`, `logger` and `message`, the `exc` traceback
+	if there is one, plus every field passed with `extra=` (e.g. `guild_id`, `command`, `latency_ms`).
+	"""
+
+	def format(self, record: logging.LogRecord) -> str:
+		data = {
+			"ts": round(record.created, 3),
+			"level": record.levelname,
+			"logger": record.name,
+			"message": record.getMessage(),
+		}
+		data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+		if record.exc_info and not record.exc_text:
+			record.exc_text = self.formatException(record.exc_info)
+		if record.exc_text:
+			data["exc"] = record.exc_text
+		return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+	"""
+	Keeps only every n-th record of high frequency events, e.g. `{"PlayerUpdateEvent": 100}` keeps one in
+	100 player updates. Records are matched by their `event` field, kept ones get `sampled=n` so readers
+	can scale the counts back up. Records without a sampled event always pass.
+	"""
+
+	def __init__(self, rates: dict[str, int]):
+		super().__init__()
+		self.rates = rates
+		self._counters = {event: itertools.count() for event in rates}
+
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		rate = self.rates.get(getattr(record, "event", None))
+		if not rate or rate <= 1:
+			return True
+		if next(self._counters[record.event]) % rate:
+			return False
+		record.sampled = rate
+		return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+	"""
+	Leaves the formatting to the handlers behind the queue, only resolving what cannot cross threads:
+	the message arguments and the exception (as text).
+	"""
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		record.msg = record.getMessage()
+		record.args = None
+		if record.exc_info:
+			record.exc_text = logging.Formatter().formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+def setup_logging(
+	path: str = "discord.log",
+	level: int | str = logging.INFO,
+	max_bytes: int = 10 * 2 ** 20,
+	backups: int = 5,
+	json_format: bool = True,
+	sample_rates: dict[str, int] | None = None,
+	console: bool = True,
+) -> logging.handlers.QueueListener:
+	"""
+	Routes every log record through a queue to a background thread that does the writing, so logging never
+	blocks the event loop on file I/O. The file is rotated once it reaches `max_bytes`, keeping `backups`
+	old files, and written as JSON lines unless `json_format` is False. With `console`, records are also
+	printed to stderr in the plain format.
+
+	Returns the started listener, `stop()` it on exit to write out what is still queued.
+	"""
+	file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+	plain = logging.Formatter("%(asctime)s:%(levelname)s:%(name)s: %(message)s")
+	file_handler.setFormatter(JsonFormatter() if json_format else plain)
+	handlers = [file_handler]
+
+	if console:
+		console_handler = logging.StreamHandler(sys.stderr)
+		console_handler.setFormatter(plain)
+		handlers.append(console_handler)
+
+	log_queue = queue.SimpleQueue()
+	queue_handler = _QueueHandler(log_queue)
+	if sample_rates:
+		queue_handler.addFilter(SamplingFilter(sample_rates))
+
+	root = logging.getLogger()
+	root.setLevel(level)
+	root.addHandler(queue_handler)
+
+	listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+	listener.start()
+	return listener
+
+
+def log_latency(logger: logging.Logger, message: str, start: float, level: int = logging.INFO, **fields):
+	"""
+	Logs `message` with the time since `start` (a `time.perf_counter()` value) as `latency_ms`, and `fields` as extras.
+	"""
+	if logger.isEnabledFor(level):
+		logger.log(level, message, extra={**fields, "latency_ms": round((time.perf_counter() - start) * 1000, 2)})
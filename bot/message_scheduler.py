@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from .rate_limiter import RateLimiter, RateLimitExceeded
+
+
+_log = logging.getLogger(__name__)
+
+
+class MessageScheduler:
+	"""
+	Schedules the messages the bot sends, so command responses are not held up behind notices when
+	many guilds are active at once.
+
+	Every command response and channel message takes a token from one process-wide `RateLimiter`, kept below
+	Discord's global rate limit. The limit is per bot, a process that is one of several workers has to be
+	given its share of it. Command responses (`SorceryContext.respond`) take theirs with `HIGH`
+	priority and go first. Informational notices (`notify`) take `LOW` priority ones: notices for a channel
+	that pile up while waiting are merged into one message, and notices that could not be sent within
+	their `ttl` are dropped, as they would arrive too late to be of any use.
+
+	Params:
+		rate (float): The number of messages per second (Discord allows 50 requests per second per bot).
+		burst (int): The number of messages that can be sent at once after a quiet period.
+		ttl (float): How long a notice may wait to be sent before it is dropped (in seconds).
+	"""
+
+	def __init__(self, rate: float = 40, burst: int = 40, ttl: float = 10.0):
+		self.limiter = RateLimiter("discord.com", rate, burst)
+		self.ttl = ttl
+		self.dropped = 0
+		self._batches: dict[int, list[str]] = {}
+		self._tasks: set[asyncio.Task] = set()
+
+
+	async def acquire(self, priority: int = RateLimiter.LOW, max_wait: float | None = None):
+		"""
+		Waits for a message slot, for the sends that do not go through `notify` (e.g. message edits).
+		Raises `RateLimitExceeded` if the slot would take longer than `max_wait`.
+		"""
+		await self.limiter.acquire(priority, max_wait)
+
+
+	def notify(self, channel: discord.abc.Messageable, content: str, ttl: float | None = None):
+		"""
+		Sends an informational message to `channel` in the background.
+		"""
+		batch = self._batches.get(channel.id)
+		if batch is not None:
+			batch.append(content) # goes out with the notices already waiting for this channel
+			return
+
+		self._batches[channel.id] = [content]
+		task = asyncio.create_task(self._deliver(channel, time.monotonic() + (self.ttl if ttl is None else ttl)))
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+
+
+	async def flush(self):
+		"""
+		Waits for the notices already scheduled to be sent or dropped.
+		"""
+		if self._tasks:
+			await asyncio.wait(list(self._tasks))
+
+
+	async def _deliver(self, channel: discord.abc.Messageable, expires: float):
+		try:
+			await self.limiter.acquire(RateLimiter.LOW, max(0.0, expires - time.monotonic()))
+		except RateLimitExceeded:
+			self.dropped += len(self._batches.pop(channel.id))
+			return
+
+		content = "\n".join(self._batches.pop(channel.id))
+		try:
+			await channel.send(content[:2000])
+		except discord.HTTPException as e:
+			_log.warning("Notice could not be sent to %s: %s", channel.id, e)
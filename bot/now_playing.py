@@ -0,0 +1,58 @@
+import discord
+
+from .message_scheduler import MessageScheduler
+from .rate_limiter import RateLimiter, RateLimitExceeded
+from .utils import Debouncer
+
+
+class NowPlayingPanels:
+	"""
+	One "Now Playing" message per guild that is edited for every track, instead of a new message each time.
+
+	Updates go through a `Debouncer`, so a guild's panel is edited at most once every `interval` seconds
+	and only the latest embed of a burst (e.g. rapid skips) is shown. A new message is only sent when the
+	guild has no panel yet, the old one was deleted, or the player has moved to another text channel.
+	Panels are informational, an update that has to wait longer than the scheduler's `ttl` is dropped.
+
+	Params:
+		interval (float): The minimum time between two edits of a guild's panel (in seconds).
+		scheduler (MessageScheduler): The scheduler the edits and messages have to take a slot from.
+	"""
+
+	def __init__(self, interval: float = 2.0, scheduler: MessageScheduler | None = None):
+		self.scheduler = scheduler or MessageScheduler()
+		self._debouncer = Debouncer(interval)
+		self._messages: dict[int, tuple[int, discord.Message]] = {}
+
+
+	def show(self, guild_id: int, channel: discord.abc.Messageable, embed: discord.Embed):
+		self._debouncer.schedule(guild_id, lambda: self._update(guild_id, channel, embed))
+
+
+	def forget(self, guild_id: int):
+		"""
+		Drops the panel of a guild (e.g. when the player disconnects), the next track gets a new message.
+		"""
+		self._debouncer.cancel(guild_id)
+		self._messages.pop(guild_id, None)
+
+
+	async def flush(self):
+		await self._debouncer.flush()
+
+
+	async def _update(self, guild_id: int, channel: discord.abc.Messageable, embed: discord.Embed):
+		try:
+			await self.scheduler.acquire(RateLimiter.LOW, self.scheduler.ttl)
+		except RateLimitExceeded:
+			return # stale by now, the next track's update will try again
+
+		channel_id, message = self._messages.get(guild_id, (None, None))
+		if message is not None and channel_id == channel.id:
+			try:
+				await message.edit(embed=embed)
+				return
+			except discord.NotFound:
+				pass # deleted, send a new one
+
+		self._messages[guild_id] = (channel.id, await channel.send(embed=embed))
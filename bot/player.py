@@ -0,0 +1,682 @@
+import asyncio
+import random
+from collections import Counter, deque
+from itertools import islice
+from time import monotonic
+
+import lavalink
+
+
+class GuildSession:
+	"""
+	What the bot keeps about a guild's player next to Lavalink's own player state: the text channel it is
+	bound to, the play history, autoplay, the timeout tasks and the filter caches.
+
+	Every field is a slot, so a session costs the same for every guild and a misspelled field is an error.
+	"""
+
+	__slots__ = (
+		"channel_id",
+		"history",
+		"autoplay",
+		"autoplay_track",
+		"empty_channel_timeout_task",
+		"inactive_player_timeout_task",
+		"filter_version",
+		"filter_stats_pages",
+	)
+
+	def __init__(self):
+		self.reset(None)
+		self.filter_version = 0 # bumped on every filter change, invalidates `filter_stats_pages`
+		self.filter_stats_pages: tuple[int, object] | None = None # (filter_version, LazyPages)
+
+
+	def reset(self, channel_id: int | None):
+		"""
+		Starts a new session bound to the text channel `channel_id`, e.g. when the player joins a voice channel.
+		"""
+		self.channel_id = channel_id
+		self.history: list[lavalink.AudioTrack] = [] # the most recent track first
+		self.autoplay = False
+		self.autoplay_track: lavalink.AudioTrack | None = None # queued once the queue runs out
+		self.empty_channel_timeout_task: asyncio.Task | None = None
+		self.inactive_player_timeout_task: asyncio.Task | None = None
+
+
+	def timeout_tasks(self) -> list[asyncio.Task]:
+		return [task for task in (self.empty_channel_timeout_task, self.inactive_player_timeout_task) if task and not task.done()]
+
+
+def _length(track: lavalink.AudioTrack) -> int:
+	return 0 if track.stream else track.duration # a stream has no end
+
+
+class _PositionIndex:
+	"""
+	The positions of the tracks of a sequence by identifier, so where a track is in it is found without a scan.
+
+	Adding tracks at either end and taking them from either end keep it up to date. Any other change drops it,
+	and it is rebuilt with one pass over the sequence the next time it is needed.
+	"""
+
+	__slots__ = ("_positions", "_base")
+
+	def __init__(self):
+		self.drop()
+
+
+	def drop(self):
+		self._positions: dict[str, deque[int]] | None = None # identifier -> `_base` + index of each of its tracks, None until rebuilt
+		self._base = 0 # moves with the tracks added to and taken from the front
+
+
+	def first(self, identifier: str, tracks) -> int | None:
+		"""
+		Returns the index of the first track with `identifier` in `tracks`, the indexed sequence, None if there is none.
+		"""
+		if self._positions is None:
+			self._positions = {}
+			self._base = 0
+			for idx, track in enumerate(tracks):
+				self._positions_of(track).append(idx)
+		positions = self._positions.get(identifier)
+		return positions[0] - self._base if positions else None
+
+
+	def appended(self, track: lavalink.AudioTrack, length: int):
+		"""
+		Adds the position of `track`, just appended to the end of the `length` tracks of the sequence.
+		"""
+		if self._positions is not None:
+			self._positions_of(track).append(self._base + length - 1)
+
+
+	def prepended(self, track: lavalink.AudioTrack):
+		"""
+		Adds the position of `track`, just inserted at the front of the sequence.
+		"""
+		if self._positions is not None:
+			self._base -= 1
+			self._positions_of(track).appendleft(self._base)
+
+
+	def taken(self, track: lavalink.AudioTrack, index: int, length: int):
+		"""
+		Removes the position of `track`, just taken from `index`, leaving `length` tracks in the sequence.
+		"""
+		if self._positions is None:
+			return
+		positions = self._positions[track.identifier]
+		if index == 0: # the first track, the first of its identifier
+			self._base += 1
+			positions.popleft()
+		elif index == length: # the last track, the last of its identifier
+			positions.pop()
+		else:
+			self._positions = None
+			return
+
+		if not positions:
+			del self._positions[track.identifier]
+
+
+	def _positions_of(self, track: lavalink.AudioTrack) -> deque[int]:
+		positions = self._positions.get(track.identifier)
+		if positions is None:
+			positions = self._positions[track.identifier] = deque()
+		return positions
+
+
+class _QueueAggregates:
+	"""
+	Keeps aggregates of a queue's tracks up to date as tracks are added and removed, so rendering them
+	costs the same for a queue of any length:
+
+	- `duration`: the total duration (in milliseconds), streams count as 0.
+	- `requesters`: the number of tracks per requester (user ID, 0 for autoplay tracks). A queued track's
+	  requester must not change, `SorceryPlayer.add` adds a copy of a track that is already queued.
+	- `sources`: the number of tracks per source (e.g. "youtube", "spotify").
+	- `identifiers`: the number of tracks per identifier, so a duplicate is spotted without a scan.
+
+	`position` finds where a track is queued from the `_PositionIndex` of the queue, which adding tracks at
+	either end and taking them from the front (playing them) keep up to date.
+	"""
+
+	__slots__ = ()
+
+	def _reset_aggregates(self):
+		self.duration = 0
+		self.requesters: Counter[int] = Counter()
+		self.sources: Counter[str] = Counter()
+		self.identifiers: Counter[str] = Counter()
+		self._index = _PositionIndex()
+
+
+	def position(self, identifier: str) -> int | None:
+		"""
+		Returns the index of the first track with `identifier` in playback order, None if it is not queued.
+		"""
+		if identifier not in self.identifiers:
+			return None
+		return self._index.first(identifier, self)
+
+
+	def _add(self, track: lavalink.AudioTrack):
+		self.duration += _length(track)
+		self.requesters[track.requester] += 1
+		self.sources[track.source_name] += 1
+		self.identifiers[track.identifier] += 1
+
+
+	def _remove(self, track: lavalink.AudioTrack):
+		self.duration -= _length(track)
+		for counter, key in ((self.requesters, track.requester), (self.sources, track.source_name), (self.identifiers, track.identifier)):
+			if counter[key] > 1:
+				counter[key] -= 1
+			else:
+				counter.pop(key, None) # only the requesters, sources and identifiers still in the queue are kept
+
+
+	def _added(self, tracks):
+		for track in tracks:
+			self._add(track)
+
+
+	def _removed(self, tracks):
+		for track in tracks:
+			self._remove(track)
+
+
+class TrackQueue(_QueueAggregates, list):
+	"""
+	The player's queue, a list that keeps the aggregates of its tracks (see `_QueueAggregates`).
+	"""
+
+	__slots__ = ("duration", "requesters", "sources", "identifiers", "_index")
+
+	def __init__(self, tracks=()):
+		super().__init__(tracks)
+		self._reset_aggregates()
+		self._added(self)
+
+
+	def append(self, track: lavalink.AudioTrack):
+		super().append(track)
+		self._add(track)
+		self._index.appended(track, len(self))
+
+
+	def insert(self, index: int, track: lavalink.AudioTrack):
+		if index >= len(self):
+			return self.append(track)
+		super().insert(index, track)
+		self._add(track)
+		if index == 0: # e.g. `/replay`, or the current track on loop
+			self._index.prepended(track)
+		else:
+			self._index.drop()
+
+
+	def extend(self, tracks):
+		for track in tracks:
+			self.append(track)
+
+
+	def __iadd__(self, tracks):
+		self.extend(tracks)
+		return self
+
+
+	def __imul__(self, count: int):
+		tracks = list(self)
+		super().__imul__(count)
+		self._removed(tracks)
+		self._added(self)
+		self._index.drop()
+		return self
+
+
+	def pop(self, index: int = -1) -> lavalink.AudioTrack:
+		index = range(len(self))[index]
+		track = super().pop(index)
+		self._remove(track)
+		self._index.taken(track, index, len(self))
+		return track
+
+
+	def remove(self, track: lavalink.AudioTrack):
+		super().remove(track)
+		self._remove(track)
+		self._index.drop()
+
+
+	def clear(self):
+		super().clear()
+		self._reset_aggregates()
+
+
+	def sort(self, *args, **kwargs):
+		super().sort(*args, **kwargs)
+		self._index.drop()
+
+
+	def reverse(self):
+		super().reverse()
+		self._index.drop()
+
+
+	def __setitem__(self, key, value):
+		if isinstance(key, slice):
+			value = list(value)
+			self._removed(self[key])
+			super().__setitem__(key, value)
+			self._added(value)
+		else:
+			self._removed((self[key],))
+			super().__setitem__(key, value)
+			self._added((value,))
+		self._index.drop()
+
+
+	def __delitem__(self, key):
+		self._removed(self[key] if isinstance(key, slice) else (self[key],))
+		super().__delitem__(key)
+		self._index.drop()
+
+
+class FairQueue(_QueueAggregates):
+	"""
+	The player's queue in fair mode: every requester has a queue of their own, and the requesters take turns,
+	so one requester's playlist does not hold up everybody else's tracks. A requester whose track was played
+	moves to the back of the line. Tracks inserted at the front (e.g. by `/replay`, or the current track on
+	loop) are played first, regardless of the turns.
+
+	Enqueuing and taking the next track are O(1). Iterating and indexing follow the playback order, which is
+	worked out while iterating, so looking at the first tracks only costs as much as those tracks. It keeps
+	the same aggregates as `TrackQueue` (see `_QueueAggregates`) and takes the place of one in the player.
+
+	The tracks inserted at the front and every requester's queue have a `_PositionIndex` of their own, so
+	`position` works out where a track is queued from the lengths of the requesters' queues, without
+	iterating the queue.
+	"""
+
+	__slots__ = ("duration", "requesters", "sources", "identifiers", "_index", "_indexes", "_length", "_next", "_queues", "_turns")
+
+	def __init__(self, tracks=()):
+		self.clear()
+		self.extend(tracks)
+
+
+	def __len__(self) -> int:
+		return self._length
+
+
+	def __iter__(self):
+		yield from self._next
+		queues = deque(iter(self._queues[requester]) for requester in self._turns)
+		while queues:
+			track = next(queues[0], None)
+			if track is None:
+				queues.popleft() # this requester has nothing left
+				continue
+			yield track
+			queues.rotate(-1)
+
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(self._length)
+			if step < 0:
+				return list(self)[index]
+			return list(islice(self, start, stop, step))
+
+		index = range(self._length)[index] # normalizes negative indices and raises IndexError when out of range
+		return next(islice(self, index, None))
+
+
+	def __delitem__(self, index):
+		for track in (self[index] if isinstance(index, slice) else (self[index],)):
+			self.remove(track)
+
+
+	def position(self, identifier: str) -> int | None:
+		"""
+		Returns the index of the first track with `identifier` in playback order, None if it is not queued.
+		"""
+		if identifier not in self.identifiers:
+			return None
+		index = self._index.first(identifier, self._next)
+		if index is not None:
+			return index
+
+		lengths = [len(self._queues[requester]) for requester in self._turns]
+		first = None
+		for turn, requester in enumerate(self._turns):
+			nth = self._indexes[requester].first(identifier, self._queues[requester])
+			if nth is None:
+				continue
+			# the track is played in the `nth` round of turns, after the tracks of the rounds before it
+			# and the tracks of this round of the requesters ahead in line
+			index = len(self._next) + sum(min(length, nth) for length in lengths) + sum(1 for length in lengths[:turn] if length > nth)
+			if first is None or index < first:
+				first = index
+		return first
+
+
+	def append(self, track: lavalink.AudioTrack):
+		queue = self._queues.get(track.requester)
+		if queue is None:
+			queue = self._queues[track.requester] = deque()
+			self._indexes[track.requester] = _PositionIndex()
+			self._turns.append(track.requester)
+		queue.append(track)
+		self._indexes[track.requester].appended(track, len(queue))
+		self._length += 1
+		self._add(track)
+
+
+	def extend(self, tracks):
+		for track in tracks:
+			self.append(track)
+
+
+	def insert(self, index: int, track: lavalink.AudioTrack):
+		"""
+		Inserts `track` among the tracks inserted at the front, or adds it to its requester's queue when `index` is past them.
+		"""
+		if index > len(self._next):
+			return self.append(track)
+		index = max(index, 0)
+		self._next.insert(index, track)
+		if index == 0:
+			self._index.prepended(track)
+		elif index == len(self._next) - 1:
+			self._index.appended(track, len(self._next))
+		else:
+			self._index.drop()
+		self._length += 1
+		self._add(track)
+
+
+	def pop(self, index: int = -1) -> lavalink.AudioTrack:
+		index = range(self._length)[index]
+		if index < len(self._next):
+			track = self._next[index]
+			del self._next[index]
+			self._index.taken(track, index, len(self._next))
+		elif index == len(self._next): # the next track in turn
+			requester = self._turns.popleft()
+			queue = self._queues[requester]
+			track = queue.popleft()
+			self._indexes[requester].taken(track, 0, len(queue))
+			if queue:
+				self._turns.append(requester)
+			else:
+				del self._queues[requester]
+				del self._indexes[requester]
+		else:
+			track = self[index]
+			self._remove_queued(track)
+
+		self._length -= 1
+		self._remove(track)
+		return track
+
+
+	def remove(self, track: lavalink.AudioTrack):
+		if track in self._next:
+			index = self._next.index(track)
+			del self._next[index]
+			self._index.taken(track, index, len(self._next))
+		else:
+			self._remove_queued(track) # raises ValueError when `track` is not in the queue
+		self._length -= 1
+		self._remove(track)
+
+
+	def clear(self):
+		self._reset_aggregates()
+		self._length = 0
+		self._next: deque[lavalink.AudioTrack] = deque()
+		self._queues: dict[int, deque[lavalink.AudioTrack]] = {}
+		self._indexes: dict[int, _PositionIndex] = {} # the index of every requester's queue
+		self._turns: deque[int] = deque() # the requesters with queued tracks, the one whose turn it is first
+
+
+	def _remove_queued(self, track: lavalink.AudioTrack):
+		queue = self._queues.get(track.requester)
+		if queue is None:
+			raise ValueError("track is not in the queue")
+		index = queue.index(track)
+		del queue[index]
+		self._indexes[track.requester].taken(track, index, len(queue))
+		if not queue:
+			del self._queues[track.requester]
+			del self._indexes[track.requester]
+			self._turns.remove(track.requester)
+
+
+class ShuffledQueue(_QueueAggregates):
+	"""
+	The player's queue while shuffled: its tracks played in the order of a permutation drawn once from `seed`,
+	so the same seed shuffles the same queue the same way. Iterating and indexing follow the permutation,
+	which is the order the tracks are played in.
+
+	The permutation is a deque kept up to date as tracks are added (`append` adds them at the end, `insert`
+	where it is told) and taken, so taking the next track is O(1). Every track keeps the number it was added
+	under, and unshuffling (`unshuffled`) sorts the tracks back into the order they were added in. It keeps
+	the same aggregates as `TrackQueue` (see `_QueueAggregates`).
+	"""
+
+	__slots__ = ("duration", "requesters", "sources", "identifiers", "_index", "seed", "_order", "_sequence", "_count")
+
+	def __init__(self, tracks, seed: int):
+		self.seed = seed
+		self._reset_aggregates()
+		order = list(tracks)
+		self._sequence: dict[int, int] = {id(track): idx for idx, track in enumerate(order)} # id of every track -> the number it was added under
+		self._count = len(order)
+		random.Random(seed).shuffle(order)
+		self._order: deque[lavalink.AudioTrack] = deque(order)
+		self._added(order)
+
+
+	def __len__(self) -> int:
+		return len(self._order)
+
+
+	def __iter__(self):
+		return iter(self._order)
+
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self._order))
+			if step < 0:
+				return list(self._order)[index]
+			return list(islice(self._order, start, stop, step))
+		return self._order[index]
+
+
+	def __delitem__(self, index):
+		if not isinstance(index, slice):
+			self.pop(index)
+			return
+		tracks = self[index]
+		taken = {id(track) for track in tracks}
+		self._order = deque(track for track in self._order if id(track) not in taken)
+		for track in tracks:
+			del self._sequence[id(track)]
+		self._removed(tracks)
+		self._index.drop()
+
+
+	def append(self, track: lavalink.AudioTrack):
+		self._sequence[id(track)] = self._count
+		self._count += 1
+		self._order.append(track)
+		self._add(track)
+		self._index.appended(track, len(self._order))
+
+
+	def extend(self, tracks):
+		for track in tracks:
+			self.append(track)
+
+
+	def insert(self, index: int, track: lavalink.AudioTrack):
+		if index >= len(self._order):
+			return self.append(track)
+		self._sequence[id(track)] = self._count
+		self._count += 1
+		self._order.insert(index, track)
+		self._add(track)
+		if index == 0:
+			self._index.prepended(track)
+		else:
+			self._index.drop()
+
+
+	def pop(self, index: int = -1) -> lavalink.AudioTrack:
+		index = range(len(self._order))[index]
+		if index == 0:
+			track = self._order.popleft()
+		elif index == len(self._order) - 1:
+			track = self._order.pop()
+		else:
+			track = self._order[index]
+			del self._order[index]
+		del self._sequence[id(track)]
+		self._remove(track)
+		self._index.taken(track, index, len(self._order))
+		return track
+
+
+	def remove(self, track: lavalink.AudioTrack):
+		self._order.remove(track) # raises ValueError when `track` is not in the queue
+		del self._sequence[id(track)]
+		self._remove(track)
+		self._index.drop()
+
+
+	def clear(self):
+		self._reset_aggregates()
+		self._order.clear()
+		self._sequence.clear()
+
+
+	def unshuffled(self) -> TrackQueue:
+		"""
+		Returns the tracks as a `TrackQueue`, in the order they were added in.
+		"""
+		return TrackQueue(sorted(self._order, key=lambda track: self._sequence[id(track)]))
+
+
+class SorceryPlayer(lavalink.DefaultPlayer):
+	"""
+	The player class of the bot's Lavalink client, a `lavalink.DefaultPlayer` with the guild's `GuildSession`
+	attached and a `TrackQueue` as its queue (a `FairQueue` in fair mode, a `ShuffledQueue` while shuffled).
+
+	`position` is estimated locally from the last position Lavalink reported. Lavalink reports the position of
+	every player every few seconds, but a report is only taken in once `position_update_interval` has passed
+	since the last one, or when it is more than `position_drift_tolerance` off the estimate (e.g. after a seek
+	or a track change). Starting a track, pausing, resuming and seeking update the estimate right away.
+	"""
+
+	__slots__ = ("session", "_next_position_update")
+
+	position_update_interval = 15000 # The minimum time between two position reports taken in (in milliseconds).
+	position_drift_tolerance = 1000 # How far a report may be off the estimate before it is taken in anyway (in milliseconds).
+
+	def __init__(self, guild_id: int, node: lavalink.Node):
+		super().__init__(guild_id, node)
+		self.session = GuildSession()
+		self.queue: TrackQueue | FairQueue | ShuffledQueue = TrackQueue()
+		self._next_position_update = 0
+
+
+	@property
+	def fair(self) -> bool:
+		return isinstance(self.queue, FairQueue)
+
+
+	def set_fair(self, fair: bool):
+		"""
+		Switches the queue to fair mode (see `FairQueue`) or back. Switching back keeps the order the tracks would have been played in.
+		"""
+		if fair != self.fair:
+			self.queue = FairQueue(self.queue) if fair else TrackQueue(self.queue)
+
+
+	@property
+	def shuffled(self) -> bool:
+		return isinstance(self.queue, ShuffledQueue)
+
+
+	def set_shuffle(self, shuffle: bool, seed: int | None = None):
+		"""
+		Shuffles the queue with `seed` (a random one if not given, see `ShuffledQueue`), or goes back to the order
+		the tracks were added in. Shuffling the fair queue, or turning fair mode on, replaces the other mode.
+
+		This replaces Lavalink's shuffle mode, which picks a random track whenever the next one is played, so
+		the queue shows the order the tracks will actually be played in.
+		"""
+		if shuffle:
+			tracks = self.queue.unshuffled() if self.shuffled else self.queue
+			self.queue = ShuffledQueue(tracks, random.getrandbits(32) if seed is None else seed)
+		elif self.shuffled:
+			self.queue = self.queue.unshuffled()
+
+
+	def add(self, track: lavalink.AudioTrack | dict, requester: int = 0, index: int | None = None):
+		"""
+		Adds `track` to the queue, like `lavalink.DefaultPlayer.add`, which sets the requester of the track.
+
+		A track that is queued or playing already (e.g. one replayed from the history while the queue loops)
+		is added as a copy, so the requester of the queued track stays the one the queue keeps it under.
+		"""
+		if isinstance(track, lavalink.AudioTrack) and (track is self.current or track.identifier in self.queue.identifiers):
+			track = type(track)(track)
+		super().add(track, requester, index)
+
+
+	@property
+	def remaining(self) -> int:
+		"""
+		The time left until the queue runs out, the rest of the current track included (in milliseconds).
+		"""
+		if self.current is None or self.current.stream:
+			return self.queue.duration
+		return self.queue.duration + self.current.duration - self.position
+
+
+	async def update_state(self, state: dict):
+		now = int(monotonic() * 1000)
+		if now < self._next_position_update and abs(state.get('position', 0) - self.position) <= self.position_drift_tolerance:
+			return
+		self._next_position_update = now + self.position_update_interval
+		await super().update_state(state)
+
+
+	async def set_pause(self, pause: bool):
+		self._anchor(self.position)
+		await super().set_pause(pause)
+
+
+	async def seek(self, position: int):
+		await super().seek(position)
+		self._anchor(position)
+
+
+	async def play_track(self, track: lavalink.AudioTrack, start_time: int = lavalink.common.MISSING, *args, **kwargs):
+		# a new track starts at `start_time`, taken like a seek, and the next report is taken in right away
+		response = await super().play_track(track, start_time, *args, **kwargs)
+		self._anchor(start_time if isinstance(start_time, int) else 0)
+		self._next_position_update = 0
+		return response
+
+
+	def _anchor(self, position: int):
+		self._last_position = position
+		self._last_update = int(monotonic() * 1000)
@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from .instrumentation import metrics
+
+
+class RateLimitExceeded(Exception):
+	"""
+	Raised when a call would have to wait longer for the rate limiter than its caller is willing to.
+	"""
+
+
+class RateLimiter:
+	"""
+	A token bucket shared by every caller of one upstream (in this process), regardless of the guild
+	they are calling for: `rate` calls per second on average, with bursts of up to `burst` calls.
+
+	Callers that have to wait are let through in priority order (`HIGH` before `LOW`) and first come,
+	first served within a priority, so a user waiting on a command overtakes background prefetching.
+	A caller passing `max_wait` is turned away with `RateLimitExceeded` right away when the calls ahead
+	of it would take longer than that, and once it has waited that long.
+
+	Params:
+		name (str): The upstream, used to label the calls turned away in the metrics.
+		rate (float): The number of calls per second.
+		burst (int): The number of calls that can be made at once after a quiet period.
+	"""
+
+	HIGH = 0 # a user is waiting for the result
+	LOW = 1 # background work, e.g. prefetching
+
+	def __init__(self, name: str, rate: float, burst: int):
+		self.name = name
+		self.rate = rate
+		self.burst = burst
+		self.tokens = float(burst)
+		self._updated = time.monotonic()
+		self._waiters: list[tuple[int, int, asyncio.Future]] = []
+		self._ids = itertools.count()
+		self._wakeup: asyncio.TimerHandle | None = None
+
+
+	@property
+	def waiting(self) -> int:
+		return sum(1 for _, _, future in self._waiters if not future.done())
+
+
+	async def acquire(self, priority: int = LOW, max_wait: float | None = None):
+		"""
+		Waits until the call may be made.
+		"""
+		self._refill()
+		if not self._waiters and self.tokens >= 1:
+			self.tokens -= 1
+			return
+
+		if max_wait is not None:
+			ahead = sum(1 for waiter_priority, _, future in self._waiters if waiter_priority <= priority and not future.done())
+			if (ahead + 1 - self.tokens) / self.rate > max_wait:
+				metrics.count_http(self.name, "rate_limited")
+				raise RateLimitExceeded(f"{self.name} is busy, not waiting {max_wait}s for it")
+
+		future = asyncio.get_running_loop().create_future()
+		heapq.heappush(self._waiters, (priority, next(self._ids), future))
+		if self._wakeup is None:
+			self._release()
+
+		try:
+			await asyncio.wait_for(future, max_wait)
+		except asyncio.TimeoutError:
+			metrics.count_http(self.name, "rate_limited")
+			raise RateLimitExceeded(f"{self.name} is busy, waited {max_wait}s for it") from None
+
+
+	def _refill(self):
+		now = time.monotonic()
+		self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+		self._updated = now
+
+
+	def _release(self):
+		self._wakeup = None
+		self._refill()
+
+		while self._waiters and (self.tokens >= 1 or self._waiters[0][2].done()):
+			_, _, future = heapq.heappop(self._waiters)
+			if not future.done(): # waiters that gave up are skipped
+				self.tokens -= 1
+				future.set_result(None)
+
+		if self._waiters:
+			self._wakeup = asyncio.get_running_loop().call_later((1 - self.tokens) / self.rate, self._release)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from collections import deque
+
+import discord
+
+from .instrumentation import metrics
+
+
+_log = logging.getLogger(__name__)
+
+
+class ResponseBudget:
+	"""
+	Defers the response of commands that are likely to miss Discord's 3 second window to respond to an
+	interaction, so they can take as long as they need and follow up instead of failing.
+
+	The latency of the last `window` invocations of every command is recorded, and a command whose
+	projected latency (the `percentile` of its recorded latencies) exceeds `budget` is deferred before it
+	runs. Commands without enough history yet, or that are unusually slow this time, are deferred once they
+	have not responded within `budget`. A deferred command's later `respond` calls are sent as follow-ups
+	(see `SorceryContext` for how ephemeral ones stay ephemeral).
+
+	Params:
+		budget (float): How long a command may take before its response is deferred (in seconds).
+		window (int): The number of recent invocations per command the projection is based on.
+		min_samples (int): The number of invocations a command needs before it is deferred up front.
+		percentile (float): The share of recent invocations the projected latency has to cover.
+	"""
+
+	def __init__(self, budget: float = 2.0, window: int = 50, min_samples: int = 5, percentile: float = 0.9):
+		self.budget = budget
+		self.window = window
+		self.min_samples = min_samples
+		self.percentile = percentile
+		self.invoked: dict[str, int] = {}
+		self.deferred: dict[str, int] = {}
+		self._latencies: dict[str, deque[float]] = {}
+		self._tasks: set[asyncio.Task] = set() # the defers started by a timer, referenced until they are done
+
+
+	def projected(self, command: str) -> float | None:
+		"""
+		Returns the projected latency of `command` (in seconds), None while it has too little history.
+		"""
+		latencies = self._latencies.get(command)
+		if not latencies or len(latencies) < self.min_samples:
+			return None
+		return sorted(latencies)[min(len(latencies) - 1, int(len(latencies) * self.percentile))]
+
+
+	def record(self, command: str, seconds: float):
+		latencies = self._latencies.get(command)
+		if latencies is None:
+			latencies = self._latencies[command] = deque(maxlen=self.window)
+		latencies.append(seconds)
+		self.invoked[command] = self.invoked.get(command, 0) + 1
+
+
+	async def start(self, ctx: discord.ApplicationContext) -> asyncio.TimerHandle | None:
+		"""
+		Defers the response of `ctx` right away if its command is projected to exceed the budget, otherwise
+		arms a timer that defers it once the budget is used up. Cancel the returned timer when the command is done.
+		"""
+		command = ctx.command.qualified_name
+		projected = self.projected(command)
+		if projected is not None and projected > self.budget:
+			await self._defer(ctx, "projected")
+			return None
+		return asyncio.get_running_loop().call_later(self.budget, self._defer_later, ctx)
+
+
+	def stats(self) -> dict:
+		return {
+			command: {"invoked": invoked, "deferred": self.deferred.get(command, 0), "projected": self.projected(command)}
+			for command, invoked in self.invoked.items()
+		}
+
+
+	def _defer_later(self, ctx: discord.ApplicationContext):
+		task = asyncio.create_task(self._defer(ctx, "budget"))
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+
+
+	async def _defer(self, ctx: discord.ApplicationContext, reason: str):
+		command = ctx.command.qualified_name
+		try:
+			if not await ctx.auto_defer():
+				return # responded in time
+		except discord.HTTPException as e:
+			_log.warning("Response could not be deferred: %s", e, extra={"command": command, "guild_id": ctx.guild_id})
+			return
+
+		self.deferred[command] = self.deferred.get(command, 0) + 1
+		metrics.count_deferral(command, reason)
+		_log.info("Response deferred", extra={"command": command, "guild_id": ctx.guild_id, "reason": reason})
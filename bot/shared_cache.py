@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+
+_log = logging.getLogger(__name__)
+
+STREAM_LIMIT = 2 ** 20 # the longest header line
+
+
+class LocalCache:
+	"""
+	An in-process LRU cache whose entries expire after their own TTL.
+
+	Params:
+		max_entries (int): The number of entries kept before the least recently used ones are evicted.
+	"""
+
+	def __init__(self, max_entries: int = 10_000):
+		self.max_entries = max_entries
+		self.hits = 0
+		self.misses = 0
+		self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+
+	def get(self, key: str):
+		entry = self._entries.get(key)
+		if entry is None or entry[0] < time.monotonic():
+			if entry is not None:
+				del self._entries[key]
+			self.misses += 1
+			return None
+		self._entries.move_to_end(key)
+		self.hits += 1
+		return entry[1]
+
+
+	def set(self, key: str, value, ttl: float):
+		self._entries[key] = (time.monotonic() + ttl, value)
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+
+	def delete(self, key: str):
+		self._entries.pop(key, None)
+
+
+	def stats(self) -> dict:
+		return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class CacheServer:
+	"""
+	Serves a `LocalCache` to the worker processes over a Unix socket.
+
+	Every message is a JSON header line, followed by `size` bytes of the value when the header has a size.
+	Requests are `{"id": 1, "op": "get"|"set"|"delete"|"stats", "key": ..., "ttl": ..., "size": ...}` and every
+	request is answered in order with `{"id": 1, "size": ...}`, where a missing size means there is no value.
+	Values are stored as the bytes the client sent, so the daemon never decodes them.
+	"""
+
+	def __init__(self, max_entries: int = 10_000):
+		self.cache = LocalCache(max_entries)
+		self.path = None
+		self._server = None
+		self._writers: set[asyncio.StreamWriter] = set()
+
+
+	async def start(self, path: str):
+		if os.path.exists(path):
+			os.unlink(path) # left behind by a daemon that did not shut down cleanly
+		self.path = path
+		self._server = await asyncio.start_unix_server(self._handle, path, limit=STREAM_LIMIT)
+
+
+	async def stop(self):
+		if self._server:
+			self._server.close()
+			for writer in list(self._writers):
+				writer.close()
+			await self._server.wait_closed()
+			self._server = None
+		if self.path and os.path.exists(self.path):
+			os.unlink(self.path)
+
+
+	async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		self._writers.add(writer)
+		try:
+			while line := await reader.readline():
+				request = json.loads(line)
+				op = request.get("op")
+				value = None
+
+				if op == "get":
+					value = self.cache.get(request["key"])
+				elif op == "set":
+					self.cache.set(request["key"], await reader.readexactly(request["size"]), request["ttl"])
+				elif op == "delete":
+					self.cache.delete(request["key"])
+				elif op == "stats":
+					value = json.dumps(self.cache.stats()).encode()
+
+				write_message(writer, {"id": request.get("id")}, value)
+				await writer.drain()
+		except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError, KeyError) as e:
+			_log.warning("Dropping cache client: %r", e)
+		finally:
+			self._writers.discard(writer)
+			writer.close()
+
+
+def write_message(writer: asyncio.StreamWriter, header: dict, value: bytes | None = None):
+	if value is not None:
+		header["size"] = len(value)
+	writer.write(json.dumps(header, separators=(",", ":")).encode() + b"\n")
+	if value is not None:
+		writer.write(value)
+
+
+class SharedCache:
+	"""
+	The cache shared by all worker processes.
+
+	Once `configure` is given the socket of a `CacheServer`, requests go to that daemon over one pipelined
+	connection. Without a socket, or while the daemon cannot be reached, the cache falls back to a
+	process-local `LocalCache`, so callers never have to care which one they are using.
+	Values have to be JSON serializable.
+
+	Params:
+		timeout (float): How long a request to the daemon may take before it counts as a miss (in seconds).
+		retry_interval (float): How long to use the local cache after the daemon could not be reached (in seconds).
+	"""
+
+	def __init__(self, timeout: float = 0.5, retry_interval: float = 5.0):
+		self.path = None
+		self.timeout = timeout
+		self.retry_interval = retry_interval
+		self.local = LocalCache()
+
+		self._reader: asyncio.StreamReader | None = None
+		self._writer: asyncio.StreamWriter | None = None
+		self._reader_task: asyncio.Task | None = None
+		self._pending: dict[int, asyncio.Future] = {}
+		self._ids = itertools.count()
+		self._connect_lock: asyncio.Lock | None = None
+		self._retry_at = 0.0
+
+
+	def configure(self, path: str | None):
+		self.path = path
+
+
+	@property
+	def shared(self) -> bool:
+		return self._writer is not None and not self._writer.is_closing()
+
+
+	async def get(self, key: str):
+		if not await self._connected():
+			return self.local.get(key)
+		value = await self._request({"op": "get", "key": key})
+		return json.loads(value) if value is not None else None
+
+
+	async def set(self, key: str, value, ttl: float):
+		if not await self._connected():
+			return self.local.set(key, value, ttl)
+		await self._request({"op": "set", "key": key, "ttl": ttl}, json.dumps(value, separators=(",", ":")).encode())
+
+
+	async def delete(self, key: str):
+		if not await self._connected():
+			return self.local.delete(key)
+		await self._request({"op": "delete", "key": key})
+
+
+	async def close(self):
+		if self._pending: # let the requests already sent get their answers before the connection goes away
+			await asyncio.wait(list(self._pending.values()), timeout=self.timeout)
+		if self._writer:
+			self._writer.close()
+		if self._reader_task:
+			self._reader_task.cancel()
+		self._reader = self._writer = self._reader_task = None
+
+
+	async def _connected(self) -> bool:
+		if self.shared:
+			return True
+		if not self.path or time.monotonic() < self._retry_at:
+			return False
+
+		if self._connect_lock is None:
+			self._connect_lock = asyncio.Lock()
+		async with self._connect_lock:
+			if self.shared:
+				return True
+			try:
+				self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+			except OSError as e:
+				_log.warning("Cache daemon at %s is unreachable, using the local cache for %.0fs: %r", self.path, self.retry_interval, e)
+				self._retry_at = time.monotonic() + self.retry_interval
+				return False
+			self._reader_task = asyncio.create_task(self._read_responses(self._reader))
+			return True
+
+
+	async def _request(self, header: dict, value: bytes | None = None) -> bytes | None:
+		request_id = next(self._ids)
+		future = asyncio.get_running_loop().create_future()
+		self._pending[request_id] = future
+		try:
+			write_message(self._writer, {"id": request_id, **header}, value)
+			return await asyncio.wait_for(future, self.timeout)
+		except (ConnectionError, asyncio.TimeoutError) as e:
+			_log.warning("Cache request failed: %r", e)
+			return None
+		finally:
+			self._pending.pop(request_id, None)
+
+
+	async def _read_responses(self, reader: asyncio.StreamReader):
+		try:
+			while line := await reader.readline():
+				response = json.loads(line)
+				value = await reader.readexactly(response["size"]) if "size" in response else None
+				future = self._pending.get(response["id"])
+				if future and not future.done():
+					future.set_result(value)
+		except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError) as e:
+			_log.warning("Lost the connection to the cache daemon: %r", e)
+		finally:
+			if self._writer:
+				self._writer.close()
+			self._retry_at = time.monotonic() + self.retry_interval
+			for future in self._pending.values():
+				if not future.done():
+					future.set_result(None)
+
+
+cache = SharedCache()
+
+
+async def main():
+	parser = argparse.ArgumentParser(description="Run the shared cache daemon on its own.")
+	parser.add_argument("--socket", default=os.getenv("CACHE_SOCKET", "sorcery-cache.sock"), help="The Unix socket to listen on.")
+	parser.add_argument("--max-entries", type=int, default=10_000, help="The number of entries kept before the least recently used ones are evicted.")
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s:%(name)s: %(message)s")
+
+	server = CacheServer(args.max_entries)
+	await server.start(args.socket)
+	_log.info("Serving the shared cache on %s", args.socket)
+	try:
+		await asyncio.Event().wait()
+	finally:
+		await server.stop()
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+import inspect
+import time
+from typing import Awaitable, Callable
+
+
+class DrainResult:
+	"""
+	What became of one drain callback.
+	"""
+
+	__slots__ = ("name", "phase", "status", "duration", "error")
+
+	def __init__(self, name: str, phase: int):
+		self.name = name
+		self.phase = phase
+		self.status = "pending" # "done", "failed" or "timed out" once the drain is over
+		self.duration = 0.0
+		self.error: BaseException | None = None
+
+
+class ShutdownCoordinator:
+	"""
+	Drains the subsystems of the bot when it shuts down.
+
+	Subsystems `register` a drain callback (a function or a coroutine function) under a name and a phase.
+	`drain` runs the phases in ascending order, the callbacks of one phase concurrently, and starts the next
+	phase as soon as every callback of the current one has finished, so shutting down takes as long as the
+	pending work does. The whole drain is bounded by one deadline: callbacks still running when it passes
+	are cancelled and reported as timed out.
+
+	Background tasks that should finish before the bot goes away (e.g. ones writing to the cache) can be
+	handed to `track` and are awaited in the `FLUSH` phase.
+	"""
+
+	STOP = 0 # stop producing work: timers, workers
+	FLUSH = 1 # write out whatever is queued
+	CLOSE = 2 # close the connections the earlier phases used
+
+	def __init__(self):
+		self._callbacks: dict[str, tuple[int, Callable[[], Awaitable | None]]] = {}
+		self._tasks: set[asyncio.Task] = set()
+		self._drain_task: asyncio.Task | None = None
+		self.register("background tasks", self._wait_for_tasks, self.FLUSH)
+
+
+	@property
+	def draining(self) -> bool:
+		return self._drain_task is not None
+
+
+	def register(self, name: str, callback: Callable[[], Awaitable | None], phase: int = FLUSH):
+		"""
+		Registers `callback` to run during `phase` of the drain, replacing the callback registered under `name` before.
+		"""
+		self._callbacks[name] = (phase, callback)
+
+
+	def unregister(self, name: str):
+		self._callbacks.pop(name, None)
+
+
+	def track(self, task: asyncio.Task) -> asyncio.Task:
+		"""
+		Keeps `task` to be awaited when draining, until it is done.
+		"""
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+		return task
+
+
+	async def drain(self, timeout: float) -> list[DrainResult]:
+		"""
+		Runs every registered callback within `timeout` seconds and returns what became of each one.
+		Calling it again while (or after) draining returns the results of the first drain.
+		"""
+		if self._drain_task is None:
+			self._drain_task = asyncio.create_task(self._drain(timeout))
+		return await asyncio.shield(self._drain_task)
+
+
+	async def _drain(self, timeout: float) -> list[DrainResult]:
+		loop = asyncio.get_running_loop()
+		deadline = loop.time() + timeout
+		results = []
+
+		for phase in sorted({phase for phase, _ in self._callbacks.values()}):
+			tasks = {}
+			for name, (callback_phase, callback) in list(self._callbacks.items()):
+				if callback_phase == phase:
+					result = DrainResult(name, phase)
+					tasks[asyncio.create_task(self._run(result, callback))] = result
+					results.append(result)
+
+			started = time.perf_counter()
+			_, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - loop.time()))
+
+			for task, result in tasks.items():
+				if task in pending or task.cancelled():
+					task.cancel()
+					result.status = "timed out"
+					result.duration = time.perf_counter() - started
+				elif task.exception():
+					result.status = "failed"
+					result.error = task.exception()
+				else:
+					result.status = "done"
+
+		return results
+
+
+	async def _run(self, result: DrainResult, callback: Callable[[], Awaitable | None]):
+		start = time.perf_counter()
+		try:
+			value = callback()
+			if inspect.isawaitable(value):
+				await value
+		finally:
+			result.duration = time.perf_counter() - start
+
+
+	async def _wait_for_tasks(self):
+		while self._tasks:
+			await asyncio.wait(list(self._tasks))
+
+
+def format_drain_report(results: list[DrainResult]) -> str:
+	lines = []
+	for result in results:
+		line = f"{result.name}: {result.status} in {result.duration * 1000:.0f} ms"
+		if result.error:
+			line += f" ({result.error!r})"
+		lines.append(line)
+	return "\n".join(lines)
@@ -0,0 +1,38 @@
+from typing import Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class StateRegistry:
+	"""
+	Holds the state of the cogs and services that has to outlive the code that created it, keyed by name.
+
+	Cogs take their state from the registry (e.g. `bot.state.get("music_core.search_results", dict)`) instead
+	of creating it in `__init__`, so a cog instance created by `SorceryBot.hot_reload` picks up where the
+	old one left off.
+	"""
+
+	def __init__(self):
+		self._entries: dict[str, object] = {}
+
+
+	def __contains__(self, key: str) -> bool:
+		return key in self._entries
+
+
+	def get(self, key: str, factory: Callable[[], T]) -> T:
+		"""
+		Returns the entry stored under `key`, creating it with `factory` the first time it is asked for.
+		"""
+		if key not in self._entries:
+			self._entries[key] = factory()
+		return self._entries[key]
+
+
+	def pop(self, key: str, default=None):
+		return self._entries.pop(key, default)
+
+
+	def keys(self) -> list[str]:
+		return list(self._entries)
@@ -1 +1,3 @@
 from .utils import Utils, CustomPage
+from .lazy_pages import LazyPages
+from .debouncer import Debouncer
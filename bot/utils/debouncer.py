@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+
+_log = logging.getLogger(__name__)
+
+
+class Debouncer:
+	"""
+	Coalesces calls per key so that at most one of them runs every `interval` seconds.
+
+	The first call for a key runs right away. Calls scheduled while it runs, or during the
+	`interval` after it, replace each other and only the latest one runs once the interval
+	has passed. This keeps a burst of rapid updates down to a leading and a trailing call.
+
+	Params:
+		interval (float): The minimum number of seconds between two calls for the same key.
+	"""
+
+	def __init__(self, interval: float):
+		self.interval = interval
+		self._pending: dict[Hashable, Callable[[], Awaitable]] = {}
+		self._tasks: dict[Hashable, asyncio.Task] = {}
+
+
+	def schedule(self, key: Hashable, callback: Callable[[], Awaitable]):
+		"""
+		Schedules `callback` to run for `key`, replacing any callback still pending for it.
+		"""
+		self._pending[key] = callback
+
+		if key not in self._tasks:
+			self._tasks[key] = asyncio.create_task(self._run(key))
+
+
+	def cancel(self, key: Hashable):
+		"""
+		Drops the pending callback of `key` (if any) and stops its timer.
+		"""
+		self._pending.pop(key, None)
+		task = self._tasks.pop(key, None)
+		if task:
+			task.cancel()
+
+
+	async def flush(self):
+		"""
+		Runs every pending callback right away, ignoring the interval.
+		"""
+		pending = list(self._pending.values())
+		self._pending.clear()
+
+		await asyncio.gather(*(self._call(callback) for callback in pending))
+
+
+	async def _run(self, key: Hashable):
+		try:
+			while key in self._pending:
+				await self._call(self._pending.pop(key))
+				await asyncio.sleep(self.interval)
+		except asyncio.CancelledError:
+			pass
+		finally:
+			if self._tasks.get(key) is asyncio.current_task():
+				del self._tasks[key]
+
+
+	async def _call(self, callback: Callable[[], Awaitable]):
+		try:
+			await callback()
+		except Exception as e:
+			_log.exception("Debounced call failed: %s", e)
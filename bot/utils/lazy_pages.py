@@ -0,0 +1,38 @@
+from collections.abc import Sequence
+from typing import Any, Callable
+
+
+class LazyPages(Sequence):
+	"""
+	A read-only sequence of paginator pages where each page is built on first access.
+
+	`discord.ext.pages.Paginator` only indexes into its pages and asks for their length,
+	so a page that is never navigated to is never built. Built pages are kept, so going
+	back and forth between pages does not rebuild them.
+
+	Params:
+		length (int): The total number of pages.
+		builder (Callable[[int], Any]): Called with a page index, returns the page at that index.
+	"""
+
+	def __init__(self, length: int, builder: Callable[[int], Any]):
+		self._builder = builder
+		self._pages: list = [None] * length
+
+
+	def __len__(self) -> int:
+		return len(self._pages)
+
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return [self[i] for i in range(len(self._pages))[idx]]
+
+		idx = range(len(self._pages))[idx] # normalizes negative indices and raises IndexError when out of range
+		page = self._pages[idx]
+
+		if page is None:
+			page = self._builder(idx)
+			self._pages[idx] = page
+
+		return page
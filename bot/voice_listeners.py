@@ -0,0 +1,51 @@
+import discord
+
+
+class VoiceListenerCounter:
+	"""
+	Keeps the number of human (non-bot) members in every voice channel, so checking whether a channel
+	is empty does not have to go through its member list.
+
+	Counts are seeded per guild from the cached voice members (`seed`) and kept up to date from the
+	voice state deltas (`update`).
+	"""
+
+	def __init__(self):
+		self._counts: dict[int, int] = {}
+		self._guild_channels: dict[int, set[int]] = {}
+
+
+	def get(self, channel_id: int) -> int:
+		return self._counts.get(channel_id, 0)
+
+
+	def seed(self, guild: discord.Guild):
+		self.forget(guild.id)
+		channel_ids = self._guild_channels[guild.id] = set()
+		for channel in (*guild.voice_channels, *guild.stage_channels):
+			count = sum(1 for member in channel.members if not member.bot)
+			if count:
+				self._counts[channel.id] = count
+				channel_ids.add(channel.id)
+
+
+	def forget(self, guild_id: int):
+		for channel_id in self._guild_channels.pop(guild_id, ()):
+			self._counts.pop(channel_id, None)
+
+
+	def update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+		if member.bot or before.channel == after.channel:
+			return
+
+		if before.channel:
+			count = self._counts.get(before.channel.id, 0) - 1
+			if count > 0:
+				self._counts[before.channel.id] = count
+			else:
+				self._counts.pop(before.channel.id, None)
+				self._guild_channels.get(member.guild.id, set()).discard(before.channel.id)
+
+		if after.channel:
+			self._counts[after.channel.id] = self._counts.get(after.channel.id, 0) + 1
+			self._guild_channels.setdefault(member.guild.id, set()).add(after.channel.id)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+
+_log = logging.getLogger(__name__)
+
+
+class VoiceStatusUpdater:
+	"""
+	Keeps the status every voice channel should show and sends it to Discord with as few calls as possible.
+
+	`set` and `clear` only record the desired status of a channel. A task per channel then sends the latest
+	desired status, at most once every `interval` seconds, so the states in between (e.g. of rapidly
+	skipped tracks) are dropped. A status the channel already shows is not sent again, and clearing waits
+	`clear_delay` seconds first, so the clear between the end of one track and the start of the next one
+	is replaced by the next track's status instead of costing its own call.
+
+	Only a status set through the updater is cleared, one set by someone else in the meantime is left alone.
+	What the updater keeps about a channel is dropped once its status is cleared, so it only keeps the
+	channels with a status.
+
+	Params:
+		interval (float): The minimum time between two status updates of a channel (in seconds).
+		clear_delay (float): How long clearing a status waits for a new one to replace it (in seconds).
+	"""
+
+	def __init__(self, interval: float = 3.0, clear_delay: float = 2.0):
+		self.interval = interval
+		self.clear_delay = clear_delay
+		self.sent = 0
+		self._desired: dict[int, tuple[discord.VoiceChannel, str | None, float]] = {}
+		self._applied: dict[int, str] = {}
+		self._next_update: dict[int, float] = {}
+		self._tasks: dict[int, asyncio.Task] = {}
+
+
+	def set(self, channel: discord.VoiceChannel, status: str):
+		self._update(channel, status, time.monotonic())
+
+
+	def clear(self, channel: discord.VoiceChannel):
+		self._update(channel, None, time.monotonic() + self.clear_delay)
+
+
+	async def clear_now(self, channel: discord.VoiceChannel):
+		"""
+		Clears the status right away, dropping any pending update, e.g. before leaving the channel.
+		"""
+		task = self._tasks.pop(channel.id, None)
+		if task:
+			task.cancel()
+		self._desired.pop(channel.id, None)
+		await self._send(channel, None)
+		self._applied.pop(channel.id, None)
+		self._next_update.pop(channel.id, None)
+
+
+	def _update(self, channel: discord.VoiceChannel, status: str | None, due: float):
+		desired = self._desired.get(channel.id)
+		if desired and desired[1] == status:
+			return # already on its way
+
+		self._desired[channel.id] = (channel, status, due)
+		if channel.id not in self._tasks:
+			self._tasks[channel.id] = asyncio.create_task(self._run(channel.id))
+
+
+	async def flush(self):
+		"""
+		Sends every pending status right away, ignoring the interval and the clear delay.
+		"""
+		for task in self._tasks.values():
+			task.cancel()
+		self._tasks.clear()
+
+		desired = list(self._desired.values())
+		self._desired.clear()
+		await asyncio.gather(*(self._send(channel, status) for channel, status, _ in desired))
+
+
+	async def _run(self, channel_id: int):
+		try:
+			while True:
+				channel, status, due = self._desired[channel_id]
+				wait = max(due, self._next_update.get(channel_id, 0.0)) - time.monotonic()
+				if wait > 0:
+					await asyncio.sleep(wait)
+					continue # the desired status may have changed in the meantime
+
+				await self._send(channel, status)
+
+				if self._desired[channel_id][1] == status: # nothing new was asked for while sending
+					del self._desired[channel_id]
+					return
+		except asyncio.CancelledError:
+			pass
+		finally:
+			if self._tasks.get(channel_id) is asyncio.current_task():
+				del self._tasks[channel_id]
+
+
+	async def _send(self, channel: discord.VoiceChannel, status: str | None):
+		applied = self._applied.get(channel.id)
+		if status is None:
+			if applied is None or channel.status not in (applied, None):
+				return # not set by the updater, or changed by someone else since, keep it
+		elif status == channel.status:
+			return # a no-op
+
+		self._next_update[channel.id] = time.monotonic() + self.interval
+		try:
+			await channel.set_status(status)
+		except discord.HTTPException as e:
+			_log.warning("Voice channel status could not be updated: %s", e, extra={"guild_id": channel.guild.id})
+			return
+
+		self.sent += 1
+		if status is None:
+			self._applied.pop(channel.id, None)
+			self._next_update.pop(channel.id, None) # the channel shows nothing, it is not updated until a new status is set
+		else:
+			self._applied[channel.id] = status
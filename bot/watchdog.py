@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from .instrumentation import metrics
+
+
+_log = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallSite:
+	"""
+	The stalls attributed to one call site.
+	"""
+
+	__slots__ = ("site", "task", "stack", "count", "total", "max")
+
+	def __init__(self, site: str, task: str, stack: str):
+		self.site = site
+		self.task = task
+		self.stack = stack
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+
+
+class LoopWatchdog:
+	"""
+	Measures event loop lag and finds out what is blocking the loop when it stalls.
+
+	A heartbeat task on the loop wakes up every `interval` seconds and records how late it woke up.
+	A daemon thread watches the heartbeat; once it has not beaten for `threshold` seconds, the
+	thread grabs the stack the loop thread is currently executing (together with the task that
+	was running) and, when the loop recovers, the stall is added to the call site it was blocked in.
+
+	Params:
+		interval (float): How often the heartbeat runs (in seconds).
+		threshold (float): How long the loop has to be blocked for it to count as a stall (in seconds).
+	"""
+
+	def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+		self.interval = interval
+		self.threshold = threshold
+		self.lag = 0.0
+		self.max_lag = 0.0
+		self.sites: dict[str, StallSite] = {}
+
+		self._beat = time.monotonic()
+		self._loop_thread_id = None
+		self._loop = None
+		self._captured: StallSite | None = None
+		self._lock = threading.Lock()
+		self._stopped = threading.Event()
+		self._heartbeat_task = None
+		self._thread = None
+
+
+	@property
+	def running(self) -> bool:
+		return self._heartbeat_task is not None
+
+
+	def start(self):
+		"""
+		Starts watching the running event loop. Must be called from a coroutine on that loop.
+		"""
+		self._loop = asyncio.get_running_loop()
+		self._loop_thread_id = threading.get_ident()
+		self._beat = time.monotonic()
+		self._stopped.clear()
+		self._heartbeat_task = asyncio.create_task(self._heartbeat())
+		self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+		self._thread.start()
+
+
+	def stop(self):
+		self._stopped.set()
+		if self._heartbeat_task:
+			self._heartbeat_task.cancel()
+			self._heartbeat_task = None
+
+
+	def top(self, limit: int = 10) -> list[StallSite]:
+		"""
+		Returns the call sites that blocked the loop the longest in total.
+		"""
+		with self._lock:
+			return sorted(self.sites.values(), key=lambda site: site.total, reverse=True)[:limit]
+
+
+	def reset(self):
+		with self._lock:
+			self.sites.clear()
+		self.max_lag = 0.0
+
+
+	async def _heartbeat(self):
+		while True:
+			expected = time.monotonic() + self.interval
+			await asyncio.sleep(self.interval)
+			now = time.monotonic()
+
+			self.lag = max(0.0, now - expected)
+			self.max_lag = max(self.max_lag, self.lag)
+			if metrics.enabled:
+				metrics.observe("loop", "lag", self.lag)
+
+			with self._lock:
+				self._beat = now
+				captured, self._captured = self._captured, None
+
+			if captured:
+				self._record(captured, self.lag)
+
+
+	def _monitor(self):
+		while not self._stopped.wait(self.interval / 2):
+			with self._lock:
+				blocked_for = time.monotonic() - self._beat
+				if blocked_for < self.threshold or self._captured:
+					continue
+				self._captured = self._capture()
+
+
+	def _capture(self) -> StallSite:
+		frame = sys._current_frames().get(self._loop_thread_id)
+		stack = traceback.extract_stack(frame) if frame else traceback.StackSummary()
+
+		# the innermost frame that belongs to this project is the one worth fixing,
+		# library frames below it (ytmusicapi, requests, ssl...) are just where the time went
+		site = None
+		for summary in reversed(stack):
+			if summary.filename.startswith(PROJECT_ROOT) and "site-packages" not in summary.filename:
+				site = summary
+				break
+		if site is None and stack:
+			site = stack[-1]
+
+		site_key = f"{os.path.relpath(site.filename, PROJECT_ROOT)}:{site.lineno} in {site.name}" if site else "<unknown>"
+
+		task = None
+		try:
+			task = asyncio.current_task(self._loop)
+		except RuntimeError:
+			pass
+		task_name = f"{task.get_name()} ({task.get_coro().__qualname__})" if task else "<no task>"
+
+		return StallSite(site_key, task_name, "".join(stack.format()))
+
+
+	def _record(self, captured: StallSite, duration: float):
+		with self._lock:
+			site = self.sites.get(captured.site)
+			if site is None:
+				site = self.sites[captured.site] = captured
+			else:
+				site.task = captured.task
+				site.stack = captured.stack
+			site.count += 1
+			site.total += duration
+			site.max = max(site.max, duration)
+
+		_log.warning("Event loop was blocked for %.3fs at %s (task: %s)", duration, captured.site, captured.task)
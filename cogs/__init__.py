@@ -0,0 +1,8 @@
+# the cogs loaded at startup, in this order (a new cog has to be added here to be loaded)
+EXTENSIONS = (
+	"cogs.music.lavaplayer",
+	"cogs.music.music_core",
+	"cogs.music.music_queue",
+	"cogs.music.music_filters",
+	"cogs.diagnostics.diagnostics",
+)
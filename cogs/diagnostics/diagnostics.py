@@ -0,0 +1,71 @@
+import importlib
+
+import discord
+
+from discord.ext import commands
+
+
+class Diagnostics(discord.Cog):
+
+	def __init__(self, bot: discord.Bot):
+		self.bot = bot
+
+
+	debug = discord.SlashCommandGroup(name="debug", description="Diagnostics for the bot owner.")
+
+
+	@debug.command(name="stalls")
+	@discord.option(
+		name="reset",
+		description="Clear the recorded stalls after showing them.",
+		required=False,
+	)
+	@commands.is_owner()
+	async def stalls(self, ctx: discord.ApplicationContext, reset: bool = False):
+		"""
+		Show the call sites that blocked the event loop the longest.
+		"""
+		watchdog = self.bot.watchdog
+		sites = watchdog.top(10)
+
+		embed = discord.Embed(title="Event Loop Stalls")
+		embed.description = f"Current lag: `{watchdog.lag * 1000:.1f} ms`\tMax lag: `{watchdog.max_lag * 1000:.1f} ms`"
+
+		if not sites:
+			embed.add_field(name="", value=f"*No stalls longer than {watchdog.threshold}s have been recorded.*", inline=False)
+
+		for idx, site in enumerate(sites):
+			embed.add_field(
+				name=f"#{idx + 1} {site.site}"[:256],
+				value=f"{site.count} stalls, `{site.total:.2f}s` total, `{site.max:.2f}s` max\nTask: `{site.task}`"[:1024],
+				inline=False,
+			)
+
+		if reset:
+			watchdog.reset()
+
+		await ctx.respond(embed=embed, ephemeral=True)
+
+
+	@debug.command(name="reload")
+	@commands.is_owner()
+	async def reload(self, ctx: discord.ApplicationContext):
+		"""
+		Reload the services and cogs without disconnecting the players.
+		"""
+		await ctx.defer(ephemeral=True)
+
+		import cogs # the manifest is reloaded too, so cogs can be added or removed without a restart
+		try:
+			timings = await self.bot.hot_reload(importlib.reload(cogs).EXTENSIONS)
+		except Exception as e:
+			return await ctx.respond(f"Reload failed:\n`{e!r}`"[:2000], ephemeral=True)
+
+		embed = discord.Embed(title="Reloaded")
+		embed.description = "\n".join(f"`{extension}` {seconds * 1000:.0f} ms" for extension, seconds in timings.items())
+		embed.set_footer(text=f"{len(self.bot.lavalink.player_manager.players) if hasattr(self.bot, 'lavalink') else 0} players kept")
+		await ctx.respond(embed=embed, ephemeral=True)
+
+
+def setup(bot: discord.Bot):
+	bot.add_cog(Diagnostics(bot))
@@ -1,59 +1,104 @@
 # loading lavalink credentials from .env
+import logging
 import os
 from dotenv import load_dotenv
 
 import aiohttp
 import asyncio
+import inspect
 
 import discord
 import lavalink
 
+from bot.event_recorder import EventRecorder
+from bot.http_client import CircuitOpenError
+from bot.player import SorceryPlayer
+from bot.rate_limiter import RateLimitExceeded
+from bot.shutdown import ShutdownCoordinator
 from services.music.music_core_service import MusicCoreService
 
 
+_log = logging.getLogger(__name__)
+
+
 class LavaPlayer(discord.Cog):
 	
 	def __init__(self, bot: discord.Bot):
 		self.bot = bot
+		self.lavalink: lavalink.Client | None = None
+
+		# records the Lavalink WebSocket messages for `benchmarks.replay` (e.g. LAVALINK_RECORD_PATH=lavalink-events.jsonl.gz)
+		# the recorder is kept in the state registry so a hot reload keeps appending to the same recording
+		record_path = os.getenv("LAVALINK_RECORD_PATH")
+		self.recorder: EventRecorder | None = bot.state.get("lavaplayer.recorder", lambda: EventRecorder(record_path) if record_path else None)
+		if self.recorder:
+			bot.shutdown_coordinator.register("lavalink recorder", self.recorder.close, ShutdownCoordinator.FLUSH)
+		bot.shutdown_coordinator.register("player timeouts", self.cancel_timeouts, ShutdownCoordinator.STOP)
+
+		if hasattr(bot, "lavalink"): # the cog is being reloaded, `on_ready` has already run
+			self.register_event_hooks()
+	
+	
+	def register_event_hooks(self):
+		if self.lavalink is None:
+			self.lavalink = self.bot.lavalink
+			self.lavalink.add_event_hooks(self)
 	
 	
 	def cog_unload(self):
 		"""
-		This will remove any registered event hooks when the cog is unloaded.
-		They will subsequently be registered again once the cog is loaded.
+		This will remove the event hooks of this cog when the cog is unloaded.
+		The hooks of the new instance are registered once the cog is loaded again.
 		
-		This effectively allows for event handlers to be updated when the cog is reloaded.
+		This effectively allows for event handlers to be updated when the cog is reloaded,
+		hooks registered by anything else stay in place.
+		"""
+		if self.lavalink:
+			hooks = [hook for _, hook in inspect.getmembers(self, lambda member: inspect.ismethod(member) and hasattr(member, "_lavalink_events"))]
+			self.lavalink.remove_event_hooks(hooks=hooks)
+		self.bot.shutdown_coordinator.unregister("player timeouts")
+	
+
+	async def cancel_timeouts(self):
+		"""
+		Cancels the empty channel and inactivity timeouts of every player, so none of them disconnects halfway through a shutdown.
 		"""
-		self.lavalink._event_hooks.clear()
+		if not self.lavalink:
+			return
+		
+		tasks = [task for player in self.lavalink.player_manager.players.values() for task in player.session.timeout_tasks()]
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
 	
 
-	async def empty_channel_timeout(self, player: lavalink.DefaultPlayer, msg: str):
+	async def empty_channel_timeout(self, player: SorceryPlayer, msg: str):
 		"""
 		"""
 		guild = self.bot.get_guild(player.guild_id)
-		text_channel = guild.get_channel(player.fetch('channel'))
+		text_channel = guild.get_channel(player.session.channel_id)
 		voice_channel = guild.get_channel(player.channel_id)
 		try:
-			await text_channel.send(f"{msg} Leaving after a timeout of 2 minutes.")
+			self.bot.message_scheduler.notify(text_channel, f"{msg} Leaving after a timeout of 2 minutes.")
 			await asyncio.sleep(120)
 			await MusicCoreService.disconnect_chores(self.bot, player)
 			await guild.voice_client.disconnect(force=True)
-			await text_channel.send(f"{self.bot.user.name} has gracefully left the stage. See you next time.")
+			self.bot.message_scheduler.notify(text_channel, f"{self.bot.user.name} has gracefully left the stage. See you next time.")
 		except asyncio.CancelledError:
 			pass # if cancelled, do nothing (maybe do something someday, but for now, nothing comes to mind.)
 	
 
-	async def inactive_player_timeout(self, player: lavalink.DefaultPlayer):
+	async def inactive_player_timeout(self, player: SorceryPlayer):
 		"""
 		"""
 		guild = self.bot.get_guild(player.guild_id)
-		text_channel = guild.get_channel(player.fetch('channel'))
+		text_channel = guild.get_channel(player.session.channel_id)
 		try:
-			await text_channel.send(f"Player is idle. Leaving after a timeout of 2 minutes.")
+			self.bot.message_scheduler.notify(text_channel, f"Player is idle. Leaving after a timeout of 2 minutes.")
 			await asyncio.sleep(120)
 			await MusicCoreService.disconnect_chores(self.bot, player)
 			await guild.voice_client.disconnect(force=True)
-			await text_channel.send(f"{self.bot.user.name} has gracefully left the stage. See you next time.")
+			self.bot.message_scheduler.notify(text_channel, f"{self.bot.user.name} has gracefully left the stage. See you next time.")
 		except asyncio.CancelledError:
 			pass
 
@@ -79,23 +124,24 @@ class LavaPlayer(discord.Cog):
 		if not hasattr(self.bot, "lavalink"):
 			return
 		
-		player: lavalink.DefaultPlayer = self.bot.lavalink.player_manager.get(member.guild.id)
+		player: SorceryPlayer = self.bot.lavalink.player_manager.get(member.guild.id)
 		if not player: # if voice client is not connected
 			# TODO
 			return
 		
-		if player.fetch("inactive_player_timeout_task"):
+		session = player.session
+		if session.inactive_player_timeout_task:
 			return
 		
 		guild = self.bot.get_guild(player.guild_id)
-		text_channel = guild.get_channel(player.fetch('channel'))
+		text_channel = guild.get_channel(session.channel_id)
 		player_channel = guild.get_channel(player.channel_id)
 
 		if not player_channel:
 			return
 		
 		if before.channel == player_channel: # member has left the channel
-			if not False in [member.bot for member in player_channel.members]: # if the channel is inactive (if all members are bots)
+			if not self.bot.voice_listeners.get(player_channel.id): # if the channel is inactive (if all members are bots)
 				msg = "" # the message to send
 				if player.is_playing and not player.paused: # if the player is in the middle of playing a track
 					await player.set_pause(True) # pause the player
@@ -105,11 +151,10 @@ class LavaPlayer(discord.Cog):
 				else: # if the bot is alone in the channel
 					msg += f" {self.bot.user.name} is alone in <#{player.channel_id}>."
 
-				empty_channel_timeout_task = asyncio.create_task(self.empty_channel_timeout(player, msg))
-				player.store("empty_channel_timeout_task", empty_channel_timeout_task)
+				session.empty_channel_timeout_task = asyncio.create_task(self.empty_channel_timeout(player, msg))
 		
 		elif after.channel == player_channel: # member has joined the channel
-			empty_channel_timeout_task: asyncio.Task = player.fetch("empty_channel_timeout_task")
+			empty_channel_timeout_task = session.empty_channel_timeout_task
 			if not empty_channel_timeout_task:
 				return
 			
@@ -120,8 +165,8 @@ class LavaPlayer(discord.Cog):
 					await player.set_pause(False) # resume it
 					msg += "Playback resumed."
 				
-				await text_channel.send(f"Timeout cancelled. {msg}") # notify in a message
-			player.store("empty_channel_timeout_task", None) 
+				self.bot.message_scheduler.notify(text_channel, f"Timeout cancelled. {msg}") # notify in a message
+			session.empty_channel_timeout_task = None
 		
 
 	@discord.Cog.listener()
@@ -131,7 +176,7 @@ class LavaPlayer(discord.Cog):
 			lavalink_address = os.getenv('LAVALINK_SERVER_ADDRESS')
 			host, port = lavalink_address.split(':') # the 'https://' part may cause trouble
 			password = os.getenv('LAVALINK_SERVER_PASSWORD')
-			self.bot.lavalink = lavalink.Client(self.bot.user.id)
+			self.bot.lavalink = lavalink.Client(self.bot.user.id, player=SorceryPlayer, request_timeout=self.bot.http_client.timeout)
 			self.bot.lavalink.add_node(
 				host=host,
 				port=port,
@@ -140,16 +185,15 @@ class LavaPlayer(discord.Cog):
 				name='default-node'
 			)
 		
-		self.lavalink: lavalink.Client = self.bot.lavalink
-		self.lavalink.add_event_hooks(self)
+		self.register_event_hooks() # `on_ready` runs again after a reconnect, the hooks are only added once
 
 
 	@lavalink.listener(lavalink.TrackStartEvent)
 	async def on_track_start(self, event: lavalink.TrackStartEvent):
-		guild_id = event.player.guild_id
-		channel_id = event.player.fetch('channel')
+		player: SorceryPlayer = event.player
+		guild_id = player.guild_id
+		channel_id = player.session.channel_id
 		guild = self.bot.get_guild(guild_id)
-		player: lavalink.DefaultPlayer = event.player
 
 		if not guild:
 			return await self.lavalink.player_manager.destroy(guild_id)
@@ -159,10 +203,9 @@ class LavaPlayer(discord.Cog):
 		if not channel:
 			return
 		
-		history: list = player.fetch("history")
-		history.insert(0, event.track)
+		player.session.history.insert(0, event.track)
 
-		add_autoplay_track_task: asyncio.Task = asyncio.create_task(MusicCoreService.add_autoplay_track(player))
+		add_autoplay_track_task: asyncio.Task = self.bot.shutdown_coordinator.track(asyncio.create_task(MusicCoreService.add_autoplay_track(player)))
 		
 		embed: discord.Embed = discord.Embed(title="Now Playing")
 		embed.description = f"**[{event.track.title}]({event.track.uri})** by `{event.track.author}`"
@@ -175,48 +218,47 @@ class LavaPlayer(discord.Cog):
 		footerText = MusicCoreService.get_player_state(event.player)
 		embed.set_footer(text=footerText)
 
-		player.store('channel_status', f"Listening to {event.track.title}")
 		voice_channel = guild.get_channel(event.player.channel_id)
-		await voice_channel.set_status(player.fetch('channel_status'))
+		self.bot.voice_status.set(voice_channel, f"Listening to {event.track.title}")
 		
-		await channel.send(embed=embed)
+		self.bot.now_playing.show(guild_id, channel, embed) # edits the guild's now playing message
 
 		if "plainLyrics" in event.track.extra.keys():
 			return
 
+		# prefetched in the background, so a slow or busy lrclib does not hold up the track start
+		self.bot.shutdown_coordinator.track(asyncio.create_task(self.prefetch_lyrics(event.track)))
+
+
+	async def prefetch_lyrics(self, track: lavalink.AudioTrack):
 		try:
-			async with self.bot.session.get(f"https://lrclib.net/api/get?artist_name={event.track.author.removesuffix(" - Topic")}&track_name={event.track.title}") as response:
-				
-				if response.status == 200:
-					lrclib_data = await response.json()
-					event.track.extra["albumName"] = lrclib_data["albumName"]
-					event.track.extra["trackName"] = lrclib_data["trackName"]
-					event.track.extra["artistName"] = lrclib_data["artistName"]
-					event.track.extra["plainLyrics"] = lrclib_data["plainLyrics"] if not lrclib_data["instrumental"] else "🎼 instrumental 🎼"
+			await MusicCoreService.load_lyrics(self.bot.http_client, track)
 		
+		except (CircuitOpenError, RateLimitExceeded):
+			pass # lrclib is failing or busy, `/lyrics` looks the lyrics up on demand
 		except aiohttp.ClientConnectionError as e:
-			print(f"Connection Error: Check if your internet or the site is down.\n{e}")
+			_log.warning("Connection Error: Check if your internet or the site is down: %s", e, extra={"event": "lyrics"})
 		except aiohttp.ClientSSLError as e:
-			print(f"SSL/Certificate Error:\n{e}")
+			_log.warning("SSL/Certificate Error: %s", e, extra={"event": "lyrics"})
 		except asyncio.TimeoutError:
-			print(f"The API took too long to respond.\n{e}")
-		except Exception as e:
-			print(f"Lyrics could not be retrieved\n{e}")
+			_log.warning("The API took too long to respond.", extra={"event": "lyrics"})
+		except Exception:
+			_log.exception("Lyrics could not be retrieved", extra={"event": "lyrics"})
 
 
 	@lavalink.listener(lavalink.TrackEndEvent)
 	async def on_track_end(self, event: lavalink.TrackEndEvent):
 		guild = self.bot.get_guild(event.player.guild_id)
-		player: lavalink.DefaultPlayer = event.player
+		player: SorceryPlayer = event.player
 
 		
 		voice_channel = guild.get_channel(event.player.channel_id)
 
-		if voice_channel and voice_channel.status == player.fetch('channel_status'):
-			await voice_channel.set_status(None)
+		if voice_channel:
+			self.bot.voice_status.clear(voice_channel) # replaced by the next track's status if one starts soon
 
-		if player.fetch("autoplay") and not player.queue and not player.is_playing:
-			asyncio.create_task(MusicCoreService.add_autoplay_track_to_queue(player))
+		if player.session.autoplay and not player.queue and not player.is_playing:
+			self.bot.shutdown_coordinator.track(asyncio.create_task(MusicCoreService.add_autoplay_track_to_queue(player)))
 
 
 	@lavalink.listener(lavalink.TrackStuckEvent)
@@ -238,16 +280,17 @@ class LavaPlayer(discord.Cog):
 	async def on_queue_end(self, event: lavalink.QueueEndEvent):
 		guild_id = event.player.guild_id
 		guild = self.bot.get_guild(guild_id)
-		player: lavalink.DefaultPlayer = event.player
+		player: SorceryPlayer = event.player
 
-		if guild is not None and not player.fetch('autoplay'):
-			inactive_player_timeout_task = asyncio.create_task(self.inactive_player_timeout(event.player))
-			player.store("inactive_player_timeout_task", inactive_player_timeout_task)
+		if guild is not None and not player.session.autoplay:
+			player.session.inactive_player_timeout_task = asyncio.create_task(self.inactive_player_timeout(event.player))
 	
 
 	@lavalink.listener(lavalink.PlayerUpdateEvent)
 	async def on_player_update(self, event: lavalink.PlayerUpdateEvent):
-		pass
+		# sent every few seconds for every player, only a sample of them ends up in the log (see LOG_SAMPLE_PLAYER_UPDATES)
+		if _log.isEnabledFor(logging.INFO):
+			_log.info("Player update", extra={"event": "PlayerUpdateEvent", "guild_id": event.player.guild_id, "position": event.position})
 
 
 	@lavalink.listener(lavalink.PlayerErrorEvent)
@@ -267,8 +310,7 @@ class LavaPlayer(discord.Cog):
 
 	@lavalink.listener(lavalink.NodeReadyEvent)
 	async def on_node_ready(self, event: lavalink.NodeReadyEvent):
-		print(f"Node with session ID {event.node.session_id} has connected")
-		print(f"Resumed session: {event.resumed}")
+		_log.info("Node with session ID %s has connected (resumed session: %s)", event.node.session_id, event.resumed)
 
 
 	@lavalink.listener(lavalink.NodeChangedEvent)
@@ -278,7 +320,8 @@ class LavaPlayer(discord.Cog):
 
 	@lavalink.listener(lavalink.IncomingWebSocketMessage)
 	async def on_incoming_websocket_message(self, event: lavalink.IncomingWebSocketMessage):
-		pass
+		if self.recorder:
+			self.recorder.record(event.data)
 
 
 	@lavalink.listener(lavalink.WebSocketClosedEvent)
@@ -9,7 +9,7 @@ class MusicCore(discord.Cog):
 
 	def __init__(self, bot: discord.Bot):
 		self.bot = bot
-		self.search_results = {}
+		self.search_results = bot.state.get("music_core.search_results", dict)
 
 
 	@discord.slash_command(name="play")
@@ -28,13 +28,22 @@ class MusicCore(discord.Cog):
 		description="The search query or link of the track/playlist.",
 		autocomplete=MusicCoreService.autocomplete_query
 	)
+	@discord.option(
+		name="dedupe",
+		description="Skip the tracks of a playlist that are already in the queue.",
+		choices=[
+			True,
+			False
+		],
+		default=False
+	)
 	@commands.check(MusicCoreService.create_player)
-	async def play(self, ctx: discord.ApplicationContext, source: str, query: str):
+	async def play(self, ctx: discord.ApplicationContext, source: str, query: str, dedupe: bool):
 		"""
 		Play a track with the given query.
 		"""
 		if query in self.search_results[ctx.author.id]:
-			await MusicCoreService.play(ctx, self.search_results[ctx.author.id][query])
+			await MusicCoreService.play(ctx, self.search_results[ctx.author.id][query], dedupe)
 		else:
 			await ctx.respond("Interaction failed.", ephemeral=True)
 	
@@ -25,6 +25,15 @@ class MusicFilters(discord.Cog):
 		await MusicFilterService.filter_stats(ctx)
 
 
+	@filter_commands.command(name="tune")
+	@commands.check(MusicCoreService.create_player)
+	async def filter_tune(self, ctx: discord.ApplicationContext):
+		"""
+		Tune speed, pitch, bass and treble with buttons.
+		"""
+		await MusicFilterService.tune(ctx)
+
+
 	@filter_commands.command(name="reset")
 	@commands.check(MusicCoreService.create_player)
 	async def reset_all(self, ctx: discord.ApplicationContext):
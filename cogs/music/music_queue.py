@@ -10,7 +10,7 @@ class MusicQueue(discord.Cog):
 
 	def __init__(self, bot: discord.Bot):
 		self.bot = bot
-		self.search_results = {}
+		self.search_results = bot.state.get("music_queue.search_results", dict)
 	
 
 	@discord.slash_command(name="queue")
@@ -84,12 +84,35 @@ class MusicQueue(discord.Cog):
 			False
 		]
 	)
+	@discord.option(
+		name="seed",
+		description="Shuffle the same way as a previous shuffle with this seed.",
+		required=False,
+		default=None
+	)
 	@commands.check(MusicCoreService.create_player)
-	async def shuffle(self, ctx: discord.ApplicationContext, set: bool):
+	async def shuffle(self, ctx: discord.ApplicationContext, set: bool, seed: int):
 		"""
 		Shuffle the queue.
 		"""
-		await MusicQueueService.shuffle(ctx, set)
+		await MusicQueueService.shuffle(ctx, set, seed)
+	
+
+	@discord.slash_command(name="fairqueue")
+	@discord.option(
+		name="set",
+		description="Set fair queue mode.",
+		choices=[
+			True,
+			False
+		]
+	)
+	@commands.check(MusicCoreService.create_player)
+	async def fairqueue(self, ctx: discord.ApplicationContext, set: bool):
+		"""
+		Let the requesters take turns instead of playing the queue in the order it was added.
+		"""
+		await MusicQueueService.set_fair(ctx, set)
 	
 
 	@discord.slash_command(name="skipto")
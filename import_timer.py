@@ -0,0 +1,100 @@
+"""
+Measures how long every module takes to import, like `python -X importtime` but from within the process.
+
+`main.py` installs the timer before importing anything heavy when `STARTUP_REPORT=1` is set and prints
+the slowest modules once the cogs are loaded. This module only depends on the standard library so it
+can be imported first.
+"""
+
+import importlib.abc
+import sys
+import time
+
+
+class _TimedLoader(importlib.abc.Loader):
+
+	def __init__(self, loader, timer: "ImportTimer"):
+		self._loader = loader
+		self._timer = timer
+
+
+	def __getattr__(self, name: str):
+		return getattr(self._loader, name)
+
+
+	def create_module(self, spec):
+		return self._loader.create_module(spec)
+
+
+	def exec_module(self, module):
+		self._timer._enter()
+		try:
+			self._loader.exec_module(module)
+		finally:
+			self._timer._exit(module.__name__)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+	"""
+	A meta path finder that wraps the loader of every module imported while it is installed and records
+	the time spent importing it, both on its own (`self`) and including its imports (`cumulative`).
+	"""
+
+	def __init__(self):
+		self.timings: dict[str, tuple[float, float]] = {}
+		self._stack: list[list[float]] = []
+		self._finding: set[str] = set()
+
+
+	def install(self):
+		if self not in sys.meta_path:
+			sys.meta_path.insert(0, self)
+
+
+	def uninstall(self):
+		if self in sys.meta_path:
+			sys.meta_path.remove(self)
+
+
+	def find_spec(self, fullname: str, path=None, target=None):
+		if fullname in self._finding:
+			return None
+
+		self._finding.add(fullname)
+		try:
+			for finder in sys.meta_path:
+				if finder is self or not hasattr(finder, "find_spec"):
+					continue
+				spec = finder.find_spec(fullname, path, target)
+				if spec is not None:
+					break
+			else:
+				return None
+		finally:
+			self._finding.discard(fullname)
+
+		if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+			spec.loader = _TimedLoader(spec.loader, self)
+		return spec
+
+
+	def _enter(self):
+		self._stack.append([time.perf_counter(), 0.0])
+
+
+	def _exit(self, name: str):
+		start, children = self._stack.pop()
+		cumulative = time.perf_counter() - start
+		self.timings[name] = (cumulative - children, cumulative)
+		if self._stack:
+			self._stack[-1][1] += cumulative
+
+
+	def report(self, limit: int = 15) -> str:
+		"""
+		Returns a table of the `limit` modules with the longest cumulative import time.
+		"""
+		slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+		lines = [f"{'module':<48}{'self ms':>10}{'total ms':>10}"]
+		lines += [f"{name:<48}{own * 1000:>10.1f}{cumulative * 1000:>10.1f}" for name, (own, cumulative) in slowest]
+		return "\n".join(lines)
@@ -0,0 +1,308 @@
+"""
+Runs the bot as several worker processes that each own a subset of the shards.
+
+Every worker is a regular `main.py` process started with `SHARD_IDS`/`SHARD_COUNT` in its environment, and
+`WORKER_COUNT` so it only uses its share of the rate limits of the bot.
+The supervisor restarts workers that exit (with an exponential backoff for workers that keep crashing)
+and, when `METRICS_ADDRESS` is set, serves the metrics of all workers (labelled by worker) at `/metrics`
+and their health at `/health` on that address. Worker `i` serves its own on the next port + `i`.
+With `CACHE_SOCKET` set, the supervisor also runs the cache daemon the workers share (see `bot.shared_cache`).
+
+Usage:
+	python launcher.py --workers 4
+	python launcher.py --workers 4 --shard-count 16
+	python launcher.py --shard-count auto
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from bot.shared_cache import CacheServer
+
+
+_log = logging.getLogger("launcher")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Worker:
+	"""
+	One bot process and the shards it owns.
+	"""
+
+	def __init__(self, worker_id: int, shard_ids: list[int], metrics_address: str | None):
+		self.id = worker_id
+		self.shard_ids = shard_ids
+		self.metrics_address = metrics_address
+		self.process: asyncio.subprocess.Process | None = None
+		self.started_at = None
+		self.restarts = 0
+		self.last_exit_code = None
+
+
+	@property
+	def alive(self) -> bool:
+		return self.process is not None and self.process.returncode is None
+
+
+	def status(self) -> dict:
+		return {
+			"worker": self.id,
+			"pid": self.process.pid if self.process else None,
+			"alive": self.alive,
+			"shard_ids": self.shard_ids,
+			"uptime": time.monotonic() - self.started_at if self.alive else 0.0,
+			"restarts": self.restarts,
+			"last_exit_code": self.last_exit_code,
+		}
+
+
+class Supervisor:
+	"""
+	Starts the workers, restarts the ones that exit and aggregates their metrics and health.
+
+	Params:
+		shard_count (int): The total number of shards.
+		workers (int): The number of worker processes. Shards are dealt out round-robin.
+		metrics_address (str | None): Where to serve the aggregated metrics (host:port).
+		cache_socket (str | None): The Unix socket of the shared cache daemon.
+		backoff (float): The delay before restarting a crashed worker, doubled for every crash in a row (in seconds).
+		max_backoff (float): The upper limit of the restart delay (in seconds).
+		stable_after (float): How long a worker has to run for its crash streak to reset (in seconds).
+	"""
+
+	def __init__(self, shard_count: int, workers: int, metrics_address: str | None = None, cache_socket: str | None = None, backoff: float = 1.0, max_backoff: float = 60.0, stable_after: float = 60.0):
+		self.shard_count = shard_count
+		self.metrics_address = metrics_address
+		self.cache_socket = cache_socket
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.stable_after = stable_after
+
+		host, port = metrics_address.rsplit(":", 1) if metrics_address else (None, None)
+		self.workers = [
+			Worker(
+				worker_id,
+				list(range(worker_id, shard_count, workers)),
+				f"{host}:{int(port) + 1 + worker_id}" if metrics_address else None,
+			) for worker_id in range(min(workers, shard_count))
+		]
+
+		self._stopping = asyncio.Event()
+		self._tasks: list[asyncio.Task] = []
+		self._runner = None
+		self._session: aiohttp.ClientSession | None = None
+		self._cache_server: CacheServer | None = None
+
+
+	async def run(self):
+		loop = asyncio.get_running_loop()
+		for signame in ("SIGINT", "SIGTERM"):
+			loop.add_signal_handler(getattr(signal, signame), self._stopping.set)
+
+		if self.metrics_address:
+			self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
+			await self._serve()
+
+		if self.cache_socket:
+			self._cache_server = CacheServer()
+			await self._cache_server.start(self.cache_socket)
+			_log.info("Serving the shared cache on %s", self.cache_socket)
+
+		for worker in self.workers:
+			_log.info("Worker %d owns shards %s of %d", worker.id, worker.shard_ids, self.shard_count)
+			self._tasks.append(asyncio.create_task(self._supervise(worker)))
+
+		await self._stopping.wait()
+		await self.stop()
+
+
+	async def stop(self, timeout: float = 15.0):
+		"""
+		Sends SIGTERM to every worker so it shuts down gracefully, and kills the ones still running after `timeout`.
+		"""
+		self._stopping.set()
+		for worker in self.workers:
+			if worker.alive:
+				worker.process.terminate()
+
+		try:
+			await asyncio.wait_for(asyncio.gather(*self._tasks), timeout)
+		except asyncio.TimeoutError:
+			for worker in self.workers:
+				if worker.alive:
+					_log.warning("Worker %d did not shut down in time, killing it", worker.id)
+					worker.process.kill()
+			await asyncio.gather(*self._tasks)
+
+		if self._runner:
+			await self._runner.cleanup()
+		if self._cache_server:
+			await self._cache_server.stop()
+		if self._session:
+			await self._session.close()
+
+
+	async def _supervise(self, worker: Worker):
+		crashes = 0
+		while not self._stopping.is_set():
+			env = {
+				**os.environ,
+				"WORKER_ID": str(worker.id),
+				"SHARD_IDS": ",".join(map(str, worker.shard_ids)),
+				"SHARD_COUNT": str(self.shard_count),
+				"WORKER_COUNT": str(len(self.workers)), # the workers share the bot's rate limits
+			}
+			if self.cache_socket:
+				env["CACHE_SOCKET"] = self.cache_socket
+			if worker.metrics_address:
+				env["METRICS_ADDRESS"] = worker.metrics_address
+			else:
+				env.pop("METRICS_ADDRESS", None)
+
+			worker.process = await asyncio.create_subprocess_exec(sys.executable, os.path.join(ROOT, "main.py"), cwd=ROOT, env=env)
+			worker.started_at = time.monotonic()
+			_log.info("Worker %d started (pid %d)", worker.id, worker.process.pid)
+
+			worker.last_exit_code = await worker.process.wait()
+			if self._stopping.is_set():
+				_log.info("Worker %d stopped", worker.id)
+				return
+
+			crashes = 1 if time.monotonic() - worker.started_at >= self.stable_after else crashes + 1
+			delay = min(self.max_backoff, self.backoff * 2 ** (crashes - 1))
+			_log.warning("Worker %d exited with code %s, restarting in %.1fs", worker.id, worker.last_exit_code, delay)
+
+			try:
+				await asyncio.wait_for(self._stopping.wait(), delay)
+				return
+			except asyncio.TimeoutError:
+				worker.restarts += 1
+
+
+	async def _fetch(self, worker: Worker, path: str):
+		if not worker.alive or not worker.metrics_address:
+			return None
+		try:
+			async with self._session.get(f"http://{worker.metrics_address}{path}") as response:
+				if response.status != 200:
+					return None
+				return await response.json() if path == "/health" else await response.text()
+		except (aiohttp.ClientError, asyncio.TimeoutError):
+			return None
+
+
+	async def metrics(self) -> str:
+		texts = await asyncio.gather(*(self._fetch(worker, "/metrics") for worker in self.workers))
+
+		lines = [
+			"# HELP sorcery_worker_up Whether the worker process is running.",
+			"# TYPE sorcery_worker_up gauge",
+		]
+		lines += [f'sorcery_worker_up{{worker="{worker.id}"}} {int(worker.alive)}' for worker in self.workers]
+		lines.append("# HELP sorcery_worker_restarts_total How often the worker process was restarted.")
+		lines.append("# TYPE sorcery_worker_restarts_total counter")
+		lines += [f'sorcery_worker_restarts_total{{worker="{worker.id}"}} {worker.restarts}' for worker in self.workers]
+
+		return "\n".join(lines) + "\n" + merge_metrics({worker.id: text for worker, text in zip(self.workers, texts) if text})
+
+
+	async def health(self) -> tuple[bool, dict]:
+		reports = await asyncio.gather(*(self._fetch(worker, "/health") for worker in self.workers))
+		workers = [{**worker.status(), "health": report} for worker, report in zip(self.workers, reports)]
+		healthy = all(worker["alive"] and worker["health"] and worker["health"]["ready"] for worker in workers)
+		return healthy, {"healthy": healthy, "shard_count": self.shard_count, "workers": workers}
+
+
+	async def _serve(self):
+		from aiohttp import web
+
+		async def handle_metrics(request: web.Request) -> web.Response:
+			return web.Response(text=await self.metrics(), content_type="text/plain", charset="utf-8")
+
+		async def handle_health(request: web.Request) -> web.Response:
+			healthy, report = await self.health()
+			return web.json_response(report, status=200 if healthy else 503)
+
+		app = web.Application()
+		app.router.add_get("/metrics", handle_metrics)
+		app.router.add_get("/health", handle_health)
+
+		host, port = self.metrics_address.rsplit(":", 1)
+		self._runner = web.AppRunner(app, access_log=None)
+		await self._runner.setup()
+		await web.TCPSite(self._runner, host, int(port)).start()
+		_log.info("Serving aggregated metrics on http://%s/metrics", self.metrics_address)
+
+
+def merge_metrics(texts: dict[int, str]) -> str:
+	"""
+	Merges the Prometheus text output of several workers into one, adding a `worker` label to every sample
+	and keeping the samples of each metric family together under a single HELP/TYPE header.
+	"""
+	families: dict[str, tuple[list[str], list[str]]] = {}
+
+	for worker_id, text in texts.items():
+		family = None
+		for line in text.splitlines():
+			if not line:
+				continue
+			if line.startswith("#"):
+				parts = line.split(" ", 3)
+				if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+					family = parts[2]
+					header, _ = families.setdefault(family, ([], []))
+					if line not in header:
+						header.append(line)
+				continue
+
+			name, brace, rest = line.partition("{")
+			if brace:
+				sample = f'{name}{{worker="{worker_id}",{rest}'
+			else:
+				name, _, value = line.partition(" ")
+				sample = f'{name}{{worker="{worker_id}"}} {value}'
+			families.setdefault(family or name, ([], []))[1].append(sample)
+
+	return "".join("\n".join(header + samples) + "\n" for header, samples in families.values())
+
+
+async def recommended_shard_count(token: str) -> int:
+	async with aiohttp.ClientSession() as session:
+		async with session.get("https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {token}"}) as response:
+			response.raise_for_status()
+			return (await response.json())["shards"]
+
+
+async def main():
+	load_dotenv()
+
+	parser = argparse.ArgumentParser(description="Run the bot as several shard-owning worker processes.")
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="The number of worker processes (defaults to the number of CPUs).")
+	parser.add_argument("--shard-count", default=None, help="The total number of shards, or 'auto' for Discord's recommendation (defaults to one per worker).")
+	parser.add_argument("--metrics-address", default=os.getenv("METRICS_ADDRESS"), help="Where to serve the aggregated metrics and health (host:port).")
+	parser.add_argument("--cache-socket", default=os.getenv("CACHE_SOCKET"), help="Run the shared cache daemon on this Unix socket.")
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s:%(name)s: %(message)s")
+
+	if args.shard_count == "auto":
+		shard_count = await recommended_shard_count(os.getenv("DISCORD_TOKEN"))
+		_log.info("Discord recommends %d shards", shard_count)
+	else:
+		shard_count = int(args.shard_count) if args.shard_count else args.workers
+
+	supervisor = Supervisor(shard_count, args.workers, args.metrics_address, args.cache_socket)
+	await supervisor.run()
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
@@ -1,27 +1,44 @@
 # loading token from .env
 import os
+import time
 from dotenv import load_dotenv
 
-# logging
-import logging
+# timing the imports (STARTUP_REPORT=1 prints the slowest modules once the cogs are loaded)
+from import_timer import ImportTimer
+
+boot_start = time.perf_counter()
+import_timer = ImportTimer() if os.getenv("STARTUP_REPORT", "").lower() in ("1", "true", "yes") else None
+if import_timer:
+	import_timer.install()
 
 # pycord
 import discord
 
 # importing the subclassed bot
 from bot import SorceryBot
+from bot.log_pipeline import setup_logging
 
+# the cog manifest
+from cogs import EXTENSIONS
 
-# logging for discord
-logger = logging.getLogger("discord")
-logger.setLevel(logging.INFO)
-handler = logging.FileHandler(filename="discord.log", encoding="utf-8", mode="a")
-handler.setFormatter(logging.Formatter("%(asctime)s:%(levelname)s:%(name)s: %(message)s"))
-logger.addHandler(handler)
 
 # loading .env
 load_dotenv()
 
+# logging, written by a background thread (every worker started by launcher.py gets its own file)
+log_path = os.getenv("LOG_FILE", "discord.log")
+if os.getenv("WORKER_ID"):
+	root, ext = os.path.splitext(log_path)
+	log_path = f"{root}-{os.getenv('WORKER_ID')}{ext}"
+log_listener = setup_logging(
+	path=log_path,
+	level=os.getenv("LOG_LEVEL", "INFO").upper(),
+	max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 2 ** 20)),
+	backups=int(os.getenv("LOG_BACKUPS", 5)),
+	json_format=os.getenv("LOG_FORMAT", "json").lower() == "json",
+	sample_rates={"PlayerUpdateEvent": int(os.getenv("LOG_SAMPLE_PLAYER_UPDATES", 100))},
+)
+
 # loading discord_token
 discord_token = os.getenv("DISCORD_TOKEN")
 
@@ -33,20 +50,44 @@ An all-in-one bot.
 
 # intents
 intents = discord.Intents.default()
+bot_options = {}
+
+# lean cache mode (LEAN_CACHE=1): only the intents the music features need, no message cache,
+# and only the members that are in a voice channel are cached
+if os.getenv("LEAN_CACHE", "").lower() in ("1", "true", "yes"):
+	intents = discord.Intents(guilds=True, voice_states=True)
+	bot_options = {
+		"member_cache_flags": discord.MemberCacheFlags(voice=True, joined=False, interaction=False),
+		"chunk_guilds_at_startup": False,
+		"max_messages": None,
+	}
+
+# sharding (set by launcher.py for each worker process, otherwise Discord's recommended shard count is used)
+shard_count = os.getenv("SHARD_COUNT")
+shard_ids = os.getenv("SHARD_IDS")
 
 # the bot
 bot = SorceryBot(
 	description=description,
 	intents=intents,
+	shard_count=int(shard_count) if shard_count else None,
+	shard_ids=[int(shard_id) for shard_id in shard_ids.split(",")] if shard_ids else None,
+	**bot_options,
 )
 
-# loading cogs (if there are multiple cog folders, the way to load them has to be altered accordingly)
-for (root, dirs, files) in os.walk("cogs"):
-	dotpath = root.replace(os.sep, ".")
-	for file in files:
-		name, ext = os.path.splitext(file)
-		if ext == ".py":
-			bot.load_extension(f"{dotpath}.{name}")
+# loading the cogs declared in cogs/__init__.py
+timings = bot.load_manifest(EXTENSIONS)
+for extension, seconds in timings.items():
+	print(f"Loaded {extension} in {seconds * 1000:.1f}ms")
+print(f"Started in {(time.perf_counter() - boot_start) * 1000:.1f}ms")
+
+if import_timer:
+	import_timer.uninstall()
+	print(import_timer.report())
+print("----------")
 
 # running the bot
-bot.run(discord_token)
+try:
+	bot.run(discord_token)
+finally:
+	log_listener.stop() # writes out the records still queued
@@ -0,0 +1,158 @@
+import asyncio
+
+import lavalink
+
+from bot.http_client import CircuitBreaker, CircuitOpenError, HttpClient, requests_session
+from bot.instrumentation import metrics
+from bot.rate_limiter import RateLimiter
+from bot.shared_cache import cache
+
+
+# `SorceryBot.hot_reload` runs this module again, the limiters, the breaker and the YouTube Music client of the
+# version it replaces are taken over so their state is not lost
+_previous = globals().get("MusicCacheService")
+
+
+class MusicCacheService:
+	"""
+	Lavalink search results, lrclib lyrics and YouTube Music watch playlists, cached in the shared cache
+	so that every worker process benefits from a lookup any of them made.
+
+	Tracks are stored as Lavalink's encoded track strings and decoded locally on a hit.
+
+	Calls to lrclib and YouTube Music share one rate limiter per upstream across all guilds, `HIGH` priority
+	callers (a user running `/lyrics`) go first and `LOW` priority ones (prefetching, autoplay) give up after
+	`BACKGROUND_MAX_WAIT`. YouTube Music also has a circuit breaker (lrclib's is part of the HTTP client).
+	"""
+
+	SEARCH_TTL = 600 # How long search results are cached (in seconds).
+	LYRICS_TTL = 86400 # How long found lyrics are cached (in seconds).
+	MISSING_LYRICS_TTL = 3600 # How long a lyrics lookup that found nothing is cached (in seconds).
+	WATCH_PLAYLIST_TTL = 3600 # How long YouTube Music watch playlists are cached (in seconds).
+
+	CACHED_LOAD_TYPES = (lavalink.LoadType.TRACK, lavalink.LoadType.PLAYLIST, lavalink.LoadType.SEARCH)
+
+	YTMUSIC_TIMEOUT = 10 # How long a YouTube Music call may take (in seconds).
+	BACKGROUND_MAX_WAIT = 2 # How long a background call waits for the rate limiter before giving up (in seconds).
+
+	lrclib_limiter = _previous.lrclib_limiter if _previous else RateLimiter("lrclib.net", rate=5, burst=10)
+	ytmusic_limiter = _previous.ytmusic_limiter if _previous else RateLimiter("music.youtube.com", rate=2, burst=5)
+	ytmusic_breaker = _previous.ytmusic_breaker if _previous else CircuitBreaker(failure_threshold=5, reset_timeout=60)
+
+	_ytmusic = _previous._ytmusic if _previous else None
+
+
+	def encode_load_result(result: lavalink.LoadResult) -> dict:
+		return {
+			"load_type": result.load_type.value,
+			"playlist": {"name": result.playlist_info.name, "selected_track": result.playlist_info.selected_track},
+			"tracks": [track.track for track in result.tracks],
+		}
+
+
+	def decode_load_result(data: dict) -> lavalink.LoadResult | None:
+		"""
+		Rebuilds a `LoadResult` from `encode_load_result`'s output. Returns None if a track cannot be decoded
+		(e.g. one from a source plugin with its own track format), which callers treat as a miss.
+		"""
+		try:
+			tracks = [lavalink.decode_track(encoded) for encoded in data["tracks"]]
+		except Exception:
+			return None
+		return lavalink.LoadResult(
+			lavalink.LoadType(data["load_type"]),
+			tracks,
+			lavalink.PlaylistInfo(data["playlist"]["name"], data["playlist"]["selected_track"]),
+		)
+
+
+	async def get_tracks(source: lavalink.Client | lavalink.Node, query: str) -> lavalink.LoadResult:
+		"""
+		`get_tracks` of a Lavalink client or node, answered from the cache when the query was loaded recently.
+		"""
+		key = f"search:{query}"
+		cached = await cache.get(key)
+		if cached:
+			result = MusicCacheService.decode_load_result(cached)
+			if result:
+				return result
+
+		async with metrics.timer("lavalink", "get_tracks"):
+			result: lavalink.LoadResult = await source.get_tracks(query)
+
+		if result.load_type in MusicCacheService.CACHED_LOAD_TYPES:
+			await cache.set(key, MusicCacheService.encode_load_result(result), MusicCacheService.SEARCH_TTL)
+		return result
+
+
+	def max_wait(priority: int) -> float | None:
+		return None if priority == RateLimiter.HIGH else MusicCacheService.BACKGROUND_MAX_WAIT
+
+
+	async def get_lyrics(http: HttpClient, artist: str, title: str, priority: int = RateLimiter.LOW) -> dict | None:
+		"""
+		Returns the lrclib entry (`albumName`, `trackName`, `artistName`, `plainLyrics`, `instrumental`) of a track,
+		or None if lrclib has none. Connection errors, `CircuitOpenError` and `RateLimitExceeded` are left to the caller.
+		"""
+		key = f"lyrics:{artist}|{title}"
+		cached = await cache.get(key)
+		if cached is not None:
+			return cached or None
+
+		await MusicCacheService.lrclib_limiter.acquire(priority, MusicCacheService.max_wait(priority))
+		async with metrics.timer("lrclib", "get"):
+			status, data = await http.get_json("https://lrclib.net/api/get", {"artist_name": artist, "track_name": title})
+
+		if status == 200:
+			lyrics = {field: data[field] for field in ("albumName", "trackName", "artistName", "plainLyrics", "instrumental")}
+			await cache.set(key, lyrics, MusicCacheService.LYRICS_TTL)
+			return lyrics
+
+		if status == 404:
+			await cache.set(key, {}, MusicCacheService.MISSING_LYRICS_TTL)
+		return None
+
+
+	def _watch_playlist(seed: str) -> dict:
+		# runs in a worker thread, ytmusicapi is synchronous
+		if MusicCacheService._ytmusic is None:
+			import ytmusicapi # only imported once autoplay needs it, it takes longer to import than everything else
+			MusicCacheService._ytmusic = ytmusicapi.YTMusic(requests_session=requests_session())
+		return MusicCacheService._ytmusic.get_watch_playlist(seed, limit=10, radio=True)
+
+
+	async def get_watch_playlist(seed: str, priority: int = RateLimiter.LOW) -> list[dict]:
+		"""
+		Returns the tracks of the YouTube Music radio of `seed`, trimmed to the fields autoplay uses.
+
+		The call is made in a worker thread so it does not block the event loop.
+		"""
+		key = f"watch:{seed}"
+		cached = await cache.get(key)
+		if cached is not None:
+			return cached
+
+		breaker = MusicCacheService.ytmusic_breaker
+		if not breaker.allow():
+			metrics.count_http("music.youtube.com", "short_circuit")
+			raise CircuitOpenError("YouTube Music is failing, not calling it for now")
+
+		await MusicCacheService.ytmusic_limiter.acquire(priority, MusicCacheService.max_wait(priority))
+		try:
+			async with metrics.timer("ytmusic", "get_watch_playlist"):
+				watch = await asyncio.wait_for(asyncio.to_thread(MusicCacheService._watch_playlist, seed), MusicCacheService.YTMUSIC_TIMEOUT)
+		except Exception:
+			breaker.record_failure()
+			raise
+		breaker.record_success()
+
+		tracks = [
+			{
+				"videoId": ytm_track.get("videoId"),
+				"videoType": ytm_track.get("videoType"),
+				"title": ytm_track.get("title"),
+				"artists": [{"name": artist.get("name")} for artist in ytm_track.get("artists") or []],
+			} for ytm_track in (watch or {}).get("tracks", [])
+		]
+		await cache.set(key, tracks, MusicCacheService.WATCH_PLAYLIST_TTL)
+		return tracks
@@ -1,3 +1,4 @@
+import aiohttp
 import asyncio
 import random
 import time
@@ -5,15 +6,19 @@ from typing import Union
 
 import discord
 import lavalink
-import ytmusicapi
 
 from discord.ext import commands
 
-from bot import LavalinkVoiceClient, Utils
+from bot import LavalinkVoiceClient, SorceryPlayer, Utils
+from bot.http_client import HttpClient
+from bot.instrumentation import metrics
+from bot.rate_limiter import RateLimiter
+from services.music.music_cache_service import MusicCacheService
 
 
 class MusicCoreService:
 
+	@metrics.timed("check", "create_player")
 	async def create_player(ctx: discord.ApplicationContext):
 		"""
 		A check that is invoked before any commands marked with `@discord.Bot.check(create_player)` can run.
@@ -27,7 +32,7 @@ class MusicCoreService:
 		if ctx.guild is None:
 			raise commands.NoPrivateMessage()
 		
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.create(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.create(ctx.guild.id)
 
 		# Create returns a player if one exists, otherwise creates.
 		# This line is important because it ensures that a player always exists for a guild.
@@ -71,12 +76,7 @@ class MusicCoreService:
 					await ctx.respond("Your voice channel is full!", ephemeral=True)
 					raise discord.ApplicationCommandInvokeError("Your voice channel is full!")
 				
-			player.store('channel', ctx.channel.id)
-			player.store('autoplay', False)
-			player.store('autoplay_track', None)
-			player.store('history', [])
-			player.store("empty_channel_timeout_task", None)
-			player.store("inactive_player_timeout_task", None)
+			player.session.reset(ctx.channel.id)
 			await player.set_volume(30)
 			await ctx.author.voice.channel.connect(cls=LavalinkVoiceClient)
 
@@ -85,8 +85,8 @@ class MusicCoreService:
 				message = f'Please join {voice_client.channel} to use this command'
 				await ctx.respond(message, ephemeral=True)
 				raise discord.errors.ApplicationCommandInvokeError(message)
-			elif ctx.channel_id != player.fetch('channel'):
-				message = f"Please use <#{player.fetch('channel')}> to interact with the player."
+			elif ctx.channel_id != player.session.channel_id:
+				message = f"Please use <#{player.session.channel_id}> to interact with the player."
 				await ctx.respond(message, ephemeral=True)
 				raise discord.ApplicationCommandInvokeError(message)
 		
@@ -109,7 +109,7 @@ class MusicCoreService:
 
 		src = "" if ctx.options["source"] is None else ctx.options["source"]
 
-		search_result: lavalink.LoadResult = await ctx.bot.lavalink.get_tracks(f"{src}{ctx.value}") # generating tracklist from the value of the query
+		search_result: lavalink.LoadResult = await MusicCacheService.get_tracks(ctx.bot.lavalink, f"{src}{ctx.value}") # generating tracklist from the value of the query
 
 		if search_result.load_type == lavalink.LoadType.PLAYLIST:
 			self.search_results[ctx.interaction.user.id][search_result.playlist_info.name[:100]] = search_result
@@ -134,8 +134,8 @@ class MusicCoreService:
 					value=-1,
 				)
 			]
-		player: lavalink.DefaultPlayer = self.bot.lavalink.player_manager.get(ctx.interaction.guild.id)
-		history: list[lavalink.AudioTrack] = player.fetch('history')[1:]
+		player: SorceryPlayer = self.bot.lavalink.player_manager.get(ctx.interaction.guild.id)
+		history: list[lavalink.AudioTrack] = player.session.history[1:]
 		if not history:
 			return [
 				discord.OptionChoice(
@@ -151,40 +151,53 @@ class MusicCoreService:
 		]
 	
 
-	async def play(ctx: discord.ApplicationContext, chosenResult: Union[lavalink.AudioTrack, lavalink.DeferredAudioTrack, lavalink.LoadResult]):
+	async def play(ctx: discord.ApplicationContext, chosenResult: Union[lavalink.AudioTrack, lavalink.DeferredAudioTrack, lavalink.LoadResult], dedupe: bool = False):
 		"""
 		Docstring for play
+
+		A track that is already queued is not added again. With `dedupe`, the tracks of a playlist that are
+		already queued (or appear earlier in the playlist) are skipped too.
 		
 		:param ctx: Description
 		:type ctx: discord.ApplicationContext
 		:param chosenResult: Description
 		:type chosenResult: Union[lavalink.AudioTrack, lavalink.DeferredAudioTrack, lavalink.LoadResult]
+		:param dedupe: Whether to skip the duplicates of a playlist
+		:type dedupe: bool
 		"""
 		# Get the player for this guild from cache
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		added_at = int(time.time())
 
-		inactive_player_timeout_task: asyncio.Task = player.fetch("inactive_player_timeout_task")
+		inactive_player_timeout_task = player.session.inactive_player_timeout_task
 		if inactive_player_timeout_task and not inactive_player_timeout_task.done():
 			inactive_player_timeout_task.cancel()
 			await ctx.respond("Timeout cancelled.")
-		player.store("inactive_player_timeout_task", None)
+		player.session.inactive_player_timeout_task = None
 
 		if isinstance(chosenResult, lavalink.LoadResult): # check if the chosenResult is a playlist
 			tracks = chosenResult.tracks
+			skipped = 0
 			# Add all of the tracks from the playlist to the queue
 			for track in tracks:
+				if dedupe and track.identifier in player.queue.identifiers: # also catches the duplicates within the playlist, as they are added one by one
+					skipped += 1
+					continue
 				# requester isn't necessary but it helps keep track of who queued what
 				# you can store additional metadata by passing it as a kwarg (i.e. key=value)
 				track.extra['added_at'] = added_at
 				track.extra['albumName'] = chosenResult.playlist_info.name
 				player.add(track=track, requester=ctx.author.id)
 				
-			await ctx.respond(f"Added the playlist **`{chosenResult.playlist_info.name} ({len(chosenResult.tracks)} tracks)`** to the queue.")
+			await ctx.respond(f"Added the playlist **`{chosenResult.playlist_info.name} ({len(chosenResult.tracks) - skipped} tracks)`** to the queue." + (f" Skipped {skipped} duplicates." if skipped else ""))
 		
 		else:
 			track = chosenResult
+			position = player.queue.position(track.identifier)
+			if position is not None:
+				return await ctx.respond(f"**`{track.title}`** is already queued at #{position + 1}.", ephemeral=True)
+
 			track.extra['added_at'] = added_at
 			player.add(track=track, requester=ctx.author.id)
 
@@ -200,10 +213,10 @@ class MusicCoreService:
 		if track_idx == -2:
 			return await ctx.respond("Player history is empty.", ephemeral=True)
 
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		added_at = int(time.time())
 
-		track = player.fetch('history')[track_idx]
+		track = player.session.history[track_idx]
 
 		if track:
 			track.extra['added_at'] = added_at
@@ -218,7 +231,7 @@ class MusicCoreService:
 	
 
 	async def pausetoggle(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.current:
 			return await ctx.respond("Player is idle.")
@@ -228,12 +241,12 @@ class MusicCoreService:
 		await ctx.respond(f"Playback {'paused' if player.paused else 'resumed'}.")
 
 
-	async def disconnect_chores(bot: discord.Bot, player: lavalink.DefaultPlayer):
+	async def disconnect_chores(bot: discord.Bot, player: SorceryPlayer):
 		guild = bot.get_guild(player.guild_id)
 		voice_channel = guild.get_channel(player.channel_id)
 
-		if voice_channel.status == player.fetch('channel_status'):
-			await voice_channel.set_status(None)
+		await bot.voice_status.clear_now(voice_channel) # has to happen before leaving the channel
+		bot.now_playing.forget(player.guild_id)
 
 		# Clear the queue to ensure old tracks don't start playing when someone else queues something
 		player.queue.clear()
@@ -247,7 +260,7 @@ class MusicCoreService:
 		
 		:param ctx: Description
 		"""
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		# The necessary voice channel checks are handled in "create_player"
 		# We don't need to duplicate code checking them again
 
@@ -267,25 +280,30 @@ class MusicCoreService:
 		:param set: Description
 		:type set: bool
 		"""
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild_id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild_id)
 		
 		if not player.is_playing:
 			return await ctx.respond("Player is idle.", ephemeral=True)
 
-		player.store('autoplay', set)
+		player.session.autoplay = set
 
-		if not await MusicCoreService.add_autoplay_track(player):
-			player.store('autoplay', False)
+		if not await MusicCoreService.add_autoplay_track(player, RateLimiter.HIGH): # a user is waiting on it
+			player.session.autoplay = False
 			return await ctx.respond(f"No autoplay tracks to add. Play a `YouTube` track first and try again!")
 
 		await ctx.respond(f"Autoplay has been {'enabled' if set else 'disabled'}.")
 	
 
-	async def add_autoplay_track(player: lavalink.DefaultPlayer):
-		if not player.fetch("autoplay"):
+	async def add_autoplay_track(player: SorceryPlayer, priority: int = RateLimiter.LOW):
+		"""
+		Picks the next autoplay track from the YouTube Music radio of the recent history. `priority` is the one
+		the YouTube Music calls are made with, `LOW` for the prefetch from the event hooks.
+		"""
+		session = player.session
+		if not session.autoplay:
 			return True
 		
-		history: list[lavalink.AudioTrack] = player.fetch("history")
+		history = session.history
 		
 		history_track_ids: list[str] = [history_track.identifier for history_track in history if history_track.source_name == "youtube"]
 
@@ -301,18 +319,11 @@ class MusicCoreService:
 		track = None
 
 		# first pass (using ytmusicapi)
-		ytmusic = ytmusicapi.YTMusic()
-
 		for seed in seed_candidates:
 			try:
-				watch = ytmusic.get_watch_playlist(seed, limit=10, radio=True)
+				ytm_tracks = await MusicCacheService.get_watch_playlist(seed, priority)
 			except Exception:
-				watch = None
-			
-			if not watch:
-				continue
-			
-			ytm_tracks = watch.get("tracks", [])
+				ytm_tracks = None
 			
 			if not ytm_tracks:
 				continue
@@ -321,62 +332,62 @@ class MusicCoreService:
 
 			if fresh_ytm_tracks:
 				ytm_track = random.choice(fresh_ytm_tracks)
-				track_search = await player.node.get_tracks(f"ytmsearch:{ytm_track.get("title")} {ytm_track.get("artists")[0]["name"]}")
+				track_search = await MusicCacheService.get_tracks(player.node, f"ytmsearch:{ytm_track.get("title")} {ytm_track.get("artists")[0]["name"]}")
 				track = track_search.tracks[0]
-				player.store("autoplay_track", track)
+				session.autoplay_track = track
 				return True
 
 			semi_fresh_ytm_tracks = [ytm_track for ytm_track in ytm_tracks[:10] if ytm_track.get("videoId") and ytm_track.get("videoType") == "MUSIC_VIDEO_TYPE_ATV" and ytm_track.get("videoId") not in recent_history_id_set]
 			if semi_fresh_ytm_tracks:
 				ytm_track = random.choice(semi_fresh_ytm_tracks)
-				track_search = await player.node.get_tracks(f"ytmsearch:{ytm_track.get("title")} {ytm_track.get("artists")[0]["name"]}")
+				track_search = await MusicCacheService.get_tracks(player.node, f"ytmsearch:{ytm_track.get("title")} {ytm_track.get("artists")[0]["name"]}")
 				track = track_search.tracks[0]
-				player.store("autoplay_track", track)
+				session.autoplay_track = track
 				return True
 		
 
 		# second pass if first pass does not bring any results
 		for seed in seed_candidates:
 			search_query = f"https://music.youtube.com/watch?v={seed}&list=RDAMVM{seed}"
-			search_result: lavalink.LoadResult = await player.node.get_tracks(search_query)
+			search_result: lavalink.LoadResult = await MusicCacheService.get_tracks(player.node, search_query)
 
 			fresh = [track for track in search_result.tracks if track.identifier not in history_id_set]
 			
 			if fresh:
 				track = random.choice(fresh)
-				player.store("autoplay_track", track)
+				session.autoplay_track = track
 				return True
 			
 			semi_fresh = [track for track in search_result.tracks if track.identifier not in recent_history_id_set]
 
 			if semi_fresh:
 				track = random.choice(semi_fresh)
-				player.store("autoplay_track", track)
+				session.autoplay_track = track
 				return True
 		
 		# third pass
 		search_query = f"https://music.youtube.com/watch?v={seed_candidates[0]}&list=RDAMVM{seed_candidates[0]}"
-		search_result: lavalink.LoadResult = await player.node.get_tracks(search_query)
+		search_result: lavalink.LoadResult = await MusicCacheService.get_tracks(player.node, search_query)
 
 		track = random.choice(search_result.tracks[1:])
 			
-		player.store("autoplay_track", track)
+		session.autoplay_track = track
 
 		return True
 	
 
-	async def add_autoplay_track_to_queue(player: lavalink.DefaultPlayer):
-		autoplay_track = player.fetch("autoplay_track")
+	async def add_autoplay_track_to_queue(player: SorceryPlayer):
+		autoplay_track = player.session.autoplay_track
 		if autoplay_track:
 			player.add(autoplay_track)
-			player.store("autoplay_track", None)
+			player.session.autoplay_track = None
 			await asyncio.sleep(1)
 			if not player.is_playing:
 				await player.play()
 	
 
 	async def nowplaying(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -409,18 +420,21 @@ class MusicCoreService:
 
 		embed.add_field(name="Source", value=track.source_name, inline=True)
 
+		if player.queue:
+			embed.add_field(name="Up next", value=MusicCoreService.get_queue_summary(player), inline=False)
+
 		await ctx.respond(embed=embed)
 	
 
 	async def set_volume(ctx: discord.ApplicationContext, value: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		await player.set_volume(value)
 		await ctx.respond(f"Volume set to {value}.")
 	
 
 	async def skip_track(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("The queue is empty. Nothing to skip.")
@@ -441,7 +455,7 @@ class MusicCoreService:
 	
 
 	async def restart_current_track(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -455,7 +469,7 @@ class MusicCoreService:
 	
 
 	async def seek(ctx: discord.ApplicationContext, hour: int, minute: int, second: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -474,7 +488,7 @@ class MusicCoreService:
 	
 
 	async def rewind(ctx: discord.ApplicationContext, value: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -494,7 +508,7 @@ class MusicCoreService:
 
 
 	async def fastforward(ctx: discord.ApplicationContext, value: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -514,7 +528,7 @@ class MusicCoreService:
 	
 
 	async def stop_player(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
@@ -523,12 +537,37 @@ class MusicCoreService:
 		await ctx.respond("Playback has stopped.")
 
 	
+	async def load_lyrics(http: HttpClient, track: lavalink.AudioTrack, priority: int = RateLimiter.LOW) -> bool:
+		"""
+		Looks up the lyrics of `track` on lrclib and adds them to its `extra`. Returns whether the track has lyrics.
+		"""
+		if "plainLyrics" in track.extra:
+			return True
+
+		lrclib_data = await MusicCacheService.get_lyrics(http, track.author.removesuffix(" - Topic"), track.title, priority)
+		if not lrclib_data:
+			return False
+
+		track.extra["albumName"] = lrclib_data["albumName"]
+		track.extra["trackName"] = lrclib_data["trackName"]
+		track.extra["artistName"] = lrclib_data["artistName"]
+		track.extra["plainLyrics"] = lrclib_data["plainLyrics"] if not lrclib_data["instrumental"] else "🎼 instrumental 🎼"
+		return True
+
+
 	async def lyrics(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if not player.is_playing:
 			return await ctx.respond("No track is currently being played.", ephemeral=True)
 		
+		if "plainLyrics" not in player.current.extra: # the lookup on track start was skipped or has not finished yet
+			await ctx.defer()
+			try:
+				await MusicCoreService.load_lyrics(ctx.bot.http_client, player.current, RateLimiter.HIGH)
+			except (aiohttp.ClientError, asyncio.TimeoutError):
+				return await ctx.respond("Lyrics are unavailable right now, try again later.", ephemeral=True)
+		
 		if "plainLyrics" in player.current.extra:
 			author = discord.EmbedAuthor(name=f"{ctx.author.nick if ctx.author.nick else ctx.author.display_name}", icon_url=ctx.author.avatar)
 			description = f"Artist: {player.current.extra["artistName"]}"
@@ -550,18 +589,30 @@ class MusicCoreService:
 		return await ctx.respond("No lyrics found for the current track.", ephemeral=True)
 	
 
-	def get_player_state(player: lavalink.DefaultPlayer):
+	def get_player_state(player: SorceryPlayer):
 		"""
 		Docstring for get_player_state
 		
 		:param player: Description
-		:type player: lavalink.DefaultPlayer
+		:type player: SorceryPlayer
 		"""
 		if not player:
 			return
 		
 		player_state = f"{'🔁' if player.loop == player.LOOP_QUEUE else '🔂' if player.loop == player.LOOP_SINGLE else '🚫'} Loop: {'all' if player.loop == player.LOOP_QUEUE else 'one' if player.loop == player.LOOP_SINGLE else 'off'}\t\t"
 		player_state += f"{'🚨' if player.volume > 100 else '🔊' if player.volume > 67 else '🔉' if player.volume > 33 else '🔈' if player.volume > 0 else '🔇'} Volume: {player.volume}\t\t"
-		player_state += f"{'♾️' if player.fetch('autoplay') else '❎'} Autoplay: {'on' if player.fetch('autoplay') else 'off'}"
+		autoplay = player.session.autoplay
+		player_state += f"{'♾️' if autoplay else '❎'} Autoplay: {'on' if autoplay else 'off'}"
 
 		return player_state
+	
+
+	def get_queue_summary(player: SorceryPlayer, limit: int = 3) -> str:
+		"""
+		Summarizes the queue from its running aggregates: the number of tracks, the time until it runs out,
+		and the `limit` requesters and sources with the most tracks in it.
+		"""
+		queue = player.queue
+		requesters = ", ".join(f"<@{requester}> ({count})" if requester else f"autoplay ({count})" for requester, count in queue.requesters.most_common(limit))
+		sources = ", ".join(f"{source} ({count})" for source, count in queue.sources.most_common(limit))
+		return f"{len(queue)} tracks, {Utils.milli_to_minutes(player.remaining)} left\nRequested by {requesters}\nFrom {sources}"
@@ -1,62 +1,110 @@
+import copy
+
 import discord
 import lavalink
 
 from discord.ext import pages
-from bot import CustomPage
+from bot import CustomPage, LazyPages, SorceryPlayer
 
 class MusicFilterService:
 
+	# the filters shown by `/filter stats`, one page each
+	FILTER_NAMES = {
+		'equalizer': 'Equalizer',
+		'karaoke': 'Karaoke',
+		'timescale': 'Timescale',
+		'tremolo': 'Tremolo',
+		'vibrato': 'Vibrato',
+		'rotation': 'Rotation',
+		'distortion': 'Distortion',
+		'channelmix': 'Channel Mix',
+		'lowpass': 'Low Pass',
+	}
+
+	FILTER_FIELDS = {
+		"Karaoke": ['level', 'monoLevel', 'filterBand', 'filterWidth'],
+		"Timescale": ['speed', 'pitch', 'rate'],
+		"Tremolo": ['frequency', 'depth'],
+		"Vibrato": ['frequency', 'depth'],
+		"Rotation": 'rotationHz',
+		"Distortion": ['sinOffset', 'sinScale', 'cosOffset', 'cosScale', 'tanOffset', 'tanScale', 'offset', 'scale'],
+		"Channel Mix": ['leftToLeft', 'leftToRight', 'rightToLeft', 'rightToRight'],
+		"Low Pass": 'smoothing',
+	}
+
+	EQUALIZER_BANDS = [
+		"25 Hz", "40 Hz", "63 Hz", "100 Hz", "160 Hz", "250 Hz", "400 Hz", "630 Hz",
+		"1000 Hz", "1600 Hz", "2500 Hz", "4000 Hz", "6300 Hz", "10000 Hz", "16000 Hz",
+	]
+
 
 	async def reset_all_filters(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		
-		await player.clear_filters()
+		await MusicFilterService.clear_filters(player)
 
 		await ctx.respond("All filters have been reset.")
 	
 
 	async def filter_volume(ctx: discord.ApplicationContext, value: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		volume = lavalink.filters.Volume()
 		volume.update(volume=value)
 
-		await player.set_filter(volume)
+		await MusicFilterService.apply_filter(player, volume)
 
 		await ctx.respond(f"Filter volume has been set to `{value}`")
 	
 
+	async def apply_filter(player: SorceryPlayer, _filter: lavalink.Filter):
+		"""
+		Applies a filter to the player and bumps the player's filter version.
+
+		Every filter change must go through `apply_filter`, `remove_filter` or `clear_filters`,
+		otherwise `/filter stats` keeps showing the pages cached for the previous version.
+		"""
+		await player.set_filter(_filter)
+		MusicFilterService.bump_filter_version(player)
+	
+
+	async def apply_filters(player: SorceryPlayer, *filters: lavalink.Filter):
+		"""
+		Applies several filters to the player with a single Lavalink update.
+		"""
+		await player.set_filters(*filters)
+		MusicFilterService.bump_filter_version(player)
+	
+
+	async def remove_filter(player: SorceryPlayer, filter_name: str):
+		await player.remove_filter(filter_name)
+		MusicFilterService.bump_filter_version(player)
+	
+
+	async def clear_filters(player: SorceryPlayer):
+		await player.clear_filters()
+		MusicFilterService.bump_filter_version(player)
+	
+
+	def bump_filter_version(player: SorceryPlayer):
+		player.session.filter_version += 1
+	
+
 	async def filter_stats(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
-
-		all_filters = {
-			'equalizer': 'Equalizer',
-			'karaoke': 'Karaoke',
-			'timescale': 'Timescale',
-			'tremolo': 'Tremolo',
-			'vibrato': 'Vibrato',
-			'rotation': 'Rotation',
-			'distortion': 'Distortion',
-			'channelmix': 'Channel Mix',
-			'lowpass': 'Low Pass',
-		}
-
-		filter_pages = []
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		volume = -1.0
-		if player.get_filter('volume'):
-			volume = player.get_filter('volume').values
+		stats_pages = MusicFilterService.get_stats_pages(player)
 
-		for filter in all_filters.keys():
-			if not player.get_filter(filter):
-				payload = None
-			else:
-				payload = player.get_filter(filter).values
+		author = discord.EmbedAuthor(name=f"{ctx.author.nick if ctx.author.nick else ctx.author.display_name}", icon_url=ctx.author.avatar)
 
-			filter_pages.append(MusicFilterService.get_embed(ctx, all_filters[filter], volume, payload))
+		def with_author(idx: int) -> discord.Embed:
+			# the cached page is shared between invocations, so only a shallow copy gets the author of this one
+			embed = copy.copy(stats_pages[idx])
+			embed.set_author(name=author.name, icon_url=author.icon_url)
+			return embed
 
 		paginator = pages.Paginator(
-			pages=filter_pages,
+			pages=LazyPages(len(stats_pages), with_author),
 			use_default_buttons=False,
 			custom_buttons=CustomPage.BUTTONS,
 		)
@@ -64,31 +112,46 @@ class MusicFilterService:
 		await paginator.respond(ctx.interaction)
 	
 
-	def get_embed(ctx: discord.ApplicationContext, filter_type: str, filter_volume: float, payload): # payload is a name that has passed from wavelink. it's basically `values` from Filter object. it can also be `None`
-		
-		filters = {
-			"Karaoke": ['level', 'monoLevel', 'filterBand', 'filterWidth'],
-			"Timescale": ['speed', 'pitch', 'rate'],
-			"Tremolo": ['frequency', 'depth'],
-			"Vibrato": ['frequency', 'depth'],
-			"Rotation": 'rotationHz',
-			"Distortion": ['sinOffset', 'sinScale', 'cosOffset', 'cosScale', 'tanOffset', 'tanScale', 'offset', 'scale'],
-			"Channel Mix": ['leftToLeft', 'leftToRight', 'rightToLeft', 'rightToRight'],
-			"Low Pass": 'smoothing',
-		}
-
-		bands = [
-			"25 Hz", "40 Hz", "63 Hz", "100 Hz", "160 Hz", "250 Hz", "400 Hz", "630 Hz",
-			"1000 Hz", "1600 Hz", "2500 Hz", "4000 Hz", "6300 Hz", "10000 Hz", "16000 Hz",
-		]
+	def get_stats_pages(player: SorceryPlayer) -> LazyPages:
+		"""
+		Returns the `/filter stats` pages of the player for its current filter version.
 
-		author = discord.EmbedAuthor(name=f"{ctx.author.nick if ctx.author.nick else ctx.author.display_name}", icon_url=ctx.author.avatar)
+		The pages are cached on the player and only rebuilt after a filter changes. Each page is
+		built the first time the paginator navigates to it.
+		"""
+		version = player.session.filter_version
+		cached_version, stats_pages = player.session.filter_stats_pages or (None, None)
+
+		if cached_version == version:
+			return stats_pages
+
+		volume = -1.0
+		volume_filter = player.get_filter('volume')
+		if volume_filter:
+			volume = volume_filter.values
+
+		filter_keys = list(MusicFilterService.FILTER_NAMES.keys())
+
+		def build_page(idx: int) -> discord.Embed:
+			filter_key = filter_keys[idx]
+			_filter = player.get_filter(filter_key)
+			payload = _filter.values if _filter else None
+			return MusicFilterService.get_embed(MusicFilterService.FILTER_NAMES[filter_key], volume, payload)
+
+		stats_pages = LazyPages(len(filter_keys), build_page)
+		player.session.filter_stats_pages = (version, stats_pages)
+
+		return stats_pages
+	
+
+	def get_embed(filter_type: str, filter_volume: float, payload): # payload is a name that has passed from wavelink. it's basically `values` from Filter object. it can also be `None`
+		
 		footer = None
 
 		if filter_volume != -1:
 			footer = discord.EmbedFooter(text=f"Volume Multiplier: {filter_volume}")
 		
-		embed: discord.Embed = discord.Embed(title="Current Filter Settings", description=f"## {filter_type}", author=author, footer=footer)
+		embed: discord.Embed = discord.Embed(title="Current Filter Settings", description=f"## {filter_type}", footer=footer)
 
 		if not payload:
 			embed.add_field(name="", value="*Filter has not been set.*", inline=False)
@@ -96,18 +159,18 @@ class MusicFilterService:
 		
 		if filter_type == "Equalizer":
 			for i in range(15):
-				embed.add_field(name=bands[i], value=payload[i])
+				embed.add_field(name=MusicFilterService.EQUALIZER_BANDS[i], value=payload[i])
 			return embed
 		
 		if filter_type == "Rotation":
-			embed.add_field(name=filters[filter_type], value=payload)
+			embed.add_field(name=MusicFilterService.FILTER_FIELDS[filter_type], value=payload)
 			return embed
 		
 		if filter_type == "Low Pass":
-			embed.add_field(name=filters[filter_type], value=payload)
+			embed.add_field(name=MusicFilterService.FILTER_FIELDS[filter_type], value=payload)
 			return embed
 		
-		for field in filters[filter_type]:
+		for field in MusicFilterService.FILTER_FIELDS[filter_type]:
 			if field in payload:
 				embed.add_field(name=field, value=payload[field])
 		
@@ -115,7 +178,7 @@ class MusicFilterService:
 	
 
 	async def set_equalizer(ctx: discord.ApplicationContext, band0: float = None, band1: float = None, band2: float = None, band3: float = None, band4: float = None, band5: float = None, band6: float = None, band7: float = None, band8: float = None, band9: float = None, band10: float = None, band11: float = None, band12: float = None, band13: float = None, band14: float = None):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		gains = [
 			band0, band1, band2, band3, band4,
@@ -142,21 +205,21 @@ class MusicFilterService:
 		equalizer = lavalink.filters.Equalizer()
 		equalizer.update(bands=bands)
 
-		await player.set_filter(equalizer)
+		await MusicFilterService.apply_filter(player, equalizer)
 
 		await ctx.respond("Equalizer has been set.")
 	
 
 	async def reset_equalizer(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('equalizer')
+		await MusicFilterService.remove_filter(player, 'equalizer')
 
 		await ctx.respond("Equalizer has been reset.")
 	
 
 	async def set_karaoke(ctx: discord.ApplicationContext, level: float = 1.0, mono_level: float = 1.0, filter_band: float = 220, filter_width: float = 100):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		
 		karaoke = lavalink.filters.Karaoke()
 		karaoke.update(
@@ -166,21 +229,21 @@ class MusicFilterService:
 			filter_width=filter_width,
 		)
 
-		await player.set_filter(karaoke)
+		await MusicFilterService.apply_filter(player, karaoke)
 
 		await ctx.respond("Karaoke has been applied.")
 	
 
 	async def reset_karaoke(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('karaoke')
+		await MusicFilterService.remove_filter(player, 'karaoke')
 
 		await ctx.respond("Karaoke has been reset.")
 	
 
 	async def set_timescale(ctx: discord.ApplicationContext, speed: float, pitch: float, rate: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		timescale = lavalink.filters.Timescale()
 		timescale.update(
@@ -189,21 +252,21 @@ class MusicFilterService:
 			rate=rate,
 		)
 
-		await player.set_filter(timescale)
+		await MusicFilterService.apply_filter(player, timescale)
 
 		await ctx.respond("Timescale has been set.")
 	
 
 	async def reset_timescale(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('timescale')
+		await MusicFilterService.remove_filter(player, 'timescale')
 
 		await ctx.respond("Timescale has been reset.")
 	
 
 	async def set_tremolo(ctx: discord.ApplicationContext, frequency: float, depth: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		tremolo = lavalink.filters.Tremolo()
 		tremolo.update(
@@ -211,21 +274,21 @@ class MusicFilterService:
 			depth=depth,
 		)
 
-		await player.set_filter(tremolo)
+		await MusicFilterService.apply_filter(player, tremolo)
 
 		await ctx.respond("Tremolo has been set.")
 	
 
 	async def reset_tremolo(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('tremolo')
+		await MusicFilterService.remove_filter(player, 'tremolo')
 
 		await ctx.respond("Tremolo has been reset.")
 	
 
 	async def set_vibrato(ctx: discord.ApplicationContext, frequency: float, depth: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		vibrato = lavalink.filters.Vibrato()
 		vibrato.update(
@@ -233,42 +296,42 @@ class MusicFilterService:
 			depth=depth,
 		)
 
-		await player.set_filter(vibrato)
+		await MusicFilterService.apply_filter(player, vibrato)
 
 		await ctx.respond("Vibrato has been set.")
 	
 
 	async def reset_vibrato(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('vibrato')
+		await MusicFilterService.remove_filter(player, 'vibrato')
 
 		await ctx.respond("Vibrato has been reset.")
 	
 
 	async def set_rotation(ctx: discord.ApplicationContext, rotation_hz: float = 0.2):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		rotation = lavalink.filters.Rotation()
 		rotation.update(
 			rotation_hz=rotation_hz
 		)
 
-		await player.set_filter(rotation)
+		await MusicFilterService.apply_filter(player, rotation)
 
 		await ctx.respond("Rotation has been set.")
 	
 
 	async def reset_rotation(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('rotation')
+		await MusicFilterService.remove_filter(player, 'rotation')
 
 		await ctx.respond("Rotation has been reset.")
 	
 
 	async def set_distortion(ctx: discord.ApplicationContext, sin_offset: float, sin_scale: float, cos_offset: float, cos_scale: float, tan_offset: float, tan_scale: float, offset: float, scale: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		distortion = lavalink.filters.Distortion()
 		distortion.update(
@@ -282,21 +345,21 @@ class MusicFilterService:
 			scale=scale,
 		)
 
-		await player.set_filter(distortion)
+		await MusicFilterService.apply_filter(player, distortion)
 
 		await ctx.respond("Distortion has been set.")
 	
 
 	async def reset_distortion(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('distortion')
+		await MusicFilterService.remove_filter(player, 'distortion')
 
 		await ctx.respond("Distortion has been reset.")
 	
 
 	async def set_channelmix(ctx: discord.ApplicationContext, left_to_left: float, left_to_right: float, right_to_left: float, right_to_right: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		channelmix = lavalink.filters.ChannelMix()
 		channelmix.update(
@@ -306,38 +369,176 @@ class MusicFilterService:
 			right_to_right=right_to_right,
 		)
 
-		await player.set_filter(channelmix)
+		await MusicFilterService.apply_filter(player, channelmix)
 
 		await ctx.respond("Channel Mix has been set.")
 	
 
 	async def reset_channelmix(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('channelmix')
+		await MusicFilterService.remove_filter(player, 'channelmix')
 
 		await ctx.respond("Channel Mix has been reset.")
 	
 
 	async def set_lowpass(ctx: discord.ApplicationContext, smoothing: float):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		lowpass = lavalink.filters.LowPass()
 		lowpass.update(
 			smoothing=smoothing
 		)
 
-		await player.set_filter(lowpass)
+		await MusicFilterService.apply_filter(player, lowpass)
 
 		await ctx.respond("Low Pass has been set.")
 	
 
 	async def reset_lowpass(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
-		await player.remove_filter('lowpass')
+		await MusicFilterService.remove_filter(player, 'lowpass')
 
 		await ctx.respond("Low Pass has been reset.")
+
+
+	async def tune(ctx: discord.ApplicationContext):
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+
+		view = FilterTuningView(ctx.bot, player)
+
+		await ctx.respond(embed=view.get_embed(), view=view)
+
+
+class FilterTuningView(discord.ui.View):
+	"""
+	Buttons that nudge the timescale and equalizer filters of a player.
+
+	The embed is updated on every press, but the filters are sent to Lavalink through
+	`bot.filter_debouncer`, so rapid presses end up as at most one update per
+	`SorceryBot.filter_update_interval` for the player.
+	"""
+
+	STEP = 0.05
+
+	SPEED_RANGE = (0.5, 2.0)
+	PITCH_RANGE = (0.5, 2.0)
+	GAIN_RANGE = (-0.25, 1.0)
+
+	BASS_BANDS = range(0, 4) # 25 Hz to 100 Hz
+	TREBLE_BANDS = range(11, 15) # 4000 Hz to 16000 Hz
+
+	def __init__(self, bot: discord.Bot, player: SorceryPlayer):
+		super().__init__(timeout=120, disable_on_timeout=True)
+		self.bot = bot
+		self.player = player
+
+		timescale = player.get_filter('timescale')
+		self.speed: float = timescale.values['speed'] if timescale else 1.0
+		self.pitch: float = timescale.values['pitch'] if timescale else 1.0
+		self.rate: float = timescale.values['rate'] if timescale else 1.0
+
+		equalizer = player.get_filter('equalizer')
+		self.gains: list[float] = list(equalizer.values) if equalizer else [0.0] * 15
+	
+
+	def get_embed(self) -> discord.Embed:
+		embed = discord.Embed(title="Filter Tuning", description="Changes are applied a moment after you stop pressing.")
+		embed.add_field(name="Speed", value=f"{self.speed:.2f}")
+		embed.add_field(name="Pitch", value=f"{self.pitch:.2f}")
+		embed.add_field(name="", value="", inline=False)
+		embed.add_field(name="Bass", value=f"{self.get_gain(self.BASS_BANDS):+.2f}")
+		embed.add_field(name="Treble", value=f"{self.get_gain(self.TREBLE_BANDS):+.2f}")
+		return embed
+	
+
+	def get_gain(self, bands: range) -> float:
+		return sum(self.gains[band] for band in bands) / len(bands)
+	
+
+	def nudge_gain(self, bands: range, step: float):
+		low, high = self.GAIN_RANGE
+		for band in bands:
+			self.gains[band] = round(min(high, max(low, self.gains[band] + step)), 2)
+	
+
+	async def interaction_check(self, interaction: discord.Interaction) -> bool:
+		if interaction.user.voice and interaction.user.voice.channel and interaction.user.voice.channel.id == self.player.channel_id:
+			return True
+		
+		await interaction.response.send_message("Join the player's voice channel to tune the filters.", ephemeral=True)
+		return False
 	
 
+	async def update(self, interaction: discord.Interaction):
+		await interaction.response.edit_message(embed=self.get_embed(), view=self)
+		self.bot.filter_debouncer.schedule(self.player.guild_id, self.apply)
 	
+
+	async def apply(self):
+		# reads the values at the time the debouncer fires, so only the latest state is sent
+		if not self.player.is_connected:
+			return
+
+		timescale = lavalink.filters.Timescale()
+		timescale.update(speed=self.speed, pitch=self.pitch, rate=self.rate)
+
+		equalizer = lavalink.filters.Equalizer(list(self.gains))
+
+		await MusicFilterService.apply_filters(self.player, timescale, equalizer)
+	
+
+	@discord.ui.button(label="Speed -", style=discord.ButtonStyle.secondary, row=0)
+	async def speed_down(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.speed = round(max(self.SPEED_RANGE[0], self.speed - self.STEP), 2)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Speed +", style=discord.ButtonStyle.secondary, row=0)
+	async def speed_up(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.speed = round(min(self.SPEED_RANGE[1], self.speed + self.STEP), 2)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Pitch -", style=discord.ButtonStyle.secondary, row=0)
+	async def pitch_down(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.pitch = round(max(self.PITCH_RANGE[0], self.pitch - self.STEP), 2)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Pitch +", style=discord.ButtonStyle.secondary, row=0)
+	async def pitch_up(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.pitch = round(min(self.PITCH_RANGE[1], self.pitch + self.STEP), 2)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Bass -", style=discord.ButtonStyle.secondary, row=1)
+	async def bass_down(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.nudge_gain(self.BASS_BANDS, -self.STEP)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Bass +", style=discord.ButtonStyle.secondary, row=1)
+	async def bass_up(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.nudge_gain(self.BASS_BANDS, self.STEP)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Treble -", style=discord.ButtonStyle.secondary, row=1)
+	async def treble_down(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.nudge_gain(self.TREBLE_BANDS, -self.STEP)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Treble +", style=discord.ButtonStyle.secondary, row=1)
+	async def treble_up(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.nudge_gain(self.TREBLE_BANDS, self.STEP)
+		await self.update(interaction)
+	
+
+	@discord.ui.button(label="Reset", style=discord.ButtonStyle.danger, row=2)
+	async def reset(self, button: discord.ui.Button, interaction: discord.Interaction):
+		self.speed = self.pitch = self.rate = 1.0
+		self.gains = [0.0] * 15
+		await self.update(interaction)
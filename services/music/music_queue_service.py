@@ -1,13 +1,18 @@
+import logging
+
 import discord
 import lavalink
 
 from discord.ext import pages
 
-from bot import Utils, CustomPage
+from bot import Utils, CustomPage, LazyPages, SorceryPlayer
 
 from services.music.music_core_service import MusicCoreService
 
 
+_log = logging.getLogger(__name__)
+
+
 class MusicQueueService:
 	
 	async def get_queue_paginator(ctx: discord.ApplicationContext, category: int):
@@ -31,7 +36,7 @@ class MusicQueueService:
 		thumbnail = None
 		empty_queue_message = ""
 		
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		footerText = MusicCoreService.get_player_state(player)
 		footer = discord.EmbedFooter(text=footerText)
@@ -44,65 +49,56 @@ class MusicQueueService:
 
 		if category == 0: # current queue
 			queue: list[lavalink.AudioTrack] = player.queue
-			description += "## 📜 Queue"
+			description += "## 📜 Queue (fair)" if player.fair else f"## 📜 Queue (shuffled, seed {player.queue.seed})" if player.shuffled else "## 📜 Queue"
 			empty_queue_message = "Queue is empty."
-			if player.fetch("autoplay"):
+			if player.session.autoplay:
 				empty_queue_message += " Autoplay is enabled."
 		elif category == 1: # history
 			if player.is_playing:
 				history_idx = 1
 			else:
 				history_idx = 0
-			queue: list[lavalink.AudioTrack] = player.fetch('history')[history_idx:]
+			queue: list[lavalink.AudioTrack] = player.session.history[history_idx:]
 			description += "## ⌛ History"
 			empty_queue_message = "Player history is empty."
 		elif category == 2: # playlist
 			description += "## 💾 Playlist"
 			empty_queue_message = "Playlist is empty."
 		else:
-			print("Not a valid category.")
+			_log.warning("Not a valid queue category: %s", category)
 			return
 		
-		if queue:
+		if queue and category == 0:
+			description += f"\n{MusicCoreService.get_queue_summary(player)}\n"
+		elif queue:
 			description += f"\n\t*({len(queue)} tracks)*\n"
 		
 		author = discord.EmbedAuthor(name=f"{ctx.author.nick if ctx.author.nick else ctx.author.display_name}", icon_url=ctx.author.avatar)
 
-		embed_pages = [] # all the pages for the paginator as a list of Embed objects
-
-		if not queue:
-			embed_pages.append(discord.Embed(
+		def build_page(page_idx: int) -> discord.Embed:
+			# only the tracks on the page are looked at, a fair queue works out its playback order up to them
+			start = page_idx * 10
+			return discord.Embed(
 				author=author,
-				fields=[discord.EmbedField(name="", value=empty_queue_message, inline=False)],
+				fields=[
+					discord.EmbedField(name="", value=f"\n**#{idx + 1} [{item.title}]({item.uri})** by `{item.author}` [{Utils.milli_to_minutes(item.duration)}]", inline=False)
+					for idx, item in enumerate(queue[start:start + 10], start)
+				],
 				description=description,
 				footer=footer,
-				thumbnail=thumbnail
-			))
-		
-		temp_page = [] # A page is basically a list of EmbedField objects
-
-		for idx, item in enumerate(queue):
-			if idx != 0 and idx % 10 == 0:
-				embed_pages.append(discord.Embed(
-					author=author,
-					fields=temp_page,
-					description=description,
-					footer=footer,
-					thumbnail=thumbnail,
-				))
-				temp_page = []
-
-			trackEmbed = discord.EmbedField(name="", value=f"\n**#{idx + 1} [{item.title}]({item.uri})** by `{item.author}` [{Utils.milli_to_minutes(item.duration)}]", inline=False)
-			temp_page.append(trackEmbed)
-
-		if temp_page:
-			embed_pages.append(discord.Embed(
+				thumbnail=thumbnail,
+			)
+
+		if queue:
+			embed_pages = LazyPages((len(queue) + 9) // 10, build_page) # each page is built when it is first shown
+		else:
+			embed_pages = [discord.Embed(
 				author=author,
-				fields=temp_page,
+				fields=[discord.EmbedField(name="", value=empty_queue_message, inline=False)],
 				description=description,
 				footer=footer,
-				thumbnail=thumbnail,
-			))
+				thumbnail=thumbnail
+			)]
 
 		paginator = pages.Paginator(
 			pages=embed_pages,
@@ -123,7 +119,7 @@ class MusicQueueService:
 					value=-1,
 				)
 			]
-		player: lavalink.DefaultPlayer = self.bot.lavalink.player_manager.get(ctx.interaction.guild.id)
+		player: SorceryPlayer = self.bot.lavalink.player_manager.get(ctx.interaction.guild.id)
 		if not player.queue:
 			return [
 				discord.OptionChoice(
@@ -135,26 +131,34 @@ class MusicQueueService:
 			discord.OptionChoice(
 				name=f"[{Utils.milli_to_minutes(track.duration)}] {track.title[:50]} by {track.author[:20]} ({track.source_name})",
 				value=idx
-			) for idx, track in enumerate(player.queue)
+			) for idx, track in enumerate(player.queue[:25]) # Discord shows at most 25 choices
 		]
 	
 
 	async def delete(ctx: discord.ApplicationContext, track_idx: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		track = player.queue.pop(track_idx)
 		await ctx.respond(f"`{track.title}` has been deleted from queue.")
 	
 
 	async def set_loop(ctx: discord.ApplicationContext, mode: int):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		player.set_loop(mode)
 		await ctx.respond(f"Player loop is set to `{'off' if mode == 0 else 'current track' if mode == 1 else 'all'}`.")
 
 
-	async def shuffle(ctx: discord.ApplicationContext, set: bool):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
-		player.set_shuffle(set)
-		await ctx.respond(f"Player shuffle is `{'enabled' if set else 'disabled'}`.")
+	async def shuffle(ctx: discord.ApplicationContext, set: bool, seed: int | None = None):
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player.set_shuffle(set, seed)
+		if player.shuffled:
+			return await ctx.respond(f"Player shuffle is `enabled` (seed `{player.queue.seed}`).")
+		await ctx.respond("Player shuffle is `disabled`.")
+	
+
+	async def set_fair(ctx: discord.ApplicationContext, set: bool):
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player.set_fair(set)
+		await ctx.respond(f"Fair queue is `{'enabled' if set else 'disabled'}`." + (" Requesters now take turns." if set else ""))
 	
 
 	async def skipto(ctx: discord.ApplicationContext, track_idx: int):
@@ -163,7 +167,7 @@ class MusicQueueService:
 		if track_idx == -2:
 			return await ctx.respond("Player queue is empty.", ephemeral=True)
 		
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 
 		if track_idx > len(player.queue):
 			return await ctx.respond("Invalid track.", ephemeral=True)
@@ -179,12 +183,12 @@ class MusicQueueService:
 
 	
 	async def clear_queue(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
 		player.queue.clear()
 		await ctx.respond("Player queue has been cleared.")
 
 	
 	async def clear_history(ctx: discord.ApplicationContext):
-		player: lavalink.DefaultPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
-		player.fetch("history").clear()
+		player: SorceryPlayer = ctx.bot.lavalink.player_manager.get(ctx.guild.id)
+		player.session.history.clear()
 		await ctx.respond("Player history has been cleared.")